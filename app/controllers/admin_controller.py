@@ -0,0 +1,182 @@
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from app.core.metrics import metrics
+from app.core.config import settings
+from app.core.memory import allocation_tracker, memory_accounting
+from app.core.query_monitor import query_monitor
+from app.core.query_shapes import query_shape_recorder
+from app.core.scheduler import scheduler
+from app.middleware.auth import get_current_admin_user
+from app.models.user import User
+from app.schemas.user_schema import BulkUserAction, BulkUserResult
+from app.services.stats_service import StatsService
+from app.services.user_archive_service import UserArchiveService
+from app.services.user_service import UserService
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Get in-process metrics (counters, gauges and timings) for this worker.
+    
+    Requires admin privileges.
+    """
+    return metrics.snapshot()
+
+@router.get("/slow-queries")
+async def get_slow_queries():
+    """
+    Get the most recent slow MongoDB commands seen by this worker.
+    
+    Filter shapes are redacted; per-method latencies are under
+    `mongo.operation.*` in /admin/metrics.
+    
+    Requires admin privileges.
+    """
+    return {
+        "threshold_ms": query_monitor.threshold_ms,
+        "slow_queries": query_monitor.recent()
+    }
+
+@router.get("/query-shapes")
+async def get_query_shapes():
+    """
+    Get the normalized query shapes issued by this worker, with their
+    frequency per repository method (values redacted).
+    
+    Recording is enabled with QUERY_SHAPE_RECORDER_ENABLED; run
+    index_advisor.py to explain the shapes and get index proposals.
+    
+    Requires admin privileges.
+    """
+    return {
+        "enabled": settings.QUERY_SHAPE_RECORDER_ENABLED,
+        "dropped": query_shape_recorder.dropped,
+        "shapes": query_shape_recorder.shapes()
+    }
+
+@router.get("/memory")
+async def get_memory():
+    """
+    Get entry counts and approximate sizes of this worker's in-process
+    caches and buffers, next to the process RSS.
+    
+    Sizes of large caches are extrapolated from a sample of entries.
+    
+    Requires admin privileges.
+    """
+    return memory_accounting.report()
+
+@router.post("/memory/snapshots")
+async def take_memory_snapshot(
+    limit: int = Query(20, ge=1, le=200, description="Number of top allocators to return"),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="How allocations are grouped")
+):
+    """
+    Take a tracemalloc snapshot and diff it against the previous one.
+    
+    The first call starts tracing and returns a baseline; later calls
+    return the allocators that grew since the call before. Tracing slows
+    allocations down until it is stopped with DELETE /admin/memory/snapshots.
+    
+    Requires admin privileges.
+    """
+    return await run_in_threadpool(allocation_tracker.snapshot, limit, group_by)
+
+@router.delete("/memory/snapshots")
+async def stop_memory_snapshots():
+    """
+    Stop tracemalloc tracing and drop the baseline snapshot.
+    
+    Requires admin privileges.
+    """
+    allocation_tracker.stop()
+    return {"tracing": False}
+
+@router.get("/jobs")
+async def get_jobs():
+    """
+    Get the periodic maintenance jobs with their schedules, next run and
+    last run on this worker. With SCHEDULER_LEASE_BACKEND=mongo a job only
+    runs on the worker holding its lease; see the scheduler.* metrics.
+    
+    Requires admin privileges.
+    """
+    return {
+        "enabled": scheduler.enabled,
+        "lease_owner": scheduler.lease.owner,
+        "jobs": scheduler.status()
+    }
+
+@router.get("/stats/users")
+async def get_user_stats(
+    granularity: Literal["day", "hour"] = Query("day", description="Period length"),
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 29 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC), inclusive; defaults to today")
+):
+    """
+    Get signups, activations, deactivations and deletions per day or hour,
+    with totals and the current number of active users.
+    
+    Served from precomputed rollups (and cached for a short while), so
+    it never aggregates the users collection.
+    
+    Requires admin privileges.
+    """
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    return await StatsService.user_stats(granularity, start, end)
+
+@router.post("/stats/users/backfill")
+async def backfill_user_stats(
+    days: int = Query(30, ge=0, le=366, description="Rebuild this many days before today")
+):
+    """
+    Rebuild the signup rollups from the users collections now, e.g. after
+    a first deployment. The same job runs on USER_ROLLUP_BACKFILL_CRON
+    for the last few days. Past periods that missed signups are raised to
+    the recount; none is lowered, and the current hour and day are left
+    to the live counts.
+    
+    Requires admin privileges.
+    """
+    return {"periods": await StatsService.backfill(days)}
+
+@router.post("/users/archive")
+async def archive_inactive_users(
+    inactive_days: int = Query(settings.USER_ARCHIVE_AFTER_DAYS, ge=0, description="Archive users inactive for longer than this"),
+    max_batches: int = Query(10, ge=1, description="Stop after this many batches")
+):
+    """
+    Move long-inactive users to the archive now instead of waiting for the
+    periodic job. Archived users can be restored with
+    POST /users/{user_id}/restore.
+    
+    Requires admin privileges.
+    """
+    archived = await UserArchiveService.archive_inactive_users(
+        inactive_days, settings.USER_ARCHIVE_BATCH_SIZE, max_batches=max_batches
+    )
+    return {"archived": archived}
+
+@router.post("/users/bulk", response_model=BulkUserResult)
+async def bulk_user_action(request: BulkUserAction, current_user: User = Depends(get_current_admin_user)):
+    """
+    Activate, deactivate, grant or remove admin privileges, or permanently
+    delete many users at once, selected by `user_ids` or by `filter`.
+    
+    Each action is a single update_many / delete_many, so large cleanups
+    do not fetch and save users one by one. Cached users are evicted on
+    every worker and the maintained counters are adjusted. The calling
+    admin is never part of the selection.
+    
+    Requires admin privileges.
+    """
+    return await UserService.bulk_action(request, current_user)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from app.schemas.auth_schema import (
     UserLogin, UserRegister, Token, RefreshToken, 
-    PasswordChange
+    PasswordChange, TokenIntrospectRequest, TokenIntrospectResponse
 )
 from app.schemas.user_schema import UserResponse
 from app.services.auth_service import AuthService
-from app.middleware.auth import get_current_active_user
+from app.middleware.auth import get_current_active_user, get_current_admin_user
+from app.middleware.etag import get_current_user_if_modified
 from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -24,7 +25,7 @@ async def register(user_data: UserRegister):
     return await AuthService.register_user(user_data)
 
 @router.post("/login", response_model=Token)
-async def login(login_data: UserLogin):
+async def login(login_data: UserLogin, request: Request):
     """
     Authenticate user and return JWT tokens.
     
@@ -32,8 +33,11 @@ async def login(login_data: UserLogin):
     - **password**: User password
     
     Returns access token, refresh token, and expiration info.
+    Repeated attempts are throttled per client IP and per identifier
+    (429 with Retry-After).
     """
-    return await AuthService.login_user(login_data)
+    client_ip = request.client.host if request.client else None
+    return await AuthService.login_user(login_data, client_ip)
 
 @router.post("/refresh", response_model=Token)
 async def refresh_token(refresh_data: RefreshToken):
@@ -63,11 +67,13 @@ async def logout(current_user: User = Depends(get_current_active_user)):
     )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(current_user: User = Depends(get_current_active_user)):
+async def get_current_user(current_user: User = Depends(get_current_user_if_modified)):
     """
     Get current authenticated user's profile information.
     
     Requires valid JWT token in Authorization header.
+    Supports conditional requests: send the returned ETag in
+    If-None-Match to receive 304 Not Modified when unchanged.
     """
     return await AuthService.get_current_user_profile(current_user)
 
@@ -93,12 +99,13 @@ async def change_password(
     )
 
 @router.get("/verify-token")
-async def verify_token(current_user: User = Depends(get_current_active_user)):
+async def verify_token(current_user: User = Depends(get_current_user_if_modified)):
     """
     Verify if the provided JWT token is valid.
     
     Returns user information if token is valid.
     Useful for checking token validity without full profile data.
+    Supports If-None-Match like /me.
     """
     return {
         "valid": True,
@@ -108,3 +115,20 @@ async def verify_token(current_user: User = Depends(get_current_active_user)):
         "is_active": current_user.is_active,
         "is_admin": current_user.is_admin
     }
+
+@router.post("/introspect", response_model=TokenIntrospectResponse)
+async def introspect_tokens(
+    introspect_data: TokenIntrospectRequest,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Verify many access tokens in one call (for API gateways).
+    
+    - **tokens**: Access tokens to verify (up to INTROSPECT_MAX_TOKENS)
+    
+    Returns one result per token, in request order, with its status,
+    verified claims, user state and seconds until expiry so results
+    can be cached by the caller.
+    Requires admin privileges.
+    """
+    return await AuthService.introspect_tokens(introspect_data.tokens)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Request
+from app.schemas.batch_schema import BatchRequest, BatchResponse
+from app.services.batch_service import BatchService
+from app.middleware.auth import get_current_active_user
+from app.models.user import User
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+@router.post("", response_model=BatchResponse)
+async def batch(
+    batch_data: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Execute several API calls in one round trip.
+    
+    - **requests**: List of sub-requests (`method`, `path`, optional `headers` and `body`)
+    
+    The caller's token is verified once and shared with every sub-request.
+    Sub-requests run concurrently; results are returned in request order.
+    """
+    responses = await BatchService.execute_all(request, batch_data.requests, current_user)
+    return BatchResponse(responses=responses)
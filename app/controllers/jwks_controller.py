@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Response
+from app.core.config import settings
+from app.middleware.etag import ConditionalRequest
+from app.utils.auth import jwt_backend
+import hashlib
+import json
+
+router = APIRouter(tags=["authentication"])
+
+# The key set only changes on deploy/rotation, so the response is built once
+JWKS_BODY = json.dumps(jwt_backend.key_ring.jwks(), separators=(",", ":")).encode("utf-8")
+JWKS_ETAG = f'"{hashlib.sha1(JWKS_BODY).hexdigest()}"'
+JWKS_CACHE_CONTROL = f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}"
+
+@router.get("/.well-known/jwks.json")
+async def jwks(conditional: ConditionalRequest = Depends()):
+    """
+    Public signing keys as a JSON Web Key Set.
+    
+    Lets other services verify access tokens locally instead of calling
+    /auth/verify-token. Empty when tokens are signed with a shared HMAC secret.
+    """
+    conditional.check(JWKS_ETAG, cache_control=JWKS_CACHE_CONTROL)
+    return Response(content=JWKS_BODY, media_type="application/json", headers=conditional.headers)
@@ -0,0 +1,151 @@
+from fastapi import APIRouter, Depends, Query, Response, status
+from typing import List, Optional
+from app.schemas.user_schema import (
+    UserCreate, UserUpdate, UserResponse, UserListResponse,
+    get_sparse_user_schemas
+)
+from app.services.user_service import UserService
+from app.services.user_archive_service import UserArchiveService
+from app.middleware.auth import get_current_active_user, get_current_admin_user
+from app.middleware.etag import ConditionalRequest, user_etag, users_page_etag
+from app.models.user import User
+
+router = APIRouter()
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated list of fields to return (sparse fieldset), "
+    "e.g. `id,username`. Defaults to all fields."
+)
+
+# Routes taking `fields` return their JSON directly (response_model=None);
+# the full schemas are documented here, as not every field may be present
+def _sparse_responses(model, description: str) -> dict:
+    return {200: {"model": model, "description": f"{description}. With `fields`, only the listed fields are present."}}
+
+def _json(content: bytes, conditional: ConditionalRequest) -> Response:
+    """Build a JSON response carrying the conditional request headers."""
+    return Response(content=content, media_type="application/json", headers=conditional.headers)
+
+@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def create_user(
+    user_data: UserCreate,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Create a new user account (admin only).
+    """
+    return await UserService.create_user(user_data)
+
+@router.get("/", response_model=None, responses=_sparse_responses(UserListResponse, "A page of users"))
+async def list_users(
+    conditional: ConditionalRequest = Depends(),
+    page: int = Query(1, ge=1, description="Page number"),
+    size: int = Query(50, ge=1, le=100, description="Items per page"),
+    active_only: bool = Query(True, description="Filter active users only"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Retrieve users with pagination (admin only).
+
+    Only the requested `fields` are fetched from MongoDB and serialized.
+    """
+    field_set = UserService.parse_fields(fields)
+    result = await UserService.list_users(field_set, page=page, size=size, active_only=active_only)
+    conditional.check(users_page_etag(result["users"], result["total"], page, size, active_only, field_set))
+
+    schemas = get_sparse_user_schemas(field_set)
+    return _json(schemas.page.model_validate(result).model_dump_json(), conditional)
+
+@router.get("/search/", response_model=None, responses=_sparse_responses(List[UserResponse], "Matching users"))
+async def search_users(
+    conditional: ConditionalRequest = Depends(),
+    q: str = Query(..., min_length=2, description="Search query"),
+    page: int = Query(1, ge=1, description="Page number"),
+    size: int = Query(50, ge=1, le=100, description="Items per page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Search active users by name, email, or username (admin only).
+    """
+    field_set = UserService.parse_fields(fields)
+    users = await UserService.search_users(q, field_set, page=page, size=size)
+    conditional.check(users_page_etag(users, q, page, size, field_set))
+
+    items = get_sparse_user_schemas(field_set).items
+    return _json(items.dump_json(items.validate_python(users)), conditional)
+
+@router.get("/{user_id}", response_model=None, responses=_sparse_responses(UserResponse, "The user"))
+async def get_user(
+    user_id: str,
+    conditional: ConditionalRequest = Depends(),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Retrieve a specific user.
+
+    Users can read their own profile; admins can read any profile.
+    """
+    UserService.ensure_self_or_admin(user_id, current_user)
+    field_set = UserService.parse_fields(fields)
+    user = await UserService.get_user(user_id, field_set)
+    conditional.check(user_etag(user, field_set))
+
+    schemas = get_sparse_user_schemas(field_set)
+    return _json(schemas.item.model_validate(user).model_dump_json(), conditional)
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: str,
+    user_data: UserUpdate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Update user information.
+
+    Users can update their own profile; admins can update any user,
+    including the `is_active` and `is_admin` flags.
+    """
+    return await UserService.update_user(user_id, user_data, current_user)
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(
+    user_id: str,
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Soft delete a user (sets is_active to False). Admin only.
+    """
+    await UserService.delete_user(user_id, current_user)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/{user_id}/activate", response_model=UserResponse)
+async def activate_user(user_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Activate a user account (admin only)."""
+    return await UserService.set_flags(user_id, current_user, is_active=True)
+
+@router.post("/{user_id}/deactivate", response_model=UserResponse)
+async def deactivate_user(user_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Deactivate a user account (admin only)."""
+    return await UserService.set_flags(user_id, current_user, is_active=False)
+
+@router.post("/{user_id}/restore", response_model=UserResponse)
+async def restore_user(
+    user_id: str,
+    activate: bool = Query(True, description="Reactivate the account on restore"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Restore an archived user account (admin only)."""
+    return await UserArchiveService.restore_user(user_id, activate=activate)
+
+@router.post("/{user_id}/make-admin", response_model=UserResponse)
+async def make_admin(user_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Grant admin privileges (admin only)."""
+    return await UserService.set_flags(user_id, current_user, is_admin=True)
+
+@router.post("/{user_id}/remove-admin", response_model=UserResponse)
+async def remove_admin(user_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Remove admin privileges (admin only)."""
+    return await UserService.set_flags(user_id, current_user, is_admin=False)
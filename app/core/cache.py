@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import sys
+import time
+
+from app.core.config import settings
+from app.core.memory import estimate_bytes, memory_accounting
+
+class TTLCache:
+    """
+    Small in-process LRU cache with per-entry expiry.
+    Entries are evicted when they expire or when the cache is full.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return cached value or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value, evicting the least recently used entry if full."""
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a single entry if present."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries (otherwise only removed when read); returns how many."""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return cache usage statistics."""
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Entry count and approximate bytes (sampled from recent entries)."""
+        entries = list(reversed(self._entries.items()))
+        return {
+            "entries": len(entries),
+            "max_entries": self.max_entries,
+            "bytes": sys.getsizeof(self._entries) + estimate_bytes(entries, len(entries), sample_size)
+        }
+
+# Authenticated user lookups keyed by user ID
+user_cache = TTLCache(
+    name="users",
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS
+)
+memory_accounting.register("user_cache", user_cache.memory_usage)
@@ -0,0 +1,181 @@
+from contextvars import ContextVar
+from typing import Callable, Tuple, Type
+import asyncio
+import functools
+import inspect
+import math
+import time
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.metrics import metrics
+
+# Breaker states, also published as the `circuit_breaker.<name>.state` gauge
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Errors meaning the database is unreachable or too slow, as opposed to a miss
+# or a rejected write. ConnectionFailure covers AutoReconnect, NetworkTimeout
+# and ServerSelectionTimeoutError.
+UNAVAILABLE_ERRORS: Tuple[Type[BaseException], ...] = (
+    ConnectionFailure,
+    ExecutionTimeout,
+    WTimeoutError,
+    asyncio.TimeoutError,
+)
+
+# Set while a guarded call runs, so nested repository calls count once
+_inside_guarded_call: ContextVar[bool] = ContextVar("inside_guarded_call", default=False)
+
+class DatabaseUnavailable(Exception):
+    """The database cannot serve the call now; answered with 503."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    Closed: calls go through; `failure_threshold` consecutive
+    unavailability errors open the circuit.
+    Open: calls fail at once with DatabaseUnavailable for `reset_seconds`,
+    instead of each waiting out the driver's server-selection timeout.
+    Half-open: up to `half_open_max_calls` probe calls go through; a
+    successful probe closes the circuit and a failed one reopens it.
+
+    Only UNAVAILABLE_ERRORS count as failures. Other errors (duplicate
+    keys, validation) show the server is answering and count as successes.
+    A request running out of its own deadline counts only when the server
+    could not be reached in time; a query cut short by maxTimeMS is neutral.
+    `clock` measures how long the circuit has been open (monotonic seconds).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 10,
+        half_open_max_calls: int = 1,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.enabled = enabled
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.set_gauge(f"circuit_breaker.{self.name}.state", STATE_GAUGE[state])
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise DatabaseUnavailable.
+        Returns whether the call is a half-open probe.
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_seconds - self.clock()
+            if remaining > 0:
+                metrics.increment(f"circuit_breaker.{self.name}.rejected")
+                raise DatabaseUnavailable(remaining, "Database temporarily unavailable")
+            self._set_state(HALF_OPEN)
+            self.probes = 0
+
+        if self.state == HALF_OPEN:
+            if self.probes >= self.half_open_max_calls:
+                metrics.increment(f"circuit_breaker.{self.name}.rejected")
+                raise DatabaseUnavailable(self.reset_seconds, "Database temporarily unavailable")
+            self.probes += 1
+            return True
+        return False
+
+    def record_success(self, probe: bool) -> None:
+        self.failures = 0
+        if not probe:
+            # Calls admitted before the circuit opened do not close it
+            return
+        self.probes -= 1
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+            metrics.increment(f"circuit_breaker.{self.name}.closed")
+
+    def record_failure(self, probe: bool) -> None:
+        if probe:
+            self.probes -= 1
+        self.failures += 1
+        metrics.increment(f"circuit_breaker.{self.name}.failures")
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                metrics.increment(f"circuit_breaker.{self.name}.opened")
+            self._set_state(OPEN)
+            self.opened_at = self.clock()
+
+    async def call(self, func, *args, **kwargs):
+        """Run `func` through the breaker, mapping unavailability to DatabaseUnavailable."""
+        if not self.enabled or _inside_guarded_call.get():
+            return await func(*args, **kwargs)
+
+        probe = self.before_call()
+        token = _inside_guarded_call.set(True)
+        try:
+            result = await func(*args, **kwargs)
+        except UNAVAILABLE_ERRORS as exc:
+            self.record_failure(probe)
+            raise DatabaseUnavailable(self.reset_seconds, "Database temporarily unavailable") from exc
+        except DeadlineExceeded as exc:
+            if isinstance(exc.__cause__, ConnectionFailure):
+                self.record_failure(probe)
+            elif probe:
+                self.probes -= 1
+            raise
+        except asyncio.CancelledError:
+            if probe:
+                self.probes -= 1
+            raise
+        except Exception:
+            self.record_success(probe)
+            raise
+        finally:
+            _inside_guarded_call.reset(token)
+        self.record_success(probe)
+        return result
+
+    def status(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+def guarded_repository(cls):
+    """
+    Class decorator routing every async static method of a repository
+    through the MongoDB circuit breaker.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if not isinstance(attribute, staticmethod) or not inspect.iscoroutinefunction(attribute.__func__):
+            continue
+        setattr(cls, name, staticmethod(_guard(attribute.__func__)))
+    return cls
+
+def _guard(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await mongo_breaker.call(func, *args, **kwargs)
+    return wrapper
+
+# Global MongoDB circuit breaker
+mongo_breaker = CircuitBreaker(
+    "mongo",
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+    half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    enabled=settings.CIRCUIT_BREAKER_ENABLED
+)
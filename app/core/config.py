@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 from functools import lru_cache
 import os
 
@@ -19,18 +19,144 @@ class Settings(BaseSettings):
     # MongoDB settings
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DATABASE: str = "fastapi_mvc_db"
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
     
     # Security settings
     JWT_SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_BACKEND: str = "fast"  # "fast" (prepared keys) or "jose" (python-jose)
+    JWT_KEYS: Dict[str, str] = {}  # kid -> secret (JSON in .env); JWT_SECRET_KEY stays verifiable as kid "default"
+    JWT_ACTIVE_KID: str = "default"  # key used to sign new tokens
+    JWT_KEY_FILES: Dict[str, str] = {}  # kid -> PEM path for RS256/RS384/RS512/EdDSA
+    JWKS_CACHE_MAX_AGE_SECONDS: int = 300
+    
+    # Cache settings
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Batch API settings
+    BATCH_MAX_REQUESTS: int = 20
+    BATCH_MAX_CONCURRENCY: int = 8
+    
+    # Compression settings
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    
+    # Counter settings
+    USER_COUNTER_RECONCILE_INTERVAL_SECONDS: int = 3600
+    
+    # Login throttling settings
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_BACKEND: str = "memory"  # "memory" (per worker) or "mongo" (shared)
+    LOGIN_THROTTLE_IP_BURST: int = 20
+    LOGIN_THROTTLE_IP_REFILL_PER_SECOND: float = 0.5
+    LOGIN_THROTTLE_MAX_FAILURES: int = 5
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 300
+    LOGIN_THROTTLE_MAX_ENTRIES: int = 100000
+    LOGIN_THROTTLE_SHARDS: int = 16
+    
+    # Password hashing settings
+    PASSWORD_HASH_SCHEMES: str = "bcrypt"  # comma-separated; first scheme hashes new passwords
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    
+    # Slow query monitor settings
+    SLOW_QUERY_MONITOR_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100
+    SLOW_QUERY_EXPLAIN: bool = False  # explain slow reads in the background
+    SLOW_QUERY_LOG_SIZE: int = 100
+    SLOW_QUERY_EXPLAIN_MAX_SHAPES: int = 1000  # shapes remembered to rate-limit explains
+    
+    # Request profiling settings
+    PROFILING_ENABLED: bool = False
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_RATE_PER_MINUTE: float = 6
+    PROFILING_BURST: int = 2
+    
+    # Admission control settings (per route class concurrency limits)
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_CREDENTIAL_MAX_CONCURRENCY: int = 16
+    ADMISSION_READ_MAX_CONCURRENCY: int = 512
+    ADMISSION_WRITE_MAX_CONCURRENCY: int = 128
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_BYPASS_PATHS: str = "/health"
+    
+    # Token introspection settings
+    INTROSPECT_MAX_TOKENS: int = 500
+    
+    # Read routing settings (tolerant reads may be served by secondaries)
+    READ_ROUTING_ENABLED: bool = False
+    READ_TOLERANT_PREFERENCE: str = "secondaryPreferred"
+    READ_TOLERANT_MAX_STALENESS_SECONDS: int = 90  # minimum accepted by MongoDB; -1 for no limit
+    READ_TOLERANT_READ_CONCERN: str = "local"
+    
+    # User archival settings
+    USER_ARCHIVE_AFTER_DAYS: int = 180  # inactive for longer than this
+    USER_ARCHIVE_BATCH_SIZE: int = 500
+    USER_ARCHIVE_INTERVAL_SECONDS: int = 86400  # 0 disables the periodic job
+    USER_ARCHIVE_CRON: str = ""  # e.g. "30 3 * * *"; replaces the interval when set
+    
+    # Cache invalidation settings ("mongo" across workers, "memory" for a single worker)
+    CACHE_INVALIDATION_BACKEND: str = "mongo"
+    CACHE_INVALIDATION_COLLECTION_BYTES: int = 1048576
+    CACHE_INVALIDATION_MAX_AWAIT_MS: int = 500
+    CACHE_INVALIDATION_MAX_KEYS: int = 1000  # larger invalidations clear the whole cache
+    
+    # Memory accounting settings
+    MEMORY_ACCOUNTING_SAMPLE_SIZE: int = 50  # entries sized per cache; the rest is extrapolated
+    TRACEMALLOC_FRAMES: int = 10
+    
+    # MongoDB circuit breaker settings
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive timeouts/connection errors
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 10  # how long to fail fast before probing
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1
+    
+    # Request deadline settings (budgets in milliseconds; 0 means no deadline)
+    REQUEST_DEADLINE_ENABLED: bool = True
+    REQUEST_DEADLINE_DEFAULT_MS: int = 0
+    REQUEST_DEADLINE_ROUTES: str = "/api/v1/users=2000,/api/v1/auth=2000,/api/v1/batch=2000,/api/v1/admin=0"  # prefix=ms, comma-separated
+    REQUEST_DEADLINE_MAX_MS: int = 30000  # cap for the X-Request-Timeout-Ms header on routes without a deadline
+    
+    # Query shape recorder settings (feeds the index advisor)
+    QUERY_SHAPE_RECORDER_ENABLED: bool = False
+    QUERY_SHAPE_MAX_SHAPES: int = 500
+    
+    # Scheduler settings
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LEASE_BACKEND: str = "mongo"  # "mongo" (one leader per job) or "memory" (single worker only: every worker runs jobs)
+    SCHEDULER_MAX_JITTER_SECONDS: int = 30
+    SCHEDULER_SHUTDOWN_GRACE_SECONDS: int = 10
+    USER_CACHE_PURGE_INTERVAL_SECONDS: int = 300
+    
+    # Bulk operation settings
+    BULK_MAX_USER_IDS: int = 10000  # larger selections use a filter
+    
+    # User rollup settings
+    USER_STATS_CACHE_TTL_SECONDS: int = 60
+    USER_STATS_CACHE_MAX_ENTRIES: int = 256
+    USER_STATS_MAX_PERIODS: int = 1000  # hours or days per request
+    USER_ROLLUP_REFRESH_INTERVAL_SECONDS: int = 300  # active-user snapshots; 0 disables
+    USER_ROLLUP_BACKFILL_CRON: str = "15 0 * * *"  # empty disables
+    USER_ROLLUP_BACKFILL_DAYS: int = 2
     
     # CORS settings (will be parsed from comma-separated string in .env)
     ALLOWED_ORIGINS: str = "http://localhost:3000,http://localhost:8080"
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_QUEUE_SIZE: int = 10000  # records waiting for the writer thread; extra records are dropped
+    LOG_RATE_LIMIT_PER_SECOND: float = 10  # per message type (call site); 0 disables
+    LOG_RATE_LIMIT_BURST: int = 50
+    LOG_SAMPLE_RATE: float = 1.0  # share of DEBUG/INFO records kept
     
     # Additional settings
     TZ: str = "UTC"
@@ -42,6 +168,26 @@ class Settings(BaseSettings):
         extra="ignore"
     )
     
+    @property
+    def password_hash_schemes_list(self) -> List[str]:
+        """Convert comma-separated PASSWORD_HASH_SCHEMES string to list."""
+        return [scheme.strip() for scheme in self.PASSWORD_HASH_SCHEMES.split(',') if scheme.strip()]
+    
+    @property
+    def admission_bypass_paths_list(self) -> List[str]:
+        """Convert comma-separated ADMISSION_BYPASS_PATHS string to list."""
+        return [path.strip() for path in self.ADMISSION_BYPASS_PATHS.split(',') if path.strip()]
+    
+    @property
+    def request_deadline_routes_map(self) -> Dict[str, int]:
+        """Convert comma-separated prefix=ms REQUEST_DEADLINE_ROUTES string to a dict."""
+        routes = {}
+        for entry in self.REQUEST_DEADLINE_ROUTES.split(','):
+            prefix, _, budget = entry.partition('=')
+            if prefix.strip() and budget.strip():
+                routes[prefix.strip()] = int(budget)
+        return routes
+    
     @property
     def allowed_origins_list(self) -> List[str]:
         """Convert comma-separated ALLOWED_ORIGINS string to list."""
@@ -2,7 +2,24 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from app.core.config import settings
 from app.models.user import User
+from app.models.counter import Counter
+from app.models.archived_user import ArchivedUser
+from app.models.user_rollup import UserRollup
+from app.core.query_monitor import query_monitor
+from app.core.query_shapes import query_shape_recorder
 from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Beanie document models registered on startup
+DOCUMENT_MODELS = [User, Counter, ArchivedUser, UserRollup]
+
+# Full `users` indexes replaced by the partial created_at_active/updated_at_inactive
+SUPERSEDED_USER_INDEXES = ("created_at_1", "is_active_1")
+
+# Identity fields of `users` whose indexes used to be created without `unique`
+UNIQUE_USER_FIELDS = ("email", "username")
 
 class MongoDB:
     client: Optional[AsyncIOMotorClient] = None
@@ -13,19 +30,65 @@ mongodb = MongoDB()
 
 async def connect_to_mongo():
     """Create database connection and initialize Beanie"""
-    mongodb.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    event_listeners = [query_monitor] if settings.SLOW_QUERY_MONITOR_ENABLED else []
+    if settings.QUERY_SHAPE_RECORDER_ENABLED:
+        event_listeners.append(query_shape_recorder)
+    mongodb.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        event_listeners=event_listeners,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    )
+    query_monitor.attach(mongodb.client)
     mongodb.database = mongodb.client[settings.MONGODB_DATABASE]
     
-    # Initialize Beanie with User model
-    await init_beanie(database=mongodb.database, document_models=[User])
+    # Initialize Beanie with document models
+    await migrate_indexes(mongodb.database)
+    await init_beanie(database=mongodb.database, document_models=DOCUMENT_MODELS)
     
-    print(f"✅ Connected to MongoDB: {settings.MONGODB_DATABASE}")
+    logger.info(f"Connected to MongoDB: {settings.MONGODB_DATABASE}")
+
+async def migrate_indexes(database) -> None:
+    """
+    Bring indexes created by earlier versions in line with the models,
+    before Beanie creates the missing ones. Beanie never changes an
+    existing index, so superseded ones have to be dropped here.
+
+    Full indexes replaced by partial ones are dropped, so hot indexes
+    only cover the accounts they serve.
+
+    Non-unique email/username indexes are dropped so they are rebuilt as
+    unique. If duplicates already exist the index cannot be rebuilt, so
+    startup fails and leaves the old index in place until they are resolved.
+    """
+    users = database["users"]
+    indexes = await users.index_information()
+    for name in SUPERSEDED_USER_INDEXES:
+        if name in indexes:
+            await users.drop_index(name)
+            logger.info(f"Dropped superseded index users.{name}")
+    for field in UNIQUE_USER_FIELDS:
+        name = f"{field}_1"
+        if name not in indexes or indexes[name].get("unique"):
+            continue
+        duplicates = await users.aggregate([
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": 1}
+        ]).to_list(1)
+        if duplicates:
+            raise RuntimeError(
+                f"Cannot make users.{field} unique: {duplicates[0]['_id']!r} is used by "
+                f"{duplicates[0]['count']} users. Resolve duplicate {field}s and restart."
+            )
+        await users.drop_index(name)
+        logger.info(f"Dropped non-unique index users.{name}; it is rebuilt as unique")
 
 async def close_mongo_connection():
     """Close database connection"""
     if mongodb.client:
         mongodb.client.close()
-        print("❌ Disconnected from MongoDB")
+        query_monitor.close()
+        logger.info("Disconnected from MongoDB")
 
 def get_database():
     """Get database instance"""
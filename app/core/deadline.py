@@ -0,0 +1,72 @@
+from contextvars import ContextVar
+from typing import Optional
+import functools
+import inspect
+import time
+
+import pymongo
+from pymongo.errors import ExecutionTimeout, PyMongoError
+
+from app.core.metrics import metrics
+
+# Time source for deadlines; replaceable so tests can control the passing of time
+clock = time.monotonic
+
+# Monotonic time by which the current request must be answered (None: no deadline)
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time; answered with 504."""
+
+def set_deadline(timeout_seconds: Optional[float]):
+    """Start a deadline for the current context; returns the reset token."""
+    deadline = clock() + timeout_seconds if timeout_seconds else None
+    return current_deadline.set(deadline)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (None when there is none)."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - clock()
+
+def check_deadline(stage: str) -> None:
+    """Raise DeadlineExceeded instead of starting `stage` after the deadline."""
+    left = remaining()
+    if left is not None and left <= 0:
+        metrics.increment(f"deadline.exceeded.{stage}")
+        raise DeadlineExceeded(f"Request deadline exceeded before {stage}")
+
+def deadline_bound(cls):
+    """
+    Class decorator bounding every async static method of a repository
+    by the request deadline: expired requests do not start the call, and
+    the remaining budget is applied with pymongo.timeout, so each command
+    carries it as maxTimeMS and the server stops work nobody waits for.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if not isinstance(attribute, staticmethod) or not inspect.iscoroutinefunction(attribute.__func__):
+            continue
+        setattr(cls, name, staticmethod(_bound(attribute.__func__)))
+    return cls
+
+def _bound(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        left = remaining()
+        if left is None:
+            return await func(*args, **kwargs)
+        check_deadline("database")
+        try:
+            # Motor runs commands with a copy of this context, so the
+            # driver sees the timeout and derives maxTimeMS from it
+            with pymongo.timeout(left):
+                return await func(*args, **kwargs)
+        except PyMongoError as exc:
+            # maxTimeMS expired on the server, or the driver gave up at the
+            # deadline; other errors (e.g. no server reachable) stay as they are
+            if isinstance(exc, ExecutionTimeout) or (exc.timeout and remaining() <= 0):
+                metrics.increment("deadline.exceeded.database")
+                raise DeadlineExceeded("Request deadline exceeded during a database call") from exc
+            raise
+    return wrapper
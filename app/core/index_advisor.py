@@ -0,0 +1,267 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import re
+
+from bson.regex import Regex
+from pymongo.errors import PyMongoError
+
+# Operators bounding a field by a range (last in an ESR compound index)
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$type"}
+
+class IndexProposal(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    partial: Optional[Tuple[Tuple[str, Any], ...]] = None
+
+    def as_code(self) -> str:
+        """The index as it would be declared in a model's Settings.indexes."""
+        keys = ", ".join(f'("{field}", {"ASCENDING" if direction == 1 else "DESCENDING"})' for field, direction in self.keys)
+        name = "_".join(field for field, _ in self.keys)
+        if self.partial:
+            name += "_" + "_".join(f"{field}_{str(value).lower()}" for field, value in self.partial)
+            partial = ", ".join(f'"{field}": {value!r}' for field, value in self.partial)
+            return f'IndexModel([{keys}], name="{name}", partialFilterExpression={{{partial}}})'
+        return f'IndexModel([{keys}], name="{name}")'
+
+class Finding(NamedTuple):
+    collection: str
+    command: str
+    shape: Any
+    sort: List[List[Any]]
+    count: int
+    operations: Dict[str, int]
+    stages: List[str]
+    collscan: bool
+    docs_examined: Optional[int]
+    keys_examined: Optional[int]
+    returned: Optional[int]
+    proposals: List[IndexProposal]
+    notes: List[str]
+
+    @property
+    def needs_index(self) -> bool:
+        return bool(self.proposals)
+
+def _find_key(document: Any, key: str) -> Any:
+    """First value stored under `key` anywhere in a nested explain document."""
+    stack = [document]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            if key in node:
+                return node[key]
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+def plan_stages(plan: Any) -> List[str]:
+    """Stage names of a winning plan, outermost first."""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            # Classic plans nest inputStage(s); slot-based plans wrap them in queryPlan
+            for key in ("queryPlan", "inputStage", "outerStage", "innerStage"):
+                if key in node:
+                    stack.append(node[key])
+            stack.extend(node.get("inputStages", []))
+            stack.extend(node.get("shards", []))
+            if "winningPlan" in node:
+                stack.append(node["winningPlan"])
+    return stages
+
+def query_filter(command_name: str, sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Filters of a recorded command (update/delete may carry several)."""
+    if command_name == "find":
+        return [sample.get("filter") or {}]
+    if command_name in ("count", "distinct", "findAndModify"):
+        return [sample.get("query") or {}]
+    if command_name == "aggregate":
+        pipeline = sample.get("pipeline") or []
+        if pipeline and "$match" in pipeline[0]:
+            return [pipeline[0]["$match"]]
+        return [{}]
+    if command_name == "update":
+        return [statement.get("q") or {} for statement in sample.get("updates", [])]
+    if command_name == "delete":
+        return [statement.get("q") or {} for statement in sample.get("deletes", [])]
+    return [{}]
+
+def flatten(query: Dict[str, Any]) -> List[List[Tuple[str, Any]]]:
+    """
+    Expand a filter into the conjunctive branches MongoDB has to serve:
+    $and clauses are merged and every $or alternative becomes a branch
+    (each one needs its own index to avoid a collection scan).
+    """
+    branches: List[List[Tuple[str, Any]]] = [[]]
+    for key, value in query.items():
+        if key == "$and":
+            for clause in value:
+                branches = [branch + extra for branch in branches for extra in flatten(clause)]
+        elif key == "$or":
+            alternatives = [extra for clause in value for extra in flatten(clause)]
+            branches = [branch + extra for branch in branches for extra in alternatives]
+        elif not key.startswith("$"):
+            branches = [branch + [(key, value)] for branch in branches]
+    return branches
+
+def _regex_indexable(pattern: str, options: str) -> bool:
+    # Only case-sensitive prefix matches can be turned into index bounds
+    return pattern.startswith("^") and "i" not in options
+
+def classify(condition: Any) -> str:
+    """`equality`, `range`, `flag` (boolean equality) or `unindexable`."""
+    if isinstance(condition, bool):
+        return "flag"
+    if isinstance(condition, (re.Pattern, Regex)):
+        options = "i" if condition.flags & re.IGNORECASE else ""
+        return "range" if _regex_indexable(condition.pattern, options) else "unindexable"
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        if "$regex" in condition:
+            pattern = condition["$regex"]
+            if isinstance(pattern, (re.Pattern, Regex)):
+                return classify(pattern)
+            return "range" if _regex_indexable(str(pattern), condition.get("$options", "")) else "unindexable"
+        if "$eq" in condition and isinstance(condition["$eq"], bool):
+            return "flag"
+        if "$eq" in condition or "$in" in condition:
+            return "equality"
+        if RANGE_OPERATORS & set(condition):
+            return "range"
+        return "unindexable"
+    return "equality"
+
+def propose(collection: str, branch: List[Tuple[str, Any]], sort: List[List[Any]]) -> Tuple[Optional[IndexProposal], List[str]]:
+    """
+    Index serving one conjunctive branch, following the ESR rule
+    (equality fields, then sort fields, then range fields). Boolean
+    equalities become the partial filter, so the index only covers the
+    documents the query can match. _id is always indexed and skipped.
+    """
+    equality: List[str] = []
+    ranges: List[str] = []
+    flags: Dict[str, bool] = {}
+    notes: List[str] = []
+    for field, condition in branch:
+        if field == "_id":
+            continue
+        kind = classify(condition)
+        if kind == "flag":
+            flags[field] = condition["$eq"] if isinstance(condition, dict) else condition
+        elif kind == "equality":
+            equality.append(field)
+        elif kind == "range":
+            ranges.append(field)
+        else:
+            notes.append(f"{field}: condition cannot bound an index scan (e.g. unanchored or case-insensitive regex)")
+
+    keys: List[Tuple[str, int]] = [(field, 1) for field in dict.fromkeys(equality)]
+    keys += [(field, int(direction)) for field, direction in sort if field not in dict(keys)]
+    keys += [(field, 1) for field in dict.fromkeys(ranges) if field not in dict(keys)]
+
+    if not keys and flags:
+        # Nothing else to index on: the flag itself has to be the key
+        return IndexProposal(collection, tuple((field, 1) for field in flags)), notes
+    if not keys:
+        return None, notes
+    partial = tuple(sorted(flags.items())) if flags else None
+    return IndexProposal(collection, tuple(keys), partial), notes
+
+def covered_by(proposal: IndexProposal, indexes: Iterable[Dict[str, Any]]) -> bool:
+    """Whether an existing index already starts with the proposed keys."""
+    for index in indexes:
+        keys = tuple(index["key"].items())
+        if keys[:len(proposal.keys)] != proposal.keys:
+            continue
+        partial = index.get("partialFilterExpression")
+        if partial is None or (proposal.partial and dict(proposal.partial) == dict(partial)):
+            return True
+    return False
+
+class IndexAdvisor:
+    """
+    Explains recorded query shapes against a (local) database and
+    proposes indexes for the ones that scan the collection, or that
+    examine far more documents than they return.
+
+    Works on a synchronous pymongo Database; run it from a CLI or a test,
+    never from a request handler.
+    """
+
+    def __init__(self, database, examined_ratio: float = 10.0):
+        self.database = database
+        self.examined_ratio = examined_ratio
+        self._indexes: Dict[str, List[Dict[str, Any]]] = {}
+
+    def explain(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        return self.database.command({"explain": command, "verbosity": "executionStats"})
+
+    def indexes(self, collection: str) -> List[Dict[str, Any]]:
+        if collection not in self._indexes:
+            self._indexes[collection] = list(self.database[collection].list_indexes())
+        return self._indexes[collection]
+
+    def review_shape(self, entry: Dict[str, Any]) -> Finding:
+        notes: List[str] = []
+        try:
+            explained = self.explain(entry["sample"])
+        except PyMongoError as exc:
+            explained = {}
+            notes.append(f"explain failed: {exc}")
+
+        stages = plan_stages(_find_key(explained, "winningPlan"))
+        stats = _find_key(explained, "executionStats") or {}
+        docs_examined = stats.get("totalDocsExamined")
+        returned = stats.get("nReturned")
+        collscan = "COLLSCAN" in stages
+        inefficient = (
+            docs_examined is not None and returned is not None
+            and docs_examined > self.examined_ratio * max(returned, 1)
+        )
+
+        proposals: List[IndexProposal] = []
+        if collscan or inefficient:
+            for query in query_filter(entry["command"], entry["sample"]):
+                if not query:
+                    notes.append("no filter: full scan by design")
+                    continue
+                for branch in flatten(query):
+                    proposal, branch_notes = propose(entry["collection"], branch, entry["sort"])
+                    notes.extend(branch_notes)
+                    if proposal is None or proposal in proposals:
+                        continue
+                    if covered_by(proposal, self.indexes(entry["collection"])):
+                        notes.append(f"planner did not pick existing index on {[field for field, _ in proposal.keys]}")
+                        continue
+                    proposals.append(proposal)
+
+        return Finding(
+            collection=entry["collection"],
+            command=entry["command"],
+            shape=entry["shape"],
+            sort=entry["sort"],
+            count=entry["count"],
+            operations=entry["operations"],
+            stages=stages,
+            collscan=collscan,
+            docs_examined=docs_examined,
+            keys_examined=stats.get("totalKeysExamined"),
+            returned=returned,
+            proposals=proposals,
+            notes=list(dict.fromkeys(notes))
+        )
+
+    def review(self, shapes: List[Dict[str, Any]]) -> List[Finding]:
+        """Findings for recorded shapes (from QueryShapeRecorder.shapes(include_samples=True))."""
+        return [self.review_shape(entry) for entry in shapes]
+
+def summarize(findings: List[Finding]) -> List[Tuple[IndexProposal, int]]:
+    """Distinct proposals with the number of queries each one would serve, most useful first."""
+    served: Dict[IndexProposal, int] = {}
+    for finding in findings:
+        for proposal in finding.proposals:
+            served[proposal] = served.get(proposal, 0) + finding.count
+    return sorted(served.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,236 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, OperationFailure, PyMongoError
+
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cache kinds carried by invalidation events
+USER = "user"
+
+# Server error returned when change streams are unavailable (standalone server)
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+class InvalidationBus(ABC):
+    """
+    Broadcasts cache invalidations to every worker.
+
+    Publishing evicts the keys from the local caches at once and then
+    sends the event to the other workers, whose subscribers evict the
+    same keys. Events from this worker are ignored when they come back.
+    If a subscriber may have missed events, it clears its caches instead.
+    Invalidations of more than `max_keys` keys (bulk operations) are sent
+    as a single event clearing every cache of that kind.
+    """
+
+    def __init__(self, max_keys: int = 1000):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.caches: Dict[str, List[Any]] = {}
+        self.max_keys = max_keys
+
+    def register(self, kind: str, cache) -> None:
+        """Evict keys of `kind` from `cache` (anything with delete/clear)."""
+        self.caches.setdefault(kind, []).append(cache)
+
+    async def publish(self, kind: str, keys: Iterable[str], reason: str) -> None:
+        """Evict keys locally and broadcast the invalidation."""
+        event = {
+            "kind": kind,
+            "keys": [str(key) for key in keys],
+            "reason": reason,
+            "origin": self.origin,
+            "at": datetime.utcnow()
+        }
+        if not event["keys"]:
+            return
+        if len(event["keys"]) > self.max_keys:
+            event.update(keys=[], all=True)
+        await self._broadcast(event)
+
+    async def publish_all(self, kind: str, reason: str) -> None:
+        """Clear every cache of `kind`, locally and on the other workers."""
+        await self._broadcast({
+            "kind": kind,
+            "keys": [],
+            "all": True,
+            "reason": reason,
+            "origin": self.origin,
+            "at": datetime.utcnow()
+        })
+
+    async def _broadcast(self, event: Dict[str, Any]) -> None:
+        self.evict(event)
+        metrics.increment("invalidation.published")
+        try:
+            await self.send(event)
+        except PyMongoError as exc:
+            # Other workers fall back on cache expiry
+            metrics.increment("invalidation.publish_errors")
+            logger.error(f"Failed to publish cache invalidation: {exc}")
+
+    def evict(self, event: Dict[str, Any]) -> None:
+        for cache in self.caches.get(event["kind"], []):
+            if event.get("all"):
+                cache.clear()
+                continue
+            for key in event["keys"]:
+                cache.delete(key)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        """Apply an event received from the transport."""
+        if event.get("origin") == self.origin:
+            return
+        self.evict(event)
+        metrics.increment("invalidation.received")
+        at = event.get("at")
+        if isinstance(at, datetime):
+            metrics.observe("invalidation.delay", max(0.0, (datetime.utcnow() - at).total_seconds()))
+
+    def resync(self) -> None:
+        """Clear every registered cache after possibly missing events."""
+        metrics.increment("invalidation.resyncs")
+        for caches in self.caches.values():
+            for cache in caches:
+                cache.clear()
+
+    @abstractmethod
+    async def send(self, event: Dict[str, Any]) -> None:
+        """Hand an event to the transport reaching the other workers."""
+
+    async def start(self) -> None:
+        """Start receiving events from other workers."""
+
+    async def stop(self) -> None:
+        """Stop receiving events."""
+
+class MemoryInvalidationBus(InvalidationBus):
+    """
+    In-process stand-in: buses sharing a broker list deliver to each other
+    immediately. With a single worker there is nobody else to notify.
+    """
+
+    def __init__(self, broker: Optional[List["MemoryInvalidationBus"]] = None, max_keys: int = 1000):
+        super().__init__(max_keys)
+        self.broker = broker if broker is not None else []
+        self.broker.append(self)
+
+    async def send(self, event: Dict[str, Any]) -> None:
+        for bus in self.broker:
+            bus.deliver(event)
+
+class MongoInvalidationBus(InvalidationBus):
+    """
+    Events are inserted into a small capped collection. Workers follow it
+    with a change stream, or by tailing the capped collection when the
+    server does not support change streams (standalone deployments).
+    Either way the delay is bounded by `max_await_ms` plus network time.
+    """
+
+    COLLECTION = "cache_invalidations"
+
+    def __init__(self, size_bytes: int = 1048576, max_await_ms: int = 500, max_keys: int = 1000):
+        super().__init__(max_keys)
+        self.size_bytes = size_bytes
+        self.max_await_ms = max_await_ms
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return get_database()[self.COLLECTION]
+
+    async def ensure_collection(self) -> None:
+        try:
+            await get_database().create_collection(self.COLLECTION, capped=True, size=self.size_bytes)
+        except (CollectionInvalid, OperationFailure):
+            pass  # already exists
+
+    async def send(self, event: Dict[str, Any]) -> None:
+        await self.collection.insert_one(event)
+
+    async def start(self) -> None:
+        await self.ensure_collection()
+        self.task = asyncio.create_task(self.follow())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def follow(self) -> None:
+        """Receive events until cancelled, reconnecting on errors."""
+        use_change_stream = True
+        last_id = ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            try:
+                if use_change_stream:
+                    await self.follow_change_stream()
+                    # The stream ended (closed or invalidated): the next one
+                    # starts from now, so events in between may be lost
+                    self.resync()
+                else:
+                    last_id = await self.tail(last_id)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if use_change_stream and exc.code == CHANGE_STREAMS_UNSUPPORTED:
+                    logger.info("Change streams unavailable; tailing the capped invalidation collection")
+                    use_change_stream = False
+                    continue
+                logger.error(f"Cache invalidation subscriber failed: {exc}")
+                self.resync()
+                await asyncio.sleep(1)
+            except PyMongoError as exc:
+                logger.error(f"Cache invalidation subscriber failed: {exc}")
+                self.resync()
+                await asyncio.sleep(1)
+
+    async def follow_change_stream(self) -> None:
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        async with self.collection.watch(pipeline, max_await_time_ms=self.max_await_ms) as stream:
+            async for change in stream:
+                self.deliver(change["fullDocument"])
+
+    async def tail(self, last_id: ObjectId) -> ObjectId:
+        """Follow the capped collection from `last_id`; return the last seen id."""
+        cursor = self.collection.find(
+            {"_id": {"$gt": last_id}},
+            cursor_type=CursorType.TAILABLE_AWAIT
+        ).max_await_time_ms(self.max_await_ms)
+        while cursor.alive:
+            async for event in cursor:
+                last_id = event["_id"]
+                self.deliver(event)
+        # Dead cursor (e.g. empty collection): retry shortly
+        await asyncio.sleep(self.max_await_ms / 1000)
+        return last_id
+
+def create_invalidation_bus(backend: str) -> InvalidationBus:
+    if backend == "mongo":
+        return MongoInvalidationBus(
+            size_bytes=settings.CACHE_INVALIDATION_COLLECTION_BYTES,
+            max_await_ms=settings.CACHE_INVALIDATION_MAX_AWAIT_MS,
+            max_keys=settings.CACHE_INVALIDATION_MAX_KEYS
+        )
+    if settings.USER_CACHE_TTL_SECONDS > 0 and settings.USER_CACHE_MAX_ENTRIES > 0:
+        logger.warning(
+            "CACHE_INVALIDATION_BACKEND=memory only reaches this worker: with more than one "
+            "worker, others serve stale cached users until USER_CACHE_TTL_SECONDS passes"
+        )
+    return MemoryInvalidationBus(max_keys=settings.CACHE_INVALIDATION_MAX_KEYS)
+
+# Global invalidation bus
+invalidation_bus = create_invalidation_bus(settings.CACHE_INVALIDATION_BACKEND)
+invalidation_bus.register(USER, user_cache)
@@ -0,0 +1,209 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+
+from app.core.memory import estimate_bytes, memory_accounting
+from app.core.metrics import metrics
+
+# Correlation id of the request being handled (set by RequestIdMiddleware)
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Server loggers that write to stderr themselves; routed through the queue instead
+# (uvicorn.access keeps its own handler: one record per request would hit the rate limit)
+ROUTED_LOGGERS = ("uvicorn", "uvicorn.error")
+
+class RequestIdFilter(logging.Filter):
+    """
+    Stamp records with the current request id. Runs in the thread that logs,
+    before the record is queued, so the context variable is still set; an
+    id passed through `extra` (e.g. by the 500 handler, which runs after the
+    request id middleware has returned) is kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = current_request_id.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per call site rate limiting and sampling.
+
+    Each message type (logger, level and source line) gets a token bucket
+    of `burst` records refilled at `rate_per_second`; records beyond it are
+    dropped and counted, and the next record let through from that site
+    carries the number suppressed since. Records below WARNING are also
+    sampled at `sample_rate`.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, sample_rate: float = 1.0):
+        super().__init__()
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.sample_rate = sample_rate
+        self._buckets: Dict[Tuple[str, int, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            metrics.increment("logging.sampled_out")
+            return False
+        if self.rate_per_second <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [tokens, last refill, suppressed since last record]
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate_per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                metrics.increment("logging.suppressed")
+                return False
+            bucket[0] -= 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request id and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name != "request_id":
+                entry[name] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without waiting: when the queue
+    is full the record is dropped and counted instead of blocking the
+    event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now (arguments may change later),
+        # but leave the formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("logging.dropped")
+
+class LogPipeline:
+    """
+    Root logger -> bounded queue -> listener thread -> stdout.
+    The server's error logger (tracebacks of unhandled exceptions) is
+    routed the same way instead of writing to stderr on the event loop.
+    """
+
+    def __init__(self):
+        self.listener: Optional[QueueListener] = None
+        self.queue: Optional[queue.Queue] = None
+        self.rate_limit: Optional[RateLimitFilter] = None
+
+    def configure(
+        self,
+        level: str = "INFO",
+        fmt: str = "json",
+        queue_size: int = 10000,
+        rate_per_second: float = 10,
+        burst: int = 50,
+        sample_rate: float = 1.0
+    ) -> None:
+        self.stop()
+        output = logging.StreamHandler(sys.stdout)
+        if fmt == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.rate_limit = RateLimitFilter(rate_per_second, burst, sample_rate)
+        handler = NonBlockingQueueHandler(self.queue)
+        handler.addFilter(self.rate_limit)
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, level))
+        for name in ROUTED_LOGGERS:
+            routed = logging.getLogger(name)
+            for existing in list(routed.handlers):
+                routed.removeHandler(existing)
+            routed.propagate = True
+
+        self.listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Records waiting for the writer thread and per call site rate limit buckets."""
+        records, buckets, max_records = [], [], 0
+        if self.queue is not None:
+            with self.queue.mutex:
+                records = list(self.queue.queue)
+            max_records = self.queue.maxsize
+        if self.rate_limit is not None:
+            with self.rate_limit._lock:
+                buckets = list(self.rate_limit._buckets.items())
+        return {
+            "entries": len(records) + len(buckets),
+            "bytes": estimate_bytes(records, len(records), sample_size)
+                + estimate_bytes(buckets, len(buckets), sample_size),
+            "queued_records": len(records),
+            "max_queued_records": max_records,
+            "rate_limited_sites": len(buckets)
+        }
+
+# Global logging pipeline (configured by the application on import)
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.stop)
+memory_accounting.register("log_pipeline", log_pipeline.memory_usage)
@@ -0,0 +1,221 @@
+from collections import deque
+from types import FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, Iterable, Optional
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Objects never counted towards a cache entry: they are shared, not owned
+SHARED_TYPES = (type, ModuleType, FunctionType, MethodType)
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate bytes held by an object and everything it references:
+    containers, instance dicts and slots (which covers pydantic models
+    and Beanie documents). Classes, modules and functions are shared and
+    not counted; objects already seen are counted once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+        return size
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+        return size
+
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get("__slots__", ()):
+            if slot != "__dict__" and hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+def estimate_bytes(items: Iterable[Any], count: int, sample_size: int) -> int:
+    """
+    Estimate the size of a collection of `count` items from the first
+    `sample_size` of them, so large caches are sized in bounded time.
+    """
+    if count <= 0:
+        return 0
+    sample = list(itertools.islice(items, max(1, sample_size)))
+    if not sample:
+        return 0
+    sampled = sum(deep_sizeof(item) for item in sample)
+    return int(sampled * count / len(sample))
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident and peak resident memory of this worker in bytes."""
+    rss = None
+    try:
+        with open("/proc/self/statm") as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    peak = None
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+class MemoryAccounting:
+    """
+    Registry of in-process caches and buffers.
+
+    Each component registers a reporter returning at least `entries` and
+    `bytes` (approximate, extrapolated from a sample). Reports are built
+    on demand only, so accounting costs nothing between calls.
+    """
+
+    def __init__(self, sample_size: int = 50):
+        self.sample_size = sample_size
+        self.reporters: Dict[str, Callable[[int], Dict[str, Any]]] = {}
+
+    def register(self, name: str, reporter: Callable[[int], Dict[str, Any]]) -> None:
+        """`reporter(sample_size)` returns a dict with `entries` and `bytes`."""
+        self.reporters[name] = reporter
+
+    def report(self) -> Dict[str, Any]:
+        components: Dict[str, Any] = {}
+        total = 0
+        for name, reporter in self.reporters.items():
+            try:
+                usage = reporter(self.sample_size)
+            except Exception as exc:
+                logger.error(f"Memory reporter {name} failed: {exc}")
+                components[name] = {"error": str(exc)}
+                continue
+            components[name] = usage
+            if usage.get("bytes") is not None:
+                total += usage["bytes"]
+                metrics.set_gauge(f"memory.{name}.bytes", usage["bytes"])
+            metrics.set_gauge(f"memory.{name}.entries", usage.get("entries", 0))
+
+        return {
+            "process": process_memory(),
+            "tracemalloc": allocation_tracker.status(),
+            "accounted_bytes": total,
+            "components": components
+        }
+
+class AllocationTracker:
+    """
+    tracemalloc snapshots compared between calls.
+
+    The first snapshot starts tracing (which adds allocation overhead
+    until `stop` is called) and becomes the baseline; each following
+    snapshot is diffed against the previous one, so the top entries are
+    the allocators that grew in between.
+    """
+
+    # Frames from the tracer itself and the import machinery are noise
+    FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+    GROUP_BY = ("lineno", "filename", "traceback")
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self.previous_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "tracer_overhead_bytes": tracemalloc.get_tracemalloc_memory()
+        }
+
+    def snapshot(self, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Take a snapshot and return the top allocators that grew since the
+        previous one. Blocking; call it from a worker thread.
+        """
+        if group_by not in self.GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(self.GROUP_BY)}")
+
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self.previous = None
+
+            snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+            now = time.time()
+            previous, previous_at = self.previous, self.previous_at
+            self.previous, self.previous_at = snapshot, now
+
+        if previous is None:
+            return {
+                "baseline": True,
+                "tracemalloc": self.status(),
+                "top": [self._stat(stat) for stat in snapshot.statistics(group_by)[:limit]]
+            }
+
+        diff = snapshot.compare_to(previous, group_by)
+        return {
+            "baseline": False,
+            "interval_seconds": round(now - previous_at, 3),
+            "size_diff_bytes": sum(stat.size_diff for stat in diff),
+            "tracemalloc": self.status(),
+            "top": [self._stat(stat) for stat in diff[:limit]]
+        }
+
+    def stop(self) -> None:
+        """Stop tracing and forget the baseline."""
+        with self._lock:
+            self.previous = self.previous_at = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    @staticmethod
+    def _stat(stat) -> Dict[str, Any]:
+        entry = {
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count
+        }
+        if isinstance(stat, tracemalloc.StatisticDiff):
+            entry["size_diff_bytes"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        return entry
+
+# Global memory accounting and allocation tracker
+memory_accounting = MemoryAccounting(sample_size=settings.MEMORY_ACCOUNTING_SAMPLE_SIZE)
+allocation_tracker = AllocationTracker(frames=settings.TRACEMALLOC_FRAMES)
+memory_accounting.register("metrics", metrics.memory_usage)
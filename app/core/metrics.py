@@ -0,0 +1,92 @@
+from typing import Dict
+import sys
+import threading
+
+class TimingStats:
+    """Aggregated count, total and max for a timed operation."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry.
+    Counters accumulate values, gauges hold the latest value and
+    timings aggregate observed durations.
+    Safe to update from driver threads as well as the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, TimingStats] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add value to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its latest value."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration for a timed operation."""
+        with self._lock:
+            stats = self.timings.get(name)
+            if stats is None:
+                stats = self.timings[name] = TimingStats()
+            stats.observe(seconds)
+
+    def snapshot(self) -> dict:
+        """Return a copy of all metrics."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": {name: stats.to_dict() for name, stats in self.timings.items()}
+            }
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Number of series and approximate bytes held by their names and values."""
+        with self._lock:
+            series = [*self.counters.items(), *self.gauges.items(), *self.timings.items()]
+            size = sum(sys.getsizeof(table) for table in (self.counters, self.gauges, self.timings))
+        size += sum(
+            sys.getsizeof(name) + sys.getsizeof(value) + (
+                sum(sys.getsizeof(getattr(value, slot)) for slot in TimingStats.__slots__)
+                if isinstance(value, TimingStats) else 0
+            )
+            for name, value in series
+        )
+        return {"entries": len(series), "bytes": size}
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timings.clear()
+
+# Global metrics registry
+metrics = MetricsRegistry()
@@ -0,0 +1,245 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import functools
+import inspect
+import logging
+import threading
+import time
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.memory import estimate_bytes, memory_accounting
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Repository method currently issuing database commands
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+
+# Read commands whose plan can be explained without side effects
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# Driver bookkeeping fields that are not part of the query itself
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "$readConcern", "readConcern"}
+
+def monitored_repository(cls):
+    """
+    Class decorator tagging every async static method of a repository,
+    so database commands issued inside it are attributed to "Class.method".
+    """
+    for name, attribute in list(vars(cls).items()):
+        if not isinstance(attribute, staticmethod) or not inspect.iscoroutinefunction(attribute.__func__):
+            continue
+        setattr(cls, name, staticmethod(_track(f"{cls.__name__}.{name}", attribute.__func__)))
+    return cls
+
+def _track(operation: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Keep the outermost method when repositories call each other
+        if current_operation.get() is not None:
+            return await func(*args, **kwargs)
+        token = current_operation.set(operation)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_operation.reset(token)
+    return wrapper
+
+def redact(value: Any) -> Any:
+    """Replace every literal in a query with "?" while keeping its structure."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = redact(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Optional[Any]:
+    """Extract the redacted filter (or pipeline) from a command document."""
+    if command_name == "find":
+        query = command.get("filter", {})
+    elif command_name == "aggregate":
+        query = command.get("pipeline", [])
+    elif command_name in ("count", "distinct", "findAndModify"):
+        query = command.get("query", {})
+    elif command_name == "update":
+        query = [statement.get("q", {}) for statement in command.get("updates", [])]
+    elif command_name == "delete":
+        query = [statement.get("q", {}) for statement in command.get("deletes", [])]
+    else:
+        return None
+    return redact(query)
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    """
+    Driver-level command monitor.
+
+    - every command's latency goes to the metrics registry, both per
+      command name and per calling repository method
+    - commands slower than the threshold are logged with a redacted
+      filter shape and kept in a bounded in-memory log
+    - optionally, slow queries are explained in the background so a
+      COLLSCAN plan shows up next to the log entry; each shape at most
+      once per interval, remembering up to `max_explained` shapes
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        explain: bool = False,
+        log_size: int = 100,
+        explain_interval_seconds: float = 60,
+        max_explained: int = 1000
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval_seconds = explain_interval_seconds
+        self.slow_queries: deque = deque(maxlen=log_size)
+        self.client = None
+        self._pending: Dict[Tuple[int, Any], dict] = {}
+        self.max_explained = max(1, max_explained)
+        # Shape key -> last explain time, oldest first
+        self._explained: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._explain_executor: Optional[ThreadPoolExecutor] = None
+
+    def attach(self, client) -> None:
+        """Remember the client used to run explain commands."""
+        self.client = client
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name == "explain":
+            return
+        command = event.command
+        pending = {
+            "operation": current_operation.get(),
+            "database": event.database_name,
+            "collection": command.get(event.command_name) if isinstance(command.get(event.command_name), str) else None,
+            "shape": query_shape(event.command_name, command)
+        }
+        if self.explain and event.command_name in EXPLAINABLE_COMMANDS:
+            pending["command"] = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = pending
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.connection_id), None)
+        if pending is None:
+            return
+
+        seconds = event.duration_micros / 1_000_000
+        operation = pending["operation"] or "unattributed"
+        metrics.observe(f"mongo.command.{event.command_name}", seconds)
+        metrics.observe(f"mongo.operation.{operation}", seconds)
+        if failed:
+            metrics.increment("mongo.failed_commands")
+
+        duration_ms = seconds * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        metrics.increment("mongo.slow_queries")
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "operation": operation,
+            "command": event.command_name,
+            "database": pending["database"],
+            "collection": pending["collection"],
+            "duration_ms": round(duration_ms, 3),
+            "shape": pending["shape"],
+            "failed": failed
+        }
+        self.slow_queries.append(entry)
+        logger.warning(
+            f"Slow MongoDB command {event.command_name} on {pending['collection']} "
+            f"from {operation}: {duration_ms:.1f} ms, shape={pending['shape']}"
+        )
+
+        if "command" in pending:
+            self._schedule_explain(entry, pending["command"])
+
+    def _schedule_explain(self, entry: dict, command: Dict[str, Any]) -> None:
+        """Explain a slow query shape at most once per interval, off the driver thread."""
+        if self.client is None:
+            return
+        key = f"{entry['operation']}:{entry['command']}:{entry['shape']}"
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(key)
+            if last is not None and now - last < self.explain_interval_seconds:
+                return
+            self._explained[key] = now
+            self._explained.move_to_end(key)
+            # Drop shapes whose interval has passed, and the oldest beyond the cap
+            while self._explained:
+                oldest = next(iter(self._explained.values()))
+                if now - oldest < self.explain_interval_seconds and len(self._explained) <= self.max_explained:
+                    break
+                self._explained.popitem(last=False)
+            if self._explain_executor is None:
+                self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._explain_executor.submit(self._explain, entry, command)
+
+    def _explain(self, entry: dict, command: Dict[str, Any]) -> None:
+        try:
+            # Motor clients wrap a synchronous pymongo client
+            client = getattr(self.client, "delegate", self.client)
+            result = client[entry["database"]].command(
+                {"explain": command, "verbosity": "queryPlanner"}
+            )
+            entry["plan"] = result.get("queryPlanner", {}).get("winningPlan")
+        except Exception as exc:
+            entry["plan_error"] = str(exc)
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Slow-query log, in-flight commands and explain history."""
+        with self._lock:
+            pending = list(self._pending.items())
+            explained = list(self._explained.items())
+        slow_queries = list(self.slow_queries)
+        return {
+            "entries": len(slow_queries) + len(pending) + len(explained),
+            "bytes": sum(
+                estimate_bytes(items, len(items), sample_size)
+                for items in (slow_queries, pending, explained)
+            ),
+            "slow_queries": len(slow_queries),
+            "max_slow_queries": self.slow_queries.maxlen,
+            "pending": len(pending),
+            "explained_shapes": len(explained),
+            "max_explained_shapes": self.max_explained
+        }
+
+    def recent(self) -> list:
+        """Most recent slow queries, newest first."""
+        return list(reversed(self.slow_queries))
+
+    def close(self) -> None:
+        if self._explain_executor is not None:
+            self._explain_executor.shutdown(wait=False)
+            self._explain_executor = None
+
+# Global query monitor
+query_monitor = SlowQueryMonitor(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    log_size=settings.SLOW_QUERY_LOG_SIZE,
+    max_explained=settings.SLOW_QUERY_EXPLAIN_MAX_SHAPES
+)
+memory_accounting.register("query_monitor", query_monitor.memory_usage)
@@ -0,0 +1,100 @@
+from typing import Any, Dict, List
+import json
+import threading
+
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.core.memory import estimate_bytes, memory_accounting
+from app.core.query_monitor import DRIVER_FIELDS, current_operation, query_shape
+
+# Commands whose filter can be served by an index
+RECORDED_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+def sort_shape(command: Dict[str, Any]) -> List[List[Any]]:
+    """Sort specification as [field, direction] pairs (directions are kept)."""
+    sort = command.get("sort") or {}
+    return [[field, direction] for field, direction in sort.items()]
+
+class QueryShapeRecorder(monitoring.CommandListener):
+    """
+    Driver-level recorder of normalized query shapes.
+
+    Each distinct (collection, command, filter shape, sort) is counted,
+    per calling repository method, and keeps the first command seen with
+    that shape so it can be explained later by the index advisor.
+    Samples contain real values and are never exposed through the API.
+    """
+
+    def __init__(self, max_shapes: int = 500):
+        self.max_shapes = max_shapes
+        self.dropped = 0
+        self._shapes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in RECORDED_COMMANDS:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+
+        shape = query_shape(event.command_name, command)
+        sort = sort_shape(command)
+        key = json.dumps([event.database_name, collection, event.command_name, shape, sort], default=str)
+        operation = current_operation.get() or "unattributed"
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    self.dropped += 1
+                    return
+                entry = self._shapes[key] = {
+                    "database": event.database_name,
+                    "collection": collection,
+                    "command": event.command_name,
+                    "shape": shape,
+                    "sort": sort,
+                    "count": 0,
+                    "operations": {},
+                    "sample": {name: value for name, value in command.items() if name not in DRIVER_FIELDS}
+                }
+            entry["count"] += 1
+            entry["operations"][operation] = entry["operations"].get(operation, 0) + 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+    def shapes(self, include_samples: bool = False) -> List[dict]:
+        """Recorded shapes, most frequent first."""
+        with self._lock:
+            entries = [
+                {**entry, "operations": dict(entry["operations"])}
+                for entry in self._shapes.values()
+            ]
+        if not include_samples:
+            for entry in entries:
+                entry.pop("sample")
+        return sorted(entries, key=lambda entry: entry["count"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self.dropped = 0
+
+    def memory_usage(self, sample_size: int) -> dict:
+        with self._lock:
+            entries = list(self._shapes.items())
+        return {
+            "entries": len(entries),
+            "max_entries": self.max_shapes,
+            "bytes": estimate_bytes(entries, len(entries), sample_size)
+        }
+
+# Global query shape recorder (attached to the client when enabled)
+query_shape_recorder = QueryShapeRecorder(max_shapes=settings.QUERY_SHAPE_MAX_SHAPES)
+memory_accounting.register("query_shapes", query_shape_recorder.memory_usage)
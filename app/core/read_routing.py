@@ -0,0 +1,104 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+import functools
+
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Read consistency classes
+READ_CRITICAL = "critical"
+READ_TOLERANT = "tolerant"
+
+# Read preferences selectable for tolerant reads
+TOLERANT_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Consistency class of the repository method currently running
+current_read_consistency: ContextVar[str] = ContextVar("current_read_consistency", default=READ_CRITICAL)
+
+def _tag(consistency: str):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_read_consistency.set(consistency)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                current_read_consistency.reset(token)
+        wrapper.read_consistency = consistency
+        return wrapper
+    return decorator
+
+# Reads that must see the latest writes (auth, uniqueness checks) stay on the primary
+read_critical = _tag(READ_CRITICAL)
+
+# Reads that accept bounded staleness (listings, search, counts) may use secondaries
+read_tolerant = _tag(READ_TOLERANT)
+
+class ReadRouter:
+    """
+    Resolves the collection handle for a read according to the
+    consistency class of the calling repository method.
+
+    Critical reads (and untagged code) use the primary. Tolerant reads use
+    the configured read preference, max staleness and read concern.
+    `apply` is the only place options are attached to a collection, so a
+    local stand-in can replace it and assert which preference each call uses.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        tolerant_mode: str = "secondaryPreferred",
+        max_staleness_seconds: int = -1,
+        tolerant_read_concern: Optional[str] = "local"
+    ):
+        self.enabled = enabled
+        if tolerant_mode not in TOLERANT_PREFERENCES:
+            raise ValueError(f"Unsupported read preference for tolerant reads: {tolerant_mode}")
+        self.preferences: Dict[str, Any] = {
+            READ_CRITICAL: Primary(),
+            READ_TOLERANT: TOLERANT_PREFERENCES[tolerant_mode](max_staleness=max_staleness_seconds)
+        }
+        self.read_concerns: Dict[str, ReadConcern] = {
+            READ_CRITICAL: ReadConcern(),
+            READ_TOLERANT: ReadConcern(tolerant_read_concern)
+        }
+
+    def read_preference(self, consistency: Optional[str] = None):
+        """Read preference used for a consistency class (default: the current one)."""
+        if not self.enabled:
+            return self.preferences[READ_CRITICAL]
+        return self.preferences[consistency or current_read_consistency.get()]
+
+    def collection(self, model, consistency: Optional[str] = None):
+        """Motor collection of a Beanie model routed for the current read."""
+        consistency = consistency or current_read_consistency.get()
+        collection = model.get_motor_collection()
+        if not self.enabled or consistency == READ_CRITICAL:
+            return collection
+        metrics.increment(f"read_routing.{consistency}")
+        return self.apply(
+            collection,
+            read_preference=self.preferences[consistency],
+            read_concern=self.read_concerns[consistency]
+        )
+
+    @staticmethod
+    def apply(collection, **options: Any):
+        return collection.with_options(**options)
+
+# Global read router
+read_router = ReadRouter(
+    enabled=settings.READ_ROUTING_ENABLED,
+    tolerant_mode=settings.READ_TOLERANT_PREFERENCE,
+    max_staleness_seconds=settings.READ_TOLERANT_MAX_STALENESS_SECONDS,
+    tolerant_read_concern=settings.READ_TOLERANT_READ_CONCERN
+)
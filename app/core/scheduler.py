@@ -0,0 +1,341 @@
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class IntervalSchedule:
+    """Run every `seconds`."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+class CronSchedule:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in UTC. Fields accept `*`, numbers, ranges `a-b`, steps `*/n`
+    or `a-b/n`, and comma-separated lists. Day-of-week 0 (or 7) is Sunday;
+    as in cron, when both day fields are restricted either may match.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.FIELDS)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in field.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(bound) for bound in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field {item!r} outside {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.isoweekday() % 7) in self.weekdays
+        if self.any_day:
+            return weekday
+        if self.any_weekday:
+            return day
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+class LeaderLease:
+    """Leases deciding which worker runs a job; the base class grants them all."""
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def acquire(self, name: str, ttl_seconds: float) -> bool:
+        return True
+
+    async def renew(self, name: str, ttl_seconds: float) -> bool:
+        """Extend a lease this worker holds; False if it was lost."""
+        return True
+
+    async def release(self, name: str) -> None:
+        """Give the lease up (on shutdown) so another worker can take over."""
+
+class MongoLeaderLease(LeaderLease):
+    """
+    One document per job. A worker holds the lease while `expires_at` is
+    in the future and renews it on each run, so the same worker keeps
+    running the job; if it dies, the lease expires and the next worker
+    whose schedule fires takes over.
+    """
+
+    COLLECTION = "scheduler_leases"
+
+    @property
+    def collection(self):
+        return get_database()[self.COLLECTION]
+
+    async def acquire(self, name: str, ttl_seconds: float) -> bool:
+        now = datetime.utcnow()
+        try:
+            lease = await self.collection.find_one_and_update(
+                {"_id": name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl_seconds), "acquired_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Held by another worker: the upsert collided with its document
+            return False
+        return lease is not None and lease.get("owner") == self.owner
+
+    async def renew(self, name: str, ttl_seconds: float) -> bool:
+        result = await self.collection.update_one(
+            {"_id": name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def release(self, name: str) -> None:
+        await self.collection.update_one(
+            {"_id": name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow()}}
+        )
+
+class Job:
+    """A named coroutine function with a schedule and its last run state."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        schedule,
+        jitter_seconds: float = 0,
+        leader_only: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.jitter_seconds = jitter_seconds
+        self.leader_only = leader_only
+        self.next_run: Optional[datetime] = None
+        self.last_started: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.running = False
+
+    def status(self) -> dict:
+        return {
+            "schedule": str(self.schedule),
+            "jitter_seconds": self.jitter_seconds,
+            "leader_only": self.leader_only,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "last_started": self.last_started.isoformat() if self.last_started else None,
+            "last_duration_ms": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "running": self.running
+        }
+
+class Scheduler:
+    """
+    Runs maintenance jobs inside the application process.
+
+    Every worker schedules every job; before each run of a leader-only job
+    a worker must take the job's leader lease, so across the fleet one
+    worker runs it (jobs on per-worker state, such as cache sweeps, pass
+    leader_only=False and run everywhere). Runs
+    are delayed by a random jitter so workers do not all wake at once.
+    Durations go to the `scheduler.<job>` timing, with `.runs`,
+    `.failures` and `.skipped` counters. While a leader-only job runs, a
+    heartbeat renews its lease every third of the lease time, so a run
+    longer than the lease does not let another worker start it too.
+    `stop` lets a running job finish for up to `shutdown_grace_seconds`
+    before cancelling it.
+    """
+
+    def __init__(self, lease: LeaderLease, shutdown_grace_seconds: float = 10, enabled: bool = True):
+        self.lease = lease
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self.enabled = enabled
+        self.jobs: Dict[str, Job] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[object]], schedule, **options) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job already registered: {name}")
+        job = self.jobs[name] = Job(name, func, schedule, **options)
+        return job
+
+    def add_interval_job(self, name: str, func: Callable[[], Awaitable[object]], seconds: float, **options) -> Job:
+        return self.add_job(name, func, IntervalSchedule(seconds), **options)
+
+    def add_cron_job(self, name: str, func: Callable[[], Awaitable[object]], expression: str, **options) -> Job:
+        return self.add_job(name, func, CronSchedule(expression), **options)
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        self._stopping = asyncio.Event()
+        for name, job in self.jobs.items():
+            self.tasks[name] = asyncio.create_task(self._loop(job), name=f"job:{name}")
+
+    async def stop(self) -> None:
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        tasks = list(self.tasks.values())
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.shutdown_grace_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.tasks.clear()
+        for job in self.jobs.values():
+            if not job.leader_only:
+                continue
+            try:
+                await self.lease.release(job.name)
+            except PyMongoError as exc:
+                logger.warning(f"Could not release lease for job {job.name}: {exc}")
+        self._stopping = None
+
+    async def _sleep_until(self, moment: datetime) -> bool:
+        """Wait until `moment`; False if the scheduler is stopping."""
+        delay = (moment - datetime.utcnow()).total_seconds()
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(0.0, delay))
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            job.next_run = job.schedule.next_after(datetime.utcnow()) + timedelta(
+                seconds=random.uniform(0, job.jitter_seconds)
+            )
+            if not await self._sleep_until(job.next_run):
+                return
+            # Hold the lease until just after the following run is due
+            ttl = (job.schedule.next_after(job.next_run) - job.next_run).total_seconds() + job.jitter_seconds + 60
+            await self.run_job(job, ttl)
+
+    async def run_job(self, job: Job, lease_seconds: float) -> bool:
+        """Run a job once if this worker holds its lease; returns whether it ran."""
+        try:
+            if job.leader_only and not await self.lease.acquire(job.name, lease_seconds):
+                metrics.increment(f"scheduler.{job.name}.skipped")
+                return False
+        except PyMongoError as exc:
+            metrics.increment(f"scheduler.{job.name}.skipped")
+            logger.error(f"Could not acquire lease for job {job.name}: {exc}")
+            return False
+
+        job.running = True
+        job.last_started = datetime.utcnow()
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._keep_lease(job, lease_seconds)) if job.leader_only else None
+        try:
+            await job.func()
+            job.last_error = None
+            metrics.set_gauge(f"scheduler.{job.name}.last_success", time.time())
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            job.last_error = str(exc)
+            metrics.increment(f"scheduler.{job.name}.failures")
+            logger.error(f"Job {job.name} failed: {exc}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+            job.running = False
+            job.last_duration = time.perf_counter() - started
+            metrics.increment(f"scheduler.{job.name}.runs")
+            metrics.observe(f"scheduler.{job.name}", job.last_duration)
+        return True
+
+    async def _keep_lease(self, job: Job, lease_seconds: float) -> None:
+        """Renew the lease of a running job until cancelled."""
+        while True:
+            await asyncio.sleep(lease_seconds / 3)
+            try:
+                renewed = await self.lease.renew(job.name, lease_seconds)
+            except PyMongoError as exc:
+                logger.warning(f"Could not renew lease for job {job.name}: {exc}")
+                continue
+            if not renewed:
+                metrics.increment(f"scheduler.{job.name}.lease_lost")
+                logger.warning(f"Lost lease for job {job.name} while it was running")
+                return
+
+    def status(self) -> Dict[str, dict]:
+        return {name: job.status() for name, job in self.jobs.items()}
+
+def create_leader_lease(backend: str) -> LeaderLease:
+    if backend == "mongo":
+        return MongoLeaderLease()
+    logger.warning(
+        "SCHEDULER_LEASE_BACKEND=memory grants every lease: with more than one worker, "
+        "each of them runs the leader-only jobs"
+    )
+    return LeaderLease()
+
+# Global scheduler (jobs are registered on startup)
+scheduler = Scheduler(
+    create_leader_lease(settings.SCHEDULER_LEASE_BACKEND),
+    shutdown_grace_seconds=settings.SCHEDULER_SHUTDOWN_GRACE_SECONDS,
+    enabled=settings.SCHEDULER_ENABLED
+)
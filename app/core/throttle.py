@@ -0,0 +1,306 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+import math
+import sys
+import threading
+import time
+
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.memory import estimate_bytes, memory_accounting
+from app.core.metrics import metrics
+
+class ShardedStateMap:
+    """
+    Memory-bounded map split into independently locked LRU shards.
+    When a shard is full its least recently used entry is dropped.
+    """
+
+    def __init__(self, max_entries: int, shards: int = 16):
+        self.shards = max(1, shards)
+        self.max_per_shard = max(1, max_entries // self.shards)
+        self._maps: List["OrderedDict[Hashable, Any]"] = [OrderedDict() for _ in range(self.shards)]
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+
+    def _shard(self, key: Hashable) -> int:
+        return hash(key) % self.shards
+
+    def update(self, key: Hashable, func: Callable[[Optional[Any]], Tuple[Any, Any]]) -> Any:
+        """
+        Atomically replace the state for key.
+        `func` receives the current state (or None) and returns (new_state, result).
+        """
+        index = self._shard(key)
+        with self._locks[index]:
+            shard = self._maps[index]
+            state, result = func(shard.get(key))
+            if state is None:
+                shard.pop(key, None)
+            else:
+                shard[key] = state
+                shard.move_to_end(key)
+                while len(shard) > self.max_per_shard:
+                    shard.popitem(last=False)
+            return result
+
+    def delete(self, key: Hashable) -> None:
+        index = self._shard(key)
+        with self._locks[index]:
+            self._maps[index].pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._maps)
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Entry count and approximate bytes, sampled across all shards."""
+        items = []
+        size = 0
+        for lock, shard in zip(self._locks, self._maps):
+            with lock:
+                items.extend(shard.items())
+                size += sys.getsizeof(shard)
+        return {
+            "entries": len(items),
+            "max_entries": self.max_per_shard * self.shards,
+            "bytes": size + estimate_bytes(items, len(items), sample_size)
+        }
+
+class TokenBucket:
+    """Token bucket rate limit evaluated lazily from the last update time."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    def consume(self, state: Optional[Tuple[float, float]], now: float) -> Tuple[Tuple[float, float], float]:
+        """
+        Take one token. Returns the new (tokens, updated_at) state and the
+        seconds to wait before a token is available (0 when allowed).
+        """
+        tokens, updated_at = state if state else (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+        if tokens >= 1:
+            return (tokens - 1, now), 0.0
+        if self.refill_per_second <= 0:
+            return (tokens, now), 3600.0
+        return (tokens, now), (1 - tokens) / self.refill_per_second
+
+class SlidingWindow:
+    """
+    Sliding-window counter approximated from the current and previous
+    fixed windows, weighted by how far into the current window we are.
+    """
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+
+    def index(self, now: float) -> int:
+        return int(now // self.window_seconds)
+
+    def estimate(self, previous: int, current: int, now: float) -> float:
+        elapsed = (now % self.window_seconds) / self.window_seconds
+        return previous * (1 - elapsed) + current
+
+    def retry_after(self, previous: int, current: int, limit: int, now: float) -> float:
+        """Seconds until the estimate drops below the limit."""
+        if current >= limit or previous == 0:
+            return self.window_seconds - (now % self.window_seconds)
+        # Solve previous * (1 - t / window) + current < limit for t
+        needed = 1 - (limit - current) / previous
+        return max(0.0, needed * self.window_seconds - (now % self.window_seconds)) + 1
+
+class MemoryThrottleStore:
+    """Per-process failure windows kept in a sharded map."""
+
+    def __init__(self, state: ShardedStateMap, window: SlidingWindow):
+        self.state = state
+        self.window = window
+
+    async def increment(self, key: str, now: float) -> Tuple[int, int]:
+        """Count one attempt; returns the (previous, current) counts including it."""
+        current_index = self.window.index(now)
+
+        def bump(state):
+            previous, current = self._counts(state, current_index)
+            return (current_index, previous, current + 1), (previous, current + 1)
+
+        return self.state.update(key, bump)
+
+    async def decrement(self, key: str, now: float) -> None:
+        """Take back one attempt (from the previous window if it rolled over)."""
+        current_index = self.window.index(now)
+
+        def refund(state):
+            previous, current = self._counts(state, current_index)
+            if current:
+                current -= 1
+            elif previous:
+                previous -= 1
+            return (current_index, previous, current), None
+
+        self.state.update(key, refund)
+
+    async def reset(self, key: str) -> None:
+        self.state.delete(key)
+
+    @staticmethod
+    def _counts(state, current_index: int) -> Tuple[int, int]:
+        if state is None:
+            return 0, 0
+        index, previous, current = state
+        if index == current_index:
+            return previous, current
+        if index == current_index - 1:
+            return current, 0
+        return 0, 0
+
+class MongoThrottleStore:
+    """
+    Failure windows shared across workers through MongoDB.
+    One small document per key and fixed window, expired by a TTL index.
+    """
+
+    COLLECTION = "login_throttle"
+
+    def __init__(self, window: SlidingWindow):
+        self.window = window
+
+    @property
+    def collection(self):
+        return get_database()[self.COLLECTION]
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def _id(self, key: str, index: int) -> str:
+        return f"{key}:{index}"
+
+    async def increment(self, key: str, now: float) -> Tuple[int, int]:
+        """
+        Count one attempt; returns the (previous, current) counts including it.
+        The $inc returns the new count, so concurrent attempts on any worker
+        each see a distinct value.
+        """
+        index = self.window.index(now)
+        expires_at = datetime.utcfromtimestamp((index + 2) * self.window.window_seconds)
+        document = await self.collection.find_one_and_update(
+            {"_id": self._id(key, index)},
+            {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = await self.collection.find_one({"_id": self._id(key, index - 1)})
+        return (previous or {}).get("count", 0), document["count"]
+
+    async def decrement(self, key: str, now: float) -> None:
+        """Take back one attempt (from the previous window if it rolled over)."""
+        index = self.window.index(now)
+        for window_index in (index, index - 1):
+            result = await self.collection.update_one(
+                {"_id": self._id(key, window_index), "count": {"$gt": 0}},
+                {"$inc": {"count": -1}}
+            )
+            if result.modified_count:
+                return
+
+    async def reset(self, key: str) -> None:
+        index = self.window.index(time.time())
+        await self.collection.delete_many({"_id": {"$in": [self._id(key, index - 1), self._id(key, index)]}})
+
+class ThrottleExceeded(Exception):
+    """Raised when a login attempt must be rejected."""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+class LoginThrottle:
+    """
+    Login throttling evaluated before any user lookup or password hashing.
+
+    - per client IP: token bucket bounding the attempt rate
+    - per identifier: sliding window of failed attempts
+
+    `check` counts the attempt as a failure up front, atomically, so
+    parallel attempts cannot all pass before the first failure is
+    recorded. A successful login resets the window; attempts that end
+    without a verdict on the password are given back with `release`.
+    """
+
+    def __init__(
+        self,
+        ip_burst: int,
+        ip_refill_per_second: float,
+        max_failures: int,
+        window_seconds: int,
+        max_entries: int,
+        shards: int,
+        backend: str = "memory"
+    ):
+        self.max_failures = max_failures
+        self.bucket = TokenBucket(ip_burst, ip_refill_per_second)
+        self.window = SlidingWindow(window_seconds)
+        self.ip_state = ShardedStateMap(max_entries, shards)
+        if backend == "mongo":
+            self.store = MongoThrottleStore(self.window)
+        else:
+            self.store = MemoryThrottleStore(ShardedStateMap(max_entries, shards), self.window)
+
+    @staticmethod
+    def identifier_key(identifier: str) -> str:
+        return f"id:{identifier.strip().lower()}"
+
+    async def check(self, identifier: str, client_ip: Optional[str]) -> None:
+        """Reserve this attempt as a failure, or raise ThrottleExceeded if it must be rejected."""
+        now = time.time()
+
+        if client_ip:
+            wait = self.ip_state.update(client_ip, lambda state: self.bucket.consume(state, now))
+            if wait > 0:
+                metrics.increment("login_throttle.rejected.ip")
+                raise ThrottleExceeded(wait, "Too many login attempts from this address")
+
+        key = self.identifier_key(identifier)
+        previous, current = await self.store.increment(key, now)
+        # Judged on the attempts before this one
+        if self.window.estimate(previous, current - 1, now) >= self.max_failures:
+            await self.store.decrement(key, now)
+            metrics.increment("login_throttle.rejected.identifier")
+            raise ThrottleExceeded(
+                self.window.retry_after(previous, current - 1, self.max_failures, now),
+                "Too many failed login attempts for this account"
+            )
+
+    async def release(self, identifier: str) -> None:
+        """Give back an attempt reserved by `check` that did not fail."""
+        await self.store.decrement(self.identifier_key(identifier), time.time())
+
+    async def record_success(self, identifier: str) -> None:
+        await self.store.reset(self.identifier_key(identifier))
+
+    def memory_usage(self, sample_size: int) -> dict:
+        """Per-IP buckets plus in-process failure windows (none with the mongo store)."""
+        usage = {"ip": self.ip_state.memory_usage(sample_size)}
+        if isinstance(self.store, MemoryThrottleStore):
+            usage["identifier"] = self.store.state.memory_usage(sample_size)
+        return {
+            "entries": sum(part["entries"] for part in usage.values()),
+            "bytes": sum(part["bytes"] for part in usage.values()),
+            **usage
+        }
+
+# Global login throttle
+login_throttle = LoginThrottle(
+    ip_burst=settings.LOGIN_THROTTLE_IP_BURST,
+    ip_refill_per_second=settings.LOGIN_THROTTLE_IP_REFILL_PER_SECOND,
+    max_failures=settings.LOGIN_THROTTLE_MAX_FAILURES,
+    window_seconds=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    max_entries=settings.LOGIN_THROTTLE_MAX_ENTRIES,
+    shards=settings.LOGIN_THROTTLE_SHARDS,
+    backend=settings.LOGIN_THROTTLE_BACKEND
+)
+memory_accounting.register("login_throttle", login_throttle.memory_usage)
@@ -1,15 +1,38 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import functools
 import time
 import logging
 
 from app.core.config import settings
+from app.core.cache import user_cache
+from app.core.circuit_breaker import DatabaseUnavailable, mongo_breaker
+from app.core.deadline import DeadlineExceeded
 from app.core.database import connect_to_mongo, close_mongo_connection
-from app.controllers import auth_controller, user_controller
+from app.controllers import auth_controller, user_controller, batch_controller, admin_controller, jwks_controller
+from app.middleware.admission import AdmissionControlMiddleware, AdaptiveConcurrencyLimit
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.services.counter_service import CounterService
+from app.services.stats_service import StatsService
+from app.services.user_archive_service import UserArchiveService
+from app.core.throttle import login_throttle, MongoThrottleStore
+from app.core.invalidation import invalidation_bus
+from app.core.logs import log_pipeline
+from app.core.scheduler import scheduler
 
-# Configure logging
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+# Configure logging: records are queued and written by a background thread
+log_pipeline.configure(
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    rate_per_second=settings.LOG_RATE_LIMIT_PER_SECOND,
+    burst=settings.LOG_RATE_LIMIT_BURST,
+    sample_rate=settings.LOG_SAMPLE_RATE
+)
 logger = logging.getLogger(__name__)
 
 # Create FastAPI instance
@@ -20,16 +43,94 @@ app = FastAPI(
     description="A FastAPI application with JWT authentication and MongoDB"
 )
 
+# Keep maintained counters in line with the collection
+if settings.USER_COUNTER_RECONCILE_INTERVAL_SECONDS > 0:
+    scheduler.add_interval_job(
+        "reconcile_user_counters",
+        CounterService.reconcile_user_counters,
+        settings.USER_COUNTER_RECONCILE_INTERVAL_SECONDS,
+        jitter_seconds=settings.SCHEDULER_MAX_JITTER_SECONDS
+    )
+
+# Move long-inactive users out of the live collection
+archive_inactive_users = functools.partial(
+    UserArchiveService.archive_inactive_users,
+    inactive_days=settings.USER_ARCHIVE_AFTER_DAYS,
+    batch_size=settings.USER_ARCHIVE_BATCH_SIZE
+)
+if settings.USER_ARCHIVE_CRON:
+    scheduler.add_cron_job(
+        "archive_inactive_users", archive_inactive_users, settings.USER_ARCHIVE_CRON,
+        jitter_seconds=settings.SCHEDULER_MAX_JITTER_SECONDS
+    )
+elif settings.USER_ARCHIVE_INTERVAL_SECONDS > 0:
+    scheduler.add_interval_job(
+        "archive_inactive_users", archive_inactive_users, settings.USER_ARCHIVE_INTERVAL_SECONDS,
+        jitter_seconds=settings.SCHEDULER_MAX_JITTER_SECONDS
+    )
+
+# Keep the dashboard rollups current: active-user snapshots and a signup backfill
+if settings.USER_ROLLUP_REFRESH_INTERVAL_SECONDS > 0:
+    scheduler.add_interval_job(
+        "refresh_user_rollups", StatsService.refresh_active, settings.USER_ROLLUP_REFRESH_INTERVAL_SECONDS,
+        jitter_seconds=settings.SCHEDULER_MAX_JITTER_SECONDS
+    )
+if settings.USER_ROLLUP_BACKFILL_CRON:
+    scheduler.add_cron_job(
+        "backfill_user_rollups",
+        functools.partial(StatsService.backfill, settings.USER_ROLLUP_BACKFILL_DAYS),
+        settings.USER_ROLLUP_BACKFILL_CRON,
+        jitter_seconds=settings.SCHEDULER_MAX_JITTER_SECONDS
+    )
+
+# Drop expired cached users on every worker (entries are otherwise only evicted on read)
+async def purge_user_cache() -> int:
+    return user_cache.purge_expired()
+
+if settings.USER_CACHE_PURGE_INTERVAL_SECONDS > 0:
+    scheduler.add_interval_job(
+        "purge_user_cache", purge_user_cache, settings.USER_CACHE_PURGE_INTERVAL_SECONDS,
+        leader_only=False
+    )
+
 # Database connection events
 @app.on_event("startup")
 async def startup_event():
     await connect_to_mongo()
-    logger.info("Connected to MongoDB")
+    
+    if isinstance(login_throttle.store, MongoThrottleStore):
+        await login_throttle.store.ensure_indexes()
+    
+    # Receive cache invalidations from other workers
+    await invalidation_bus.start()
+    
+    # Periodic maintenance jobs
+    await scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await scheduler.stop()
+    await invalidation_bus.stop()
     await close_mongo_connection()
-    logger.info("Disconnected from MongoDB")
+
+# Admission control: shed load with fast 503s instead of queueing on the event loop
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limits={
+            route_class: AdaptiveConcurrencyLimit(
+                max_limit,
+                min_limit=max(1, max_limit // 8),
+                tolerance=settings.ADMISSION_LATENCY_TOLERANCE
+            )
+            for route_class, max_limit in (
+                ("credential", settings.ADMISSION_CREDENTIAL_MAX_CONCURRENCY),
+                ("read", settings.ADMISSION_READ_MAX_CONCURRENCY),
+                ("write", settings.ADMISSION_WRITE_MAX_CONCURRENCY),
+            )
+        },
+        bypass_paths=settings.admission_bypass_paths_list,
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -40,6 +141,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand request profiling (admin only, triggered by the X-Profile header)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=settings.PROFILING_OUTPUT_DIR,
+        per_minute=settings.PROFILING_RATE_PER_MINUTE,
+        burst=settings.PROFILING_BURST,
+    )
+
+# Response compression middleware
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    )
+
+# Request deadlines (around routing, profiling and compression; only the
+# timing and request-id middlewares added below run outside the budget)
+if settings.REQUEST_DEADLINE_ENABLED:
+    app.add_middleware(
+        DeadlineMiddleware,
+        routes=settings.request_deadline_routes_map,
+        default_ms=settings.REQUEST_DEADLINE_DEFAULT_MS,
+        max_ms=settings.REQUEST_DEADLINE_MAX_MS,
+    )
+
 # Request timing middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
@@ -49,6 +179,9 @@ async def add_process_time_header(request: Request, call_next):
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
+# Request ids (added last: every log record of the request carries the id)
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth_controller.router, prefix="/api/v1")
 app.include_router(
@@ -56,6 +189,9 @@ app.include_router(
     prefix="/api/v1/users",
     tags=["users"]
 )
+app.include_router(batch_controller.router, prefix="/api/v1")
+app.include_router(admin_controller.router, prefix="/api/v1")
+app.include_router(jwks_controller.router)
 
 # Root endpoint
 @app.get("/")
@@ -73,16 +209,42 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": time.time(),
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "database": mongo_breaker.status()
     }
 
+# MongoDB timeouts, connection errors and an open circuit breaker
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Requests whose deadline passed before or during database / hashing work
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "Request deadline exceeded"}
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception: {exc}")
+    # Runs outside RequestIdMiddleware, so the id comes from the request state
+    request_id = getattr(request.state, "request_id", None)
+    # Rate limited per call site, so an error storm does not flood the log queue
+    logger.error(
+        f"Unhandled exception on {request.method} {request.url.path}: {exc}",
+        exc_info=exc,
+        extra={"request_id": request_id}
+    )
     return JSONResponse(
         status_code=500,
-        content={"detail": "Internal server error"}
+        content={"detail": "Internal server error"},
+        headers={"X-Request-ID": request_id} if request_id else None
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+from typing import Dict, Iterable, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+import json
+import math
+import time
+
+from app.core.metrics import metrics
+
+# Endpoints doing password hashing: few of them saturate the CPU
+CREDENTIAL_PATHS = frozenset({
+    "/api/v1/auth/login",
+    "/api/v1/auth/register",
+    "/api/v1/auth/change-password",
+})
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class AdaptiveConcurrencyLimit:
+    """
+    Concurrency limit adapted from observed latency (gradient algorithm).
+
+    A slow moving average of request latency serves as the no-load
+    baseline. While recent latency stays within `tolerance` times the
+    baseline the limit grows; once latency rises beyond it, queueing is
+    happening somewhere and the limit shrinks proportionally.
+    All methods run on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, tolerance: float = 2.0, smoothing: float = 0.2):
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.limit = float(max(self.min_limit, max_limit // 2))
+        self.inflight = 0
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+
+    def try_acquire(self) -> bool:
+        if self.inflight >= int(self.limit):
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, rtt: float) -> None:
+        self.inflight -= 1
+        self.update(rtt)
+
+    def update(self, rtt: float) -> None:
+        if self.short_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return
+
+        self.short_rtt = self.short_rtt * 0.9 + rtt * 0.1
+        self.long_rtt = self.long_rtt * 0.99 + rtt * 0.01
+        if self.long_rtt > self.short_rtt:
+            # Recovering from overload: let the baseline come back down quickly
+            self.long_rtt = self.long_rtt * 0.9 + self.short_rtt * 0.1
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from current latency."""
+        return max(1, math.ceil(self.short_rtt or 1))
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware shedding load before it queues up on the event loop.
+
+    Requests are grouped into route classes, each with its own adaptive
+    concurrency limit:
+
+    - `credential`: login, registration and password change (bcrypt)
+    - `read`: other safe-method requests (token-only lookups)
+    - `write`: everything else
+
+    When a class is at its limit the request is rejected at once with
+    503 and Retry-After. Bypass paths (e.g. /health) are never limited.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Dict[str, AdaptiveConcurrencyLimit],
+        bypass_paths: Iterable[str] = ("/health",)
+    ):
+        self.app = app
+        self.limits = limits
+        self.bypass_paths = frozenset(bypass_paths)
+
+    @staticmethod
+    def classify(scope: Scope) -> str:
+        if scope["path"].rstrip("/") in CREDENTIAL_PATHS:
+            return "credential"
+        if scope["method"] in READ_METHODS:
+            return "read"
+        return "write"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.bypass_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.classify(scope)
+        limit = self.limits.get(route_class)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not limit.try_acquire():
+            metrics.increment(f"admission.{route_class}.rejected")
+            await self.reject(send, limit.retry_after())
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release(time.perf_counter() - started)
+            metrics.set_gauge(f"admission.{route_class}.limit", round(limit.limit, 2))
+
+    @staticmethod
+    async def reject(send: Send, retry_after: int) -> None:
+        body = json.dumps({"detail": "Server is overloaded, please retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,6 +1,7 @@
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from app.core.circuit_breaker import DatabaseUnavailable
 from app.utils.auth import JWTManager
 from app.repositories.user_repository import UserRepository
 from app.models.user import User
@@ -11,7 +12,24 @@ class AuthMiddleware:
     """Authentication middleware for JWT token validation."""
     
     @staticmethod
-    async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    def get_preauthenticated_user(request: Optional[Request], token: str) -> Optional[User]:
+        """
+        Return the user already verified for this token by an enclosing
+        batch request, if any. Only in-process dispatch can set this state.
+        """
+        if request is None:
+            return None
+        
+        user = request.scope.get("state", {}).get("authenticated_user")
+        if user is not None and request.scope["state"].get("authenticated_token") == token:
+            return user
+        return None
+    
+    @staticmethod
+    async def get_current_user(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        request: Optional[Request] = None
+    ) -> User:
         """
         Get current authenticated user from JWT token.
         This dependency can be used in route handlers to require authentication.
@@ -22,6 +40,10 @@ class AuthMiddleware:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
+        user = AuthMiddleware.get_preauthenticated_user(request, credentials.credentials)
+        if user is not None:
+            return user
+        
         try:
             # Verify the token
             payload = JWTManager.verify_token(credentials.credentials, token_type="access")
@@ -34,7 +56,7 @@ class AuthMiddleware:
                 raise credentials_exception
             
             # Get user from database
-            user = await UserRepository.get_by_id(user_id)
+            user = await UserRepository.get_cached_by_id(user_id)
             if user is None:
                 raise credentials_exception
             
@@ -48,6 +70,10 @@ class AuthMiddleware:
             
             return user
             
+        except (HTTPException, DatabaseUnavailable):
+            # Keep specific 401s, and report an unreachable database as 503
+            # rather than as invalid credentials
+            raise
         except Exception:
             raise credentials_exception
     
@@ -98,19 +124,24 @@ class AuthMiddleware:
                 return None
             
             # Get user from database
-            user = await UserRepository.get_by_id(user_id)
+            user = await UserRepository.get_cached_by_id(user_id)
             if user is None or not user.is_active:
                 return None
             
             return user
             
+        except DatabaseUnavailable:
+            raise
         except Exception:
             return None
 
 # Convenience functions for dependency injection
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> User:
     """Get current authenticated user."""
-    return await AuthMiddleware.get_current_user(credentials)
+    return await AuthMiddleware.get_current_user(credentials, request)
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user."""
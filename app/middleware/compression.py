@@ -0,0 +1,265 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import time
+import zlib
+
+from app.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+class Compressor(ABC):
+    """Incremental compressor interface used by CompressionMiddleware."""
+
+    encoding = ""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so it can be sent immediately."""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """Return the trailing bytes of the stream."""
+
+class GzipCompressor(Compressor):
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+class BrotliCompressor(Compressor):
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class ZstdCompressor(Compressor):
+    encoding = "zstd"
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+def available_encodings() -> List[str]:
+    """Supported encodings in server preference order."""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Pick the best supported encoding from an Accept-Encoding header.
+    Highest q-value wins; ties are broken by server preference.
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, encoding in enumerate(supported):
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality <= 0:
+            continue
+        candidate = (quality, -rank, encoding)
+        if best is None or candidate > best:
+            best = candidate
+    return best[2] if best else None
+
+def weaken_etag(etag: str) -> str:
+    """
+    Mark an entity tag weak. The compressed bytes differ from the ones the
+    upstream tag was computed for, so it can no longer be a strong validator.
+    """
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses according to Accept-Encoding.
+
+    - gzip always; brotli and zstd when their packages are installed
+    - responses smaller than `minimum_size` are sent as-is
+    - streaming responses are compressed chunk by chunk, never buffered
+    - strong ETags of compressed responses are made weak
+    - compression ratio and CPU time are reported to the metrics registry
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.supported = available_encodings()
+
+    def create_compressor(self, encoding: str) -> Compressor:
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        if encoding == "zstd":
+            return ZstdCompressor(self.zstd_level)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.supported)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    """Per-response state for CompressionMiddleware."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_time = 0.0
+
+    def should_skip(self, headers: MutableHeaders, status: int) -> bool:
+        if status < 200 or status in (204, 304):
+            return True
+        if "content-encoding" in headers:
+            return True
+        content_type = headers.get("content-type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return True
+        content_length = headers.get("content-length")
+        return content_length is not None and int(content_length) < self.middleware.minimum_size
+
+    def run(self, func, *args: bytes) -> bytes:
+        """Call a compressor method while accounting CPU time."""
+        started = time.thread_time()
+        output = func(*args)
+        self.cpu_time += time.thread_time() - started
+        return output
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            self.passthrough = self.should_skip(headers, message["status"])
+            if self.passthrough:
+                await self.downstream(message)
+            else:
+                self.start_message = message
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small complete body: not worth compressing
+                self.passthrough = True
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+
+            self.compressor = self.middleware.create_compressor(self.encoding)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["content-length"]
+            if "etag" in headers:
+                headers["ETag"] = weaken_etag(headers["etag"])
+
+            if not more_body:
+                compressed = self.run(self.compressor.compress, body) + self.run(self.compressor.finish)
+                headers["Content-Length"] = str(len(compressed))
+                await self.downstream(self.start_message)
+                self.record(len(body), len(compressed))
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+
+            await self.downstream(self.start_message)
+
+        chunk = self.run(self.compressor.compress, body) if body else b""
+        if not more_body:
+            chunk += self.run(self.compressor.finish)
+        self.bytes_in += len(body)
+        self.bytes_out += len(chunk)
+        if not more_body:
+            self.record(self.bytes_in, self.bytes_out)
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def record(self, bytes_in: int, bytes_out: int) -> None:
+        """Report a finished compressed response to the metrics registry."""
+        prefix = f"compression.{self.encoding}"
+        metrics.increment(f"{prefix}.responses")
+        metrics.increment(f"{prefix}.bytes_in", bytes_in)
+        metrics.increment(f"{prefix}.bytes_out", bytes_out)
+        metrics.observe(f"{prefix}.cpu_time", self.cpu_time)
+        if bytes_out:
+            metrics.set_gauge(f"{prefix}.last_ratio", round(bytes_in / bytes_out, 3))
@@ -0,0 +1,53 @@
+from typing import Dict, Optional
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.deadline import current_deadline, set_deadline
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving each request a deadline.
+
+    The budget comes from the longest matching route prefix in `routes`,
+    otherwise from `default_ms` (0: no deadline). The X-Request-Timeout-Ms
+    header can only shorten it; on routes without a deadline it is capped
+    at `max_ms`. The budget is kept in a context variable: repositories turn what is left into maxTimeMS,
+    and password hashing is skipped once it has run out.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Dict[str, int], default_ms: int = 0, max_ms: int = 30000):
+        self.app = app
+        # Longest prefix first, so the most specific policy wins
+        self.routes = sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+        self.default_ms = default_ms
+        self.max_ms = max_ms
+
+    def budget_ms(self, scope: Scope) -> Optional[int]:
+        budget = self.route_budget_ms(scope["path"])
+        requested = Headers(scope=scope).get(DEADLINE_HEADER)
+        if requested is not None:
+            try:
+                return max(1, min(int(requested), budget or self.max_ms))
+            except ValueError:
+                pass
+        return budget
+
+    def route_budget_ms(self, path: str) -> Optional[int]:
+        for prefix, budget in self.routes:
+            if path.startswith(prefix):
+                return budget or None
+        return self.default_ms or None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = self.budget_ms(scope)
+        token = set_deadline(budget / 1000 if budget else None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
@@ -0,0 +1,92 @@
+from fastapi import HTTPException, Request, Response, status, Depends
+from typing import Any, Dict, Iterable, List, Mapping, Union
+import hashlib
+
+from app.middleware.auth import get_current_active_user
+from app.models.user import User
+
+def _digest(*parts: object) -> str:
+    """Hash the given parts into a short hex digest."""
+    hasher = hashlib.sha1()
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+UserLike = Union[User, Mapping[str, Any]]
+
+def user_version(user: UserLike) -> str:
+    """
+    Return "<id>:<last update>" for a User or a raw/projected user document.
+    The value changes whenever the user's representation changes.
+    """
+    if isinstance(user, Mapping):
+        user_id = user.get("id", user.get("_id"))
+        version = user.get("updated_at") or user.get("created_at")
+    else:
+        user_id = user.id
+        version = user.updated_at or user.created_at
+    return f"{user_id}:{version.isoformat() if version else ''}"
+
+def user_etag(user: UserLike, *extra: object) -> str:
+    """Strong ETag for a single user derived from its ID and last update time."""
+    return f'"{_digest(user_version(user), *extra)}"'
+
+def users_page_etag(users: Iterable[UserLike], *extra: object) -> str:
+    """
+    Weak ETag for a page of users.
+    Extra values (total, page, size, fields...) are folded into the tag.
+    """
+    parts: List[object] = [user_version(user) for user in users]
+    return f'W/"{_digest(*parts, *extra)}"'
+
+def _opaque_tag(etag: str) -> str:
+    """Strip the weak indicator so tags can be compared weakly."""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+class ConditionalRequest:
+    """
+    Conditional GET helper usable as a dependency.
+    Call `check` with the current ETag before building the response body:
+    a matching If-None-Match short-circuits with 304 Not Modified,
+    otherwise the ETag is attached to the outgoing response.
+    Routes returning a Response directly should pass `headers` along.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+        self.headers: Dict[str, str] = {}
+
+    def matches(self, etag: str) -> bool:
+        """Check If-None-Match using weak comparison (RFC 7232)."""
+        header = self.request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+
+        current = _opaque_tag(etag)
+        return any(_opaque_tag(candidate) == current for candidate in header.split(","))
+
+    def check(self, etag: str, cache_control: str = "private, no-cache") -> None:
+        """Raise 304 if the client copy is current, otherwise set the ETag header."""
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if self.matches(etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        self.headers.update(headers)
+        self.response.headers.update(headers)
+
+async def get_current_user_if_modified(
+    conditional: ConditionalRequest = Depends(),
+    current_user: User = Depends(get_current_active_user)
+) -> User:
+    """
+    Get current active user, answering 304 when the client already holds
+    the latest representation. With the user cache this avoids the database
+    and response serialization entirely. The route path is part of the tag,
+    since each route using this renders the user differently.
+    """
+    conditional.check(user_etag(current_user, conditional.request.url.path))
+    return current_user
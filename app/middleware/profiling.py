@@ -0,0 +1,203 @@
+from datetime import datetime
+from typing import List
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import cProfile
+import io
+import os
+import pstats
+import time
+import uuid
+
+from app.core.circuit_breaker import DatabaseUnavailable
+from app.core.metrics import metrics
+from app.core.throttle import TokenBucket
+from app.repositories.user_repository import UserRepository
+from app.utils.auth import JWTManager
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - optional dependency
+    pyinstrument = None
+
+PROFILE_HEADER = b"x-profile"
+
+# The profilers follow the event loop thread: they include every request it ran
+# meanwhile, and miss work handed to the threadpool (password hashing runs there)
+PROFILE_NOTE = (
+    "Includes other requests this worker handled while profiling; "
+    "time spent in the threadpool (e.g. password hashing) is not attributed"
+)
+
+class _Profiler:
+    """
+    Profiler used for one request.
+    pyinstrument (statistical, async-aware: time spent awaiting Motor is
+    attributed to the awaiting call) when installed, cProfile otherwise.
+    """
+
+    def __init__(self):
+        if pyinstrument is not None:
+            self._profiler = pyinstrument.Profiler(async_mode="enabled")
+            self.extension = "html"
+        else:
+            self._profiler = cProfile.Profile()
+            self.extension = "prof"
+
+    def start(self) -> None:
+        if pyinstrument is not None:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if pyinstrument is not None:
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def text(self, limit: int = 60) -> str:
+        """Call tree (pyinstrument) or cumulative-time table (cProfile) as text."""
+        if pyinstrument is not None:
+            return self._profiler.output_text(unicode=True)
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def save(self, path: str) -> None:
+        if pyinstrument is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(path)
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling individual requests on demand.
+
+    A request opts in with the `X-Profile` header (`file` or `inline`).
+    The header is only honoured for admin access tokens, at most one
+    request is profiled at a time and triggers are rate limited.
+    Requests without the header go straight through. The profile covers
+    the event loop thread, so concurrent requests show up in it while
+    threadpool work (bcrypt/argon2) does not; responses say so in the
+    `X-Profile-Note` header (and the inline report).
+
+    - `file`: the profile is written to `output_dir` and its name is
+      returned in the `X-Profile-File` response header
+    - `inline`: the response body is replaced by the text report
+    """
+
+    def __init__(self, app: ASGIApp, output_dir: str, per_minute: float = 6, burst: int = 2):
+        self.app = app
+        self.output_dir = output_dir
+        self.bucket = TokenBucket(burst, per_minute / 60)
+        self.bucket_state = None
+        self.active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        mode = headers.get("x-profile", "").strip().lower()
+        if mode not in ("file", "inline") or not await self.allow(headers):
+            await self.app(scope, receive, send)
+            return
+
+        # allow() claimed the profiling slot
+        try:
+            await self.profile(scope, receive, send, mode)
+        finally:
+            self.active = False
+
+    async def allow(self, headers: Headers) -> bool:
+        """
+        Check concurrency, authorization and the rate limit for a trigger.
+        The slot is claimed before awaiting the admin check, so two triggers
+        cannot both pass; it stays claimed only when True is returned.
+        """
+        if self.active:
+            metrics.increment("profiling.skipped.busy")
+            return False
+        self.active = True
+        try:
+            if not await self.is_admin(headers.get("authorization", "")):
+                metrics.increment("profiling.skipped.unauthorized")
+                self.active = False
+                return False
+        except BaseException:
+            self.active = False
+            raise
+        self.bucket_state, wait = self.bucket.consume(self.bucket_state, time.monotonic())
+        if wait > 0:
+            metrics.increment("profiling.skipped.rate_limited")
+            self.active = False
+            return False
+        return True
+
+    @staticmethod
+    async def is_admin(authorization: str) -> bool:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        payload = JWTManager.verify_token(token, token_type="access")
+        if not payload or not payload.get("sub"):
+            return False
+        try:
+            user = await UserRepository.get_cached_by_id(payload["sub"])
+        except DatabaseUnavailable:
+            # The request itself will get the 503; just don't profile it
+            return False
+        return user is not None and user.is_active and user.is_admin
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send, mode: str) -> None:
+        profiler = _Profiler()
+        messages: List[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        profiler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profiler.stop()
+            metrics.increment("profiling.requests")
+            metrics.observe("profiling.profiled_time", time.perf_counter() - started)
+
+        if mode == "inline":
+            status = next((m["status"] for m in messages if m["type"] == "http.response.start"), 500)
+            body = f"{PROFILE_NOTE}.\n\n{profiler.text()}".encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profiled-status", str(status).encode()),
+                    (b"x-profile-note", PROFILE_NOTE.encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        name = self.save(profiler, scope)
+        for message in messages:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-profile-file", name.encode()),
+                    (b"x-profile-note", PROFILE_NOTE.encode()),
+                ]
+            await send(message)
+
+    def save(self, profiler: _Profiler, scope: Scope) -> str:
+        """Write the profile to the output directory and return its file name."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path_part = scope["path"].strip("/").replace("/", "_") or "root"
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}_{path_part}_{uuid.uuid4().hex[:8]}.{profiler.extension}"
+        profiler.save(os.path.join(self.output_dir, name))
+        return name
@@ -0,0 +1,47 @@
+import re
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logs import current_request_id
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Accepted incoming ids (anything else is replaced, so logs cannot be spoofed with junk)
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving each request a correlation id.
+
+    The id comes from the X-Request-ID header when it is well formed,
+    otherwise a new one is generated. It is kept in a context variable,
+    so every log record written while handling the request carries it,
+    and it is echoed in the X-Request-ID response header. It is also put
+    in `request.state`, for the 500 handler: that runs in the outermost
+    middleware, after this one has returned.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if request_id is None or not VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = current_request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            current_request_id.reset(token)
@@ -0,0 +1,22 @@
+from pydantic import Field
+from datetime import datetime
+
+from app.models.user import User
+
+class ArchivedUser(User):
+    """
+    Long-inactive user moved out of the `users` collection.
+    Keeps every user field (and the original _id) so it can be restored.
+    Email and username are not unique here: registration checks both
+    collections, and a restore re-checks the identity against `users`,
+    whose unique indexes turn a race into a 409.
+    """
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "users_archive"  # MongoDB collection name
+        indexes = [
+            "email",
+            "username",
+            "archived_at"
+        ]
@@ -0,0 +1,16 @@
+from beanie import Document
+from pydantic import Field
+from typing import Dict, Optional
+from datetime import datetime
+
+class Counter(Document):
+    """
+    Named group of maintained counters (e.g. "users": total/active).
+    Values are updated atomically with $inc and periodically reconciled.
+    """
+    id: str = Field(..., description="Counter group name")
+    values: Dict[str, int] = Field(default_factory=dict, description="Counter values by key")
+    reconciled_at: Optional[datetime] = Field(default=None)
+    
+    class Settings:
+        name = "counters"  # MongoDB collection name
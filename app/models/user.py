@@ -1,5 +1,6 @@
 from beanie import Document
 from pydantic import Field, EmailStr
+from pymongo import ASCENDING, IndexModel
 from typing import Optional
 from datetime import datetime
 
@@ -21,9 +22,22 @@ class User(Document):
     class Settings:
         name = "users"  # MongoDB collection name
         indexes = [
-            "email",
-            "username",
-            "created_at"
+            # Settle identity races between requests that both passed the
+            # availability check (Field(unique=True) alone creates no index)
+            IndexModel([("email", ASCENDING)], unique=True),
+            IndexModel([("username", ASCENDING)], unique=True),
+            # Listings only ever page through live accounts
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="created_at_active",
+                partialFilterExpression={"is_active": True}
+            ),
+            # Lets the archival job find long-inactive accounts
+            IndexModel(
+                [("updated_at", ASCENDING)],
+                name="updated_at_inactive",
+                partialFilterExpression={"is_active": False}
+            )
         ]
     
     def __repr__(self):
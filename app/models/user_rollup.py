@@ -0,0 +1,20 @@
+from beanie import Document
+from pydantic import Field
+from typing import Dict, Optional
+from datetime import datetime
+
+class UserRollup(Document):
+    """
+    Signup and activity totals for one UTC hour or day.
+    _id is "<granularity>:<period>" (e.g. "day:2024-01-05", "hour:2024-01-05T13"),
+    so a date range is a range scan on _id.
+    """
+    id: str = Field(..., description="Granularity and period key")
+    granularity: str = Field(..., description="hour or day")
+    period_start: datetime = Field(..., description="Start of the period (UTC)")
+    values: Dict[str, int] = Field(default_factory=dict, description="signups, activations, deactivations, deletions")
+    active: Optional[int] = Field(default=None, description="Active users at the last refresh in the period")
+    backfilled_at: Optional[datetime] = Field(default=None)
+    
+    class Settings:
+        name = "user_rollups"  # MongoDB collection name
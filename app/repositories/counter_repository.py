@@ -0,0 +1,51 @@
+from typing import Dict, Optional
+from app.models.counter import Counter
+from app.core.circuit_breaker import guarded_repository
+from app.core.deadline import deadline_bound
+from app.core.query_monitor import monitored_repository
+from app.core.read_routing import read_router
+from datetime import datetime
+
+USER_COUNTERS = "users"
+
+@guarded_repository
+@deadline_bound
+@monitored_repository
+class CounterRepository:
+    """
+    Repository for maintained counters.
+    Reads are a single _id lookup, so counts cost O(1) regardless of collection size.
+    """
+    
+    @staticmethod
+    async def increment(name: str, **deltas: int) -> None:
+        """Atomically add the given deltas to a counter group (upserting it)."""
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not deltas:
+            return
+        
+        await Counter.get_motor_collection().update_one(
+            {"_id": name},
+            {"$inc": {f"values.{key}": value for key, value in deltas.items()}},
+            upsert=True
+        )
+    
+    @staticmethod
+    async def get(name: str) -> Optional[Dict[str, int]]:
+        """Get counter values, or None if the group has never been written."""
+        document = await read_router.collection(Counter).find_one({"_id": name}, {"values": 1})
+        if document is None:
+            return None
+        return document.get("values", {})
+    
+    @staticmethod
+    async def set(name: str, values: Dict[str, int]) -> None:
+        """Overwrite counter values (used by reconciliation)."""
+        await Counter.get_motor_collection().update_one(
+            {"_id": name},
+            {"$set": {
+                **{f"values.{key}": value for key, value in values.items()},
+                "reconciled_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
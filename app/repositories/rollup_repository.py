@@ -0,0 +1,123 @@
+from typing import Dict, List
+from app.models.user import User
+from app.models.archived_user import ArchivedUser
+from app.models.user_rollup import UserRollup
+from app.core.circuit_breaker import guarded_repository
+from app.core.deadline import deadline_bound
+from app.core.query_monitor import monitored_repository
+from app.core.read_routing import read_tolerant, read_router
+from pymongo import UpdateOne
+from datetime import datetime, timedelta
+
+# Period key format per granularity (also used as $dateToString format)
+PERIOD_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+
+def period_start(granularity: str, moment: datetime) -> datetime:
+    """Start of the hour or day containing `moment`."""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_id(granularity: str, start: datetime) -> str:
+    return f"{granularity}:{start.strftime(PERIOD_FORMATS[granularity])}"
+
+@guarded_repository
+@deadline_bound
+@monitored_repository
+class RollupRepository:
+    """
+    Repository for precomputed user rollups.
+    Every change updates the hourly and daily document of its period
+    with one unordered bulk_write, so dashboards read a few small
+    documents instead of aggregating the users collection.
+    """
+    
+    @staticmethod
+    async def record(moment: datetime, **deltas: int) -> None:
+        """Add the given deltas (e.g. signups=1) to the rollups of `moment`."""
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not deltas:
+            return
+    
+        await UserRollup.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"_id": rollup_id(granularity, period_start(granularity, moment))},
+                {
+                    "$inc": {f"values.{key}": value for key, value in deltas.items()},
+                    "$setOnInsert": {"granularity": granularity, "period_start": period_start(granularity, moment)}
+                },
+                upsert=True
+            )
+            for granularity in PERIOD_FORMATS
+        ], ordered=False)
+    
+    @staticmethod
+    async def set_active(moment: datetime, active: int) -> None:
+        """Store the current number of active users on the rollups of `moment`."""
+        await UserRollup.get_motor_collection().bulk_write([
+            UpdateOne(
+                {"_id": rollup_id(granularity, period_start(granularity, moment))},
+                {
+                    "$set": {"active": active},
+                    "$setOnInsert": {"granularity": granularity, "period_start": period_start(granularity, moment)}
+                },
+                upsert=True
+            )
+            for granularity in PERIOD_FORMATS
+        ], ordered=False)
+    
+    @staticmethod
+    @read_tolerant
+    async def get_range(granularity: str, start: datetime, end: datetime) -> List[Dict]:
+        """Rollup documents for the periods starting in [start, end), oldest first."""
+        cursor = read_router.collection(UserRollup).find(
+            {"_id": {"$gte": rollup_id(granularity, start), "$lt": rollup_id(granularity, end)}},
+            {"values": 1, "active": 1, "period_start": 1}
+        ).sort("_id", 1)
+        return await cursor.to_list(length=None)
+    
+    @staticmethod
+    async def backfill(granularity: str, start: datetime, end: datetime) -> int:
+        """
+        Recompute signups for the closed periods in [start, end) from the
+        live and archived users with one $group per collection.
+        
+        The recount is merged with $max: it raises periods that missed
+        increments (e.g. written before rollups existed) but never lowers
+        one, so hard-deleted users stay counted. The period in progress is
+        left to the incremental counts, which a recount could race with.
+        Activations, deactivations and deletions have no history to rebuild
+        from and are kept. Returns the number of periods written.
+        """
+        end = min(end, period_start(granularity, datetime.utcnow()))
+        signups: Dict[str, int] = {}
+        pipeline = [
+            {"$match": {"created_at": {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": PERIOD_FORMATS[granularity], "date": "$created_at"}},
+                "signups": {"$sum": 1}
+            }}
+        ]
+        for model in (User, ArchivedUser):
+            async for group in model.get_motor_collection().aggregate(pipeline):
+                signups[group["_id"]] = signups.get(group["_id"], 0) + group["signups"]
+    
+        step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+        now = datetime.utcnow()
+        operations = []
+        moment = period_start(granularity, start)
+        while moment < end:
+            key = moment.strftime(PERIOD_FORMATS[granularity])
+            operations.append(UpdateOne(
+                {"_id": f"{granularity}:{key}"},
+                {
+                    "$max": {"values.signups": signups.get(key, 0)},
+                    "$set": {"backfilled_at": now},
+                    "$setOnInsert": {"granularity": granularity, "period_start": moment}
+                },
+                upsert=True
+            ))
+            moment += step
+        if operations:
+            await UserRollup.get_motor_collection().bulk_write(operations, ordered=False)
+        return len(operations)
@@ -0,0 +1,113 @@
+from typing import List, Optional
+from app.models.user import User
+from app.models.archived_user import ArchivedUser
+from app.core.circuit_breaker import guarded_repository
+from app.core.deadline import deadline_bound
+from app.core.invalidation import invalidation_bus, USER
+from app.core.query_monitor import monitored_repository
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.rollup_repository import RollupRepository
+from beanie import PydanticObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+
+@guarded_repository
+@deadline_bound
+@monitored_repository
+class UserArchiveRepository:
+    """
+    Moves long-inactive users between `users` and `users_archive`.
+    Documents keep their _id, so a move can be safely retried.
+    """
+    
+    @staticmethod
+    def _archivable_filter(cutoff: datetime) -> dict:
+        return {
+            "is_active": False,
+            "$or": [
+                {"updated_at": {"$lt": cutoff}},
+                {"updated_at": None, "created_at": {"$lt": cutoff}}
+            ]
+        }
+    
+    @staticmethod
+    async def find_archivable(cutoff: datetime, limit: int) -> List[dict]:
+        """Up to `limit` raw user documents inactive since before `cutoff` (read only)."""
+        return await User.get_motor_collection().find(
+            UserArchiveRepository._archivable_filter(cutoff), limit=limit
+        ).to_list(length=limit)
+    
+    @staticmethod
+    async def archive_batch(cutoff: datetime, batch_size: int) -> List[str]:
+        """
+        Archive up to `batch_size` users inactive since before `cutoff`.
+        Returns the IDs of the users moved.
+        """
+        users = User.get_motor_collection()
+        archive = ArchivedUser.get_motor_collection()
+        
+        documents = await UserArchiveRepository.find_archivable(cutoff, batch_size)
+        if not documents:
+            return []
+        
+        # Copy first (idempotent upserts), then remove from the live collection
+        archived_at = datetime.utcnow()
+        await archive.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in documents],
+            ordered=False
+        )
+        ids = [doc["_id"] for doc in documents]
+        result = await users.delete_many({"_id": {"$in": ids}, "is_active": False})
+        
+        if result.deleted_count < len(ids):
+            # Reactivated while being archived: drop their archive copies
+            remaining = {doc["_id"] async for doc in users.find({"_id": {"$in": ids}}, {"_id": 1})}
+            if remaining:
+                await archive.delete_many({"_id": {"$in": list(remaining)}})
+            ids = [user_id for user_id in ids if user_id not in remaining]
+        
+        await CounterRepository.increment(USER_COUNTERS, total=-len(ids))
+        await invalidation_bus.publish(USER, ids, reason="archive")
+        return [str(user_id) for user_id in ids]
+    
+    @staticmethod
+    async def get(user_id: str) -> Optional[ArchivedUser]:
+        """Get an archived user by ID."""
+        if not PydanticObjectId.is_valid(user_id):
+            return None
+        return await ArchivedUser.get(PydanticObjectId(user_id))
+    
+    @staticmethod
+    async def restore(user_id: str, activate: bool = True) -> Optional[User]:
+        """
+        Move an archived user back into the `users` collection.
+        Copy first, then remove the archive copy. If the user is already
+        back (a concurrent or interrupted restore), only the archive copy
+        is removed and nothing is counted again. A DuplicateKeyError on
+        another key (email/username taken meanwhile) is raised.
+        """
+        if not PydanticObjectId.is_valid(user_id):
+            return None
+        object_id = PydanticObjectId(user_id)
+        
+        archive = ArchivedUser.get_motor_collection()
+        document = await archive.find_one({"_id": object_id})
+        if document is None:
+            return None
+        
+        document.pop("archived_at", None)
+        document["is_active"] = activate
+        document["updated_at"] = datetime.utcnow()
+        try:
+            await User.get_motor_collection().insert_one(document)
+        except DuplicateKeyError:
+            existing = await User.get_motor_collection().find_one({"_id": object_id})
+            if existing is None:
+                raise
+            await archive.delete_one({"_id": object_id})
+            return User.model_validate(existing)
+        await archive.delete_one({"_id": object_id})
+        await CounterRepository.increment(USER_COUNTERS, total=1, active=int(activate))
+        await RollupRepository.record(document["updated_at"], activations=int(activate))
+        return User.model_validate(document)
@@ -1,13 +1,34 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 from app.models.user import User
+from app.models.archived_user import ArchivedUser
 from app.schemas.user_schema import UserCreate, UserUpdate
+from app.core.cache import user_cache
+from app.core.circuit_breaker import guarded_repository
+from app.core.deadline import deadline_bound
+from app.core.invalidation import invalidation_bus, USER
+from app.core.query_monitor import monitored_repository
+from app.core.read_routing import read_critical, read_tolerant, read_router
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.rollup_repository import RollupRepository
 from beanie import PydanticObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
+@guarded_repository
+@deadline_bound
+@monitored_repository
 class UserRepository:
     """
     Repository class for User model with MongoDB.
     Handles all database operations for users following the Repository pattern.
+    
+    Reads are tagged @read_critical (auth and uniqueness checks, always on
+    the primary) or @read_tolerant (listings, search and counts, which may
+    be served by secondaries when read routing is enabled).
+    
+    Malformed IDs are misses (None / False). Database timeouts and
+    connection errors are not: they raise DatabaseUnavailable through
+    the circuit breaker.
     """
     
     @staticmethod
@@ -19,27 +40,73 @@ class UserRepository:
         
         user = User(**user_dict)
         await user.insert()
+        await CounterRepository.increment(USER_COUNTERS, total=1, active=int(user.is_active))
+        await RollupRepository.record(user.created_at, signups=1)
         return user
     
     @staticmethod
+    @read_critical
     async def get_by_id(user_id: str) -> Optional[User]:
         """Get user by ID."""
-        try:
-            return await User.get(PydanticObjectId(user_id))
-        except:
+        if not PydanticObjectId.is_valid(user_id):
             return None
+        return await User.get(PydanticObjectId(user_id))
+    
+    @staticmethod
+    @read_critical
+    async def get_cached_by_id(user_id: str) -> Optional[User]:
+        """
+        Get user by ID, serving repeated lookups from the in-process cache.
+        Callers get their own copy: the cached instance is never handed out,
+        so a request changing its user cannot leak into other requests.
+        """
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user.model_copy()
+        
+        user = await UserRepository.get_by_id(user_id)
+        if user is not None:
+            user_cache.set(user_id, user.model_copy())
+        return user
     
     @staticmethod
+    @read_critical
+    async def get_many_cached(user_ids: List[str]) -> Dict[str, User]:
+        """
+        Get several users by ID. Cached users are served from memory (as
+        copies, like get_cached_by_id) and the rest are fetched with a
+        single $in query.
+        """
+        users: Dict[str, User] = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            user = user_cache.get(user_id)
+            if user is not None:
+                users[user_id] = user.model_copy()
+            elif PydanticObjectId.is_valid(user_id):
+                missing.append(PydanticObjectId(user_id))
+        
+        if missing:
+            async for user in User.find({"_id": {"$in": missing}}):
+                user_id = str(user.id)
+                user_cache.set(user_id, user.model_copy())
+                users[user_id] = user
+        return users
+    
+    @staticmethod
+    @read_critical
     async def get_by_email(email: str) -> Optional[User]:
         """Get user by email."""
         return await User.find_one(User.email == email)
     
     @staticmethod
+    @read_critical
     async def get_by_username(username: str) -> Optional[User]:
         """Get user by username."""
         return await User.find_one(User.username == username)
     
     @staticmethod
+    @read_critical
     async def get_by_email_or_username(identifier: str) -> Optional[User]:
         """Get user by email or username."""
         return await User.find_one(
@@ -50,98 +117,340 @@ class UserRepository:
         )
     
     @staticmethod
+    @read_tolerant
     async def get_all(skip: int = 0, limit: int = 100, active_only: bool = True) -> List[User]:
         """Get all users with pagination."""
-        query = User.find()
-        if active_only:
-            query = User.find(User.is_active == True)
-        return await query.skip(skip).limit(limit).to_list()
+        query = {"is_active": True} if active_only else {}
+        cursor = read_router.collection(User).find(query, skip=skip, limit=limit)
+        return [User.model_validate(document) async for document in cursor]
+    
+    @staticmethod
+    @read_tolerant
+    async def get_all_projected(
+        projection: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 100,
+        active_only: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Get raw user documents limited to the projected fields."""
+        query = {"is_active": True} if active_only else {}
+        cursor = read_router.collection(User).find(query, projection, skip=skip, limit=limit)
+        return await cursor.to_list(length=limit)
+    
+    @staticmethod
+    @read_tolerant
+    async def get_by_id_projected(user_id: str, projection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Get a raw user document by ID limited to the projected fields."""
+        if not PydanticObjectId.is_valid(user_id):
+            return None
+        return await read_router.collection(User).find_one({"_id": PydanticObjectId(user_id)}, projection)
+    
+    @staticmethod
+    @read_tolerant
+    async def count(active_only: bool = True, estimated: bool = False) -> int:
+        """
+        Count total users from the maintained counters.
+        With `estimated`, the total comes from collection metadata instead.
+        """
+        if estimated and not active_only:
+            return await read_router.collection(User).estimated_document_count()
+        
+        counters = await CounterRepository.get(USER_COUNTERS)
+        if counters is None:
+            counters = await UserRepository.reconcile_counters()
+        return counters.get("active" if active_only else "total", 0)
+    
+    @staticmethod
+    @read_critical
+    async def count_exact(active_only: bool = True) -> int:
+        """
+        Count users by scanning the collection (used for reconciliation).
+        Always on the primary: the result overwrites the maintained counters.
+        """
+        query = {"is_active": True} if active_only else {}
+        return await read_router.collection(User).count_documents(query)
     
     @staticmethod
-    async def count(active_only: bool = True) -> int:
-        """Count total users."""
-        if active_only:
-            return await User.find(User.is_active == True).count()
-        return await User.count()
+    async def reconcile_counters() -> Dict[str, int]:
+        """Reset the maintained user counters to the real counts."""
+        counters = {
+            "total": await UserRepository.count_exact(active_only=False),
+            "active": await UserRepository.count_exact(active_only=True)
+        }
+        await CounterRepository.set(USER_COUNTERS, counters)
+        return counters
     
     @staticmethod
     async def update(user_id: str, user_data: UserUpdate) -> Optional[User]:
-        """Update user information."""
-        try:
-            user = await User.get(PydanticObjectId(user_id))
-            if not user:
-                return None
-            
-            update_data = user_data.dict(exclude_unset=True)
-            for field, value in update_data.items():
-                if hasattr(user, field):
-                    setattr(user, field, value)
-            
-            user.updated_at = datetime.utcnow()
-            await user.save()
-            return user
-        except:
+        """
+        Update user information with a single atomic $set.
+        A change of is_active is applied with a conditional update that only
+        matches when the flag actually flips, so concurrent updates cannot
+        count the same activation or deactivation twice.
+        """
+        if not PydanticObjectId.is_valid(user_id):
             return None
+        object_id = PydanticObjectId(user_id)
+        collection = User.get_motor_collection()
+        changes = user_data.dict(exclude_unset=True, exclude_none=True)
+        changes["updated_at"] = datetime.utcnow()
+        
+        document = None
+        if "is_active" in changes:
+            document = await collection.find_one_and_update(
+                {"_id": object_id, "is_active": {"$ne": changes["is_active"]}},
+                {"$set": changes},
+                return_document=ReturnDocument.AFTER
+            )
+        transitioned = document is not None
+        if document is None:
+            document = await collection.find_one_and_update(
+                {"_id": object_id},
+                {"$set": changes},
+                return_document=ReturnDocument.AFTER
+            )
+        if document is None:
+            return None
+        
+        await invalidation_bus.publish(USER, [user_id], reason="update")
+        if transitioned:
+            is_active = changes["is_active"]
+            await CounterRepository.increment(USER_COUNTERS, active=1 if is_active else -1)
+            await RollupRepository.record(
+                changes["updated_at"], activations=int(is_active), deactivations=int(not is_active)
+            )
+        return User.model_validate(document)
+    
+    @staticmethod
+    async def update_password(user_id: str, hashed_password: str) -> bool:
+        """
+        Replace a user's password hash (and bump updated_at) with a single
+        atomic update. Returns False when the user does not exist.
+        """
+        if not PydanticObjectId.is_valid(user_id):
+            return False
+        result = await User.get_motor_collection().update_one(
+            {"_id": PydanticObjectId(user_id)},
+            {"$set": {"hashed_password": hashed_password, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count != 1:
+            return False
+        await invalidation_bus.publish(USER, [user_id], reason="password")
+        return True
     
     @staticmethod
     async def delete(user_id: str) -> bool:
-        """Delete user (soft delete by setting is_active=False)."""
-        try:
-            user = await User.get(PydanticObjectId(user_id))
-            if not user:
-                return False
-            
-            user.is_active = False
-            user.updated_at = datetime.utcnow()
-            await user.save()
-            return True
-        except:
+        """
+        Delete user (soft delete by setting is_active=False).
+        Only the request that actually deactivates the user updates the counters.
+        """
+        if not PydanticObjectId.is_valid(user_id):
             return False
+        object_id = PydanticObjectId(user_id)
+        collection = User.get_motor_collection()
+        now = datetime.utcnow()
+        
+        document = await collection.find_one_and_update(
+            {"_id": object_id, "is_active": True},
+            {"$set": {"is_active": False, "updated_at": now}}
+        )
+        if document is None:
+            # Already inactive, or no such user
+            return await collection.count_documents({"_id": object_id}, limit=1) == 1
+        
+        await invalidation_bus.publish(USER, [user_id], reason="deactivate")
+        await CounterRepository.increment(USER_COUNTERS, active=-1)
+        await RollupRepository.record(now, deactivations=1)
+        return True
     
     @staticmethod
     async def hard_delete(user_id: str) -> bool:
         """Permanently delete user from database."""
-        try:
-            user = await User.get(PydanticObjectId(user_id))
-            if not user:
-                return False
-            
-            await user.delete()
-            return True
-        except:
+        if not PydanticObjectId.is_valid(user_id):
             return False
+        
+        # The deleted document says whether an active user was removed
+        document = await User.get_motor_collection().find_one_and_delete({"_id": PydanticObjectId(user_id)})
+        if document is None:
+            return False
+        
+        await invalidation_bus.publish(USER, [user_id], reason="delete")
+        await CounterRepository.increment(USER_COUNTERS, total=-1, active=-int(document.get("is_active", False)))
+        await RollupRepository.record(datetime.utcnow(), deletions=1)
+        return True
+    
+    @staticmethod
+    def _bulk_filter(
+        criteria: Dict[str, Any],
+        user_ids: Optional[List[str]] = None,
+        exclude_user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Combine filter criteria, an optional ID list and an excluded ID.
+        Refuses an empty selection: bulk writes never apply to every user.
+        """
+        if not criteria and user_ids is None:
+            raise ValueError("Bulk operations need filter criteria or a list of user IDs")
+        clauses = [criteria] if criteria else []
+        if user_ids is not None:
+            ids = [PydanticObjectId(user_id) for user_id in user_ids if PydanticObjectId.is_valid(user_id)]
+            clauses.append({"_id": {"$in": ids}})
+        if exclude_user_id:
+            clauses.append({"_id": {"$ne": PydanticObjectId(exclude_user_id)}})
+        return {"$and": clauses}
+    
+    @staticmethod
+    async def _invalidate_bulk(user_ids: Optional[List[str]], reason: str) -> None:
+        """Evict the listed users, or every cached user when the selection was a filter."""
+        if user_ids is None:
+            await invalidation_bus.publish_all(USER, reason=reason)
+        else:
+            await invalidation_bus.publish(USER, user_ids, reason=reason)
+    
+    @staticmethod
+    async def bulk_set_flags(
+        flags: Dict[str, bool],
+        criteria: Dict[str, Any],
+        user_ids: Optional[List[str]] = None,
+        exclude_user_id: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Set activation or admin flags on every matching user with a single
+        update_many. Users already in the target state are not rewritten,
+        so the modified count is the number of users whose state changed.
+        Returns (matched, modified).
+        """
+        collection = User.get_motor_collection()
+        query = UserRepository._bulk_filter(criteria, user_ids, exclude_user_id)
+        # Counted first: the criteria may select on the flags being changed
+        unchanged = await collection.count_documents({"$and": [query, flags]})
+        result = await collection.update_many(
+            {"$and": [query, {"$or": [{field: {"$ne": value}} for field, value in flags.items()]}]},
+            {"$set": {**flags, "updated_at": datetime.utcnow()}}
+        )
+        
+        modified = result.modified_count
+        matched = unchanged + modified
+        if modified:
+            await UserRepository._invalidate_bulk(user_ids, reason="bulk_update")
+            if "is_active" in flags:
+                await CounterRepository.increment(USER_COUNTERS, active=modified if flags["is_active"] else -modified)
+                await RollupRepository.record(
+                    datetime.utcnow(), **{"activations" if flags["is_active"] else "deactivations": modified}
+                )
+        return matched, modified
+    
+    @staticmethod
+    async def bulk_hard_delete(
+        criteria: Dict[str, Any],
+        user_ids: Optional[List[str]] = None,
+        exclude_user_id: Optional[str] = None
+    ) -> int:
+        """
+        Permanently delete every matching user with delete_many. Active
+        users go first so the maintained counters can be adjusted from the
+        two deleted counts. Returns the number of users deleted.
+        """
+        collection = User.get_motor_collection()
+        query = UserRepository._bulk_filter(criteria, user_ids, exclude_user_id)
+        active = (await collection.delete_many({"$and": [query, {"is_active": True}]})).deleted_count
+        deleted = active + (await collection.delete_many(query)).deleted_count
+        
+        if deleted:
+            await UserRepository._invalidate_bulk(user_ids, reason="bulk_delete")
+            await CounterRepository.increment(USER_COUNTERS, total=-deleted, active=-active)
+            await RollupRepository.record(datetime.utcnow(), deletions=deleted)
+        return deleted
     
     @staticmethod
+    def _search_filter(query: str) -> Dict[str, Any]:
+        """Build the filter used to search active users by name, email, or username."""
+        return {"$and": [
+            {"is_active": True},
+            {"$or": [
+                {"first_name": {"$regex": query, "$options": "i"}},
+                {"last_name": {"$regex": query, "$options": "i"}},
+                {"email": {"$regex": query, "$options": "i"}},
+                {"username": {"$regex": query, "$options": "i"}}
+            ]}
+        ]}
+    
+    @staticmethod
+    @read_tolerant
     async def search(query: str, skip: int = 0, limit: int = 100) -> List[User]:
         """Search users by name, email, or username."""
-        return await User.find(
-            {"$and": [
-                {"is_active": True},
-                {"$or": [
-                    {"first_name": {"$regex": query, "$options": "i"}},
-                    {"last_name": {"$regex": query, "$options": "i"}},
-                    {"email": {"$regex": query, "$options": "i"}},
-                    {"username": {"$regex": query, "$options": "i"}}
-                ]}
-            ]}
-        ).skip(skip).limit(limit).to_list()
+        cursor = read_router.collection(User).find(
+            UserRepository._search_filter(query), skip=skip, limit=limit
+        )
+        return [User.model_validate(document) async for document in cursor]
+    
+    @staticmethod
+    @read_tolerant
+    async def search_projected(
+        query: str,
+        projection: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Search users returning raw documents limited to the projected fields."""
+        cursor = read_router.collection(User).find(
+            UserRepository._search_filter(query), projection, skip=skip, limit=limit
+        )
+        return await cursor.to_list(length=limit)
+    
+    @staticmethod
+    @read_critical
+    async def find_identity_conflicts(
+        email: Optional[str],
+        username: Optional[str],
+        exclude_user_id: Optional[str] = None
+    ) -> Set[str]:
+        """
+        Return which of "email" / "username" are already taken (archived
+        users included), checking both with one query per collection.
+        """
+        clauses = []
+        if email:
+            clauses.append({"email": email})
+        if username:
+            clauses.append({"username": username})
+        if not clauses:
+            return set()
+        
+        query: Dict[str, Any] = {"$or": clauses}
+        if exclude_user_id:
+            query["_id"] = {"$ne": PydanticObjectId(exclude_user_id)}
+        
+        conflicts: Set[str] = set()
+        for model in (User, ArchivedUser):
+            cursor = model.get_motor_collection().find(query, {"email": 1, "username": 1}, limit=len(clauses))
+            async for document in cursor:
+                if email and document.get("email") == email:
+                    conflicts.add("email")
+                if username and document.get("username") == username:
+                    conflicts.add("username")
+            if len(conflicts) == len(clauses):
+                break
+        return conflicts
     
     @staticmethod
+    @read_critical
     async def email_exists(email: str, exclude_user_id: Optional[str] = None) -> bool:
-        """Check if email already exists."""
+        """Check if email already exists (archived users keep theirs)."""
         query = {"email": email}
         if exclude_user_id:
             query["_id"] = {"$ne": PydanticObjectId(exclude_user_id)}
         
-        user = await User.find_one(query)
+        user = await User.find_one(query) or await ArchivedUser.find_one(query)
         return user is not None
     
     @staticmethod
+    @read_critical
     async def username_exists(username: str, exclude_user_id: Optional[str] = None) -> bool:
-        """Check if username already exists."""
+        """Check if username already exists (archived users keep theirs)."""
         query = {"username": username}
         if exclude_user_id:
             query["_id"] = {"$ne": PydanticObjectId(exclude_user_id)}
         
-        user = await User.find_one(query)
+        user = await User.find_one(query) or await ArchivedUser.find_one(query)
         return user is not None
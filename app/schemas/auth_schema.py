@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
 
 class UserLogin(BaseModel):
     """Schema for user login."""
@@ -44,3 +45,30 @@ class PasswordResetConfirm(BaseModel):
     """Schema for password reset confirmation."""
     token: str = Field(..., description="Reset token")
     new_password: str = Field(..., min_length=8, description="New password")
+
+class TokenIntrospectRequest(BaseModel):
+    """Schema for batch token introspection."""
+    tokens: List[str] = Field(
+        ..., min_length=1, max_length=settings.INTROSPECT_MAX_TOKENS,
+        description="Access tokens to verify"
+    )
+
+class IntrospectedUser(BaseModel):
+    """User state attached to an introspected token."""
+    id: str
+    username: str
+    email: str
+    is_active: bool
+    is_admin: bool
+
+class TokenIntrospection(BaseModel):
+    """Introspection result for a single token."""
+    active: bool = Field(..., description="Whether the token is currently usable")
+    status: str = Field(..., description="valid, invalid, expired, wrong_type, user_not_found or inactive_user")
+    claims: Optional[Dict[str, Any]] = Field(default=None, description="Verified token claims")
+    user: Optional[IntrospectedUser] = None
+    expires_in: Optional[int] = Field(default=None, description="Seconds until the token expires (cache hint)")
+
+class TokenIntrospectResponse(BaseModel):
+    """Schema for batch token introspection response (in request order)."""
+    results: List[TokenIntrospection]
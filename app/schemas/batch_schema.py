@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+class BatchSubRequest(BaseModel):
+    """Schema for a single request inside a batch."""
+    method: str = Field("GET", pattern="^(GET|POST|PUT|PATCH|DELETE)$", description="HTTP method")
+    path: str = Field(..., description="Request path including query string, e.g. /api/v1/auth/me")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Extra request headers")
+    body: Optional[Any] = Field(None, description="JSON request body")
+
+class BatchRequest(BaseModel):
+    """Schema for a batch of sub-requests."""
+    requests: List[BatchSubRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_MAX_REQUESTS,
+        description="Sub-requests to execute"
+    )
+
+class BatchSubResponse(BaseModel):
+    """Schema for the result of a single sub-request."""
+    status: int = Field(..., description="HTTP status code")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Response headers")
+    body: Optional[Any] = Field(None, description="Decoded response body")
+
+class BatchResponse(BaseModel):
+    """Schema for batch results, in request order."""
+    responses: List[BatchSubResponse]
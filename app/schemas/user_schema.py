@@ -1,6 +1,9 @@
-from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, validator, model_validator, Field, TypeAdapter, create_model
+from typing import List, Literal, Optional, Tuple, Type, NamedTuple
+from functools import lru_cache
 from datetime import datetime
+from app.core.config import settings
+from app.core.memory import memory_accounting
 
 # Base schemas
 class UserBase(BaseModel):
@@ -37,23 +40,122 @@ class UserUpdate(BaseModel):
     is_active: Optional[bool] = None
     is_admin: Optional[bool] = None
 
+class BulkUserFilter(BaseModel):
+    is_active: Optional[bool] = Field(None, description="Only active (true) or inactive (false) users")
+    is_admin: Optional[bool] = Field(None, description="Only admins (true) or non-admins (false)")
+    created_before: Optional[datetime] = Field(None, description="Created before this time")
+    created_after: Optional[datetime] = Field(None, description="Created at or after this time")
+    updated_before: Optional[datetime] = Field(None, description="Last updated before this time")
+
+class BulkUserAction(BaseModel):
+    action: Literal["activate", "deactivate", "make_admin", "remove_admin", "hard_delete"]
+    user_ids: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        max_length=settings.BULK_MAX_USER_IDS,
+        description="Users to act on"
+    )
+    filter: Optional[BulkUserFilter] = Field(None, description="Act on every user matching this filter instead")
+    
+    @model_validator(mode="after")
+    def one_selection(self):
+        # Not asserts: these must hold under python -O as well
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError('Give either user_ids or filter')
+        if self.filter is not None and not self.filter.dict(exclude_none=True):
+            raise ValueError('Filter needs at least one condition')
+        return self
+
 # Response schemas
 class UserResponse(UserBase):
-    id: int
+    id: str
     is_active: bool
     is_admin: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
     
+    @validator('id', pre=True)
+    def id_to_str(cls, v):
+        return str(v)
+    
     class Config:
         from_attributes = True
 
+class BulkUserResult(BaseModel):
+    action: str
+    matched: int = Field(..., description="Users selected")
+    modified: int = Field(..., description="Users changed (already in the target state are not)")
+
 class UserListResponse(BaseModel):
     users: list[UserResponse]
     total: int
     page: int
     size: int
 
+# Sparse fieldset schemas
+USER_RESPONSE_FIELDS: Tuple[str, ...] = tuple(UserResponse.model_fields)
+
+class SparseUserSchemas(NamedTuple):
+    item: Type[BaseModel]
+    items: TypeAdapter
+    page: Type[BaseModel]
+
+def parse_user_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated `fields` parameter into a canonical tuple.
+    Returns all response fields when no fields are requested.
+    """
+    if not fields:
+        return USER_RESPONSE_FIELDS
+    
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(USER_RESPONSE_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))}. "
+            f"Allowed fields: {', '.join(USER_RESPONSE_FIELDS)}"
+        )
+    return tuple(name for name in USER_RESPONSE_FIELDS if name in requested)
+
+@lru_cache(maxsize=128)
+def get_sparse_user_schemas(fields: Tuple[str, ...]) -> SparseUserSchemas:
+    """
+    Build (and cache) response schemas limited to the given fields.
+    `fields` must be canonical, as returned by parse_user_fields.
+    """
+    suffix = "_".join(fields)
+    item = create_model(
+        f"UserResponse_{suffix}",
+        **{
+            name: (UserResponse.model_fields[name].annotation, UserResponse.model_fields[name])
+            for name in fields
+        }
+    )
+    page = create_model(
+        f"UserListResponse_{suffix}",
+        users=(List[item], ...),
+        total=(int, ...),
+        page=(int, ...),
+        size=(int, ...)
+    )
+    return SparseUserSchemas(item=item, items=TypeAdapter(List[item]), page=page)
+
+def sparse_schema_cache_usage(sample_size: int) -> dict:
+    """
+    Generated schema classes are counted but not sized: most of their
+    footprint lives in pydantic-core validators, which are opaque here.
+    """
+    info = get_sparse_user_schemas.cache_info()
+    return {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "bytes": None,
+        "hits": info.hits,
+        "misses": info.misses
+    }
+
+memory_accounting.register("sparse_user_schemas", sparse_schema_cache_usage)
+
 # Authentication schemas
 class UserLogin(BaseModel):
     username: str = Field(..., description="Username or email")
@@ -1,8 +1,19 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+import time
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
 from app.repositories.user_repository import UserRepository
-from app.schemas.auth_schema import UserLogin, UserRegister, Token, RefreshToken, PasswordChange
+from app.core.config import settings
+from app.core.deadline import check_deadline
+from app.core.throttle import login_throttle, ThrottleExceeded
+from app.core.invalidation import invalidation_bus, USER
+from app.schemas.auth_schema import (
+    UserLogin, UserRegister, Token, RefreshToken, PasswordChange,
+    TokenIntrospection, TokenIntrospectResponse, IntrospectedUser
+)
 from app.schemas.user_schema import UserResponse
+from app.services.user_service import UserService
 from app.utils.auth import JWTManager, PasswordManager
 from app.models.user import User
 
@@ -14,22 +25,12 @@ class AuthService:
         """
         Register a new user.
         """
-        # Check if email already exists
-        if await UserRepository.email_exists(user_data.email):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
+        # Check email and username availability in one lookup
+        await UserService.ensure_identity_available(user_data.email, user_data.username)
         
-        # Check if username already exists
-        if await UserRepository.username_exists(user_data.username):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
-        
-        # Hash the password
-        hashed_password = PasswordManager.hash_password(user_data.password)
+        # Hash the password (unless the client has already given up)
+        check_deadline("password_hashing")
+        hashed_password = await run_in_threadpool(PasswordManager.hash_password, user_data.password)
         
         # Create user data for repository
         from app.schemas.user_schema import UserCreate
@@ -42,33 +43,73 @@ class AuthService:
             is_admin=False
         )
         
-        # Create the user
-        user = await UserRepository.create(user_create_data, hashed_password)
+        # Create the user (the unique email/username indexes settle a race with a concurrent registration)
+        try:
+            user = await UserRepository.create(user_create_data, hashed_password)
+        except DuplicateKeyError as exc:
+            raise UserService.identity_conflict(exc) from exc
         
         return UserResponse.from_orm(user)
     
     @staticmethod
-    async def login_user(login_data: UserLogin) -> Token:
+    async def check_login_throttle(identifier: str, client_ip: Optional[str]) -> None:
         """
-        Authenticate user and return JWT tokens.
+        Reject throttled login attempts before any database or bcrypt work.
         """
-        # Get user by email or username
-        user = await UserRepository.get_by_email_or_username(login_data.identifier)
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
         
-        if not user:
+        try:
+            await login_throttle.check(identifier, client_ip)
+        except ThrottleExceeded as exc:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email/username or password",
-                headers={"WWW-Authenticate": "Bearer"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=exc.reason,
+                headers={"Retry-After": str(exc.retry_after)},
             )
+    
+    @staticmethod
+    async def login_user(login_data: UserLogin, client_ip: Optional[str] = None) -> Token:
+        """
+        Authenticate user and return JWT tokens.
+        """
+        # The throttle check counted this attempt as a failure; it is given
+        # back unless the credentials turn out to be wrong
+        await AuthService.check_login_throttle(login_data.identifier, client_ip)
         
-        # Verify password
-        if not PasswordManager.verify_password(login_data.password, user.hashed_password):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email/username or password",
-                headers={"WWW-Authenticate": "Bearer"},
+        credentials_rejected = False
+        try:
+            # Get user by email or username
+            user = await UserRepository.get_by_email_or_username(login_data.identifier)
+            
+            if not user:
+                credentials_rejected = True
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Incorrect email/username or password",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            
+            # Verify password (and get a new hash if the stored one is outdated).
+            # Hashing runs in the threadpool so it does not stall the event loop.
+            check_deadline("password_hashing")
+            verified, new_hash = await run_in_threadpool(
+                PasswordManager.verify_and_update, login_data.password, user.hashed_password
             )
+            if not verified:
+                credentials_rejected = True
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Incorrect email/username or password",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+        except Exception:
+            if settings.LOGIN_THROTTLE_ENABLED and not credentials_rejected:
+                await login_throttle.release(login_data.identifier)
+            raise
+        
+        if settings.LOGIN_THROTTLE_ENABLED:
+            await login_throttle.record_success(login_data.identifier)
         
         # Check if user is active
         if not user.is_active:
@@ -78,6 +119,10 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Transparently upgrade the stored hash to the current scheme/cost
+        if new_hash:
+            await UserRepository.update_password(str(user.id), new_hash)
+        
         # Create token pair
         token_data = JWTManager.create_token_pair(
             user_id=str(user.id),
@@ -143,23 +188,23 @@ class AuthService:
             )
         
         # Verify old password
-        if not PasswordManager.verify_password(password_data.old_password, user.hashed_password):
+        check_deadline("password_hashing")
+        if not await run_in_threadpool(PasswordManager.verify_password, password_data.old_password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Incorrect old password"
             )
         
         # Hash new password
-        new_hashed_password = PasswordManager.hash_password(password_data.new_password)
+        check_deadline("password_hashing")
+        new_hashed_password = await run_in_threadpool(PasswordManager.hash_password, password_data.new_password)
         
-        # Update password in database
-        from app.schemas.user_schema import UserUpdate
-        update_data = UserUpdate()
-        update_data_dict = {"hashed_password": new_hashed_password}
-        
-        # Manually update the user
-        user.hashed_password = new_hashed_password
-        await user.save()
+        # Update password in database (the user may have been removed meanwhile)
+        if not await UserRepository.update_password(user_id, new_hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
         
         return True
     
@@ -170,6 +215,50 @@ class AuthService:
         """
         return UserResponse.from_orm(user)
     
+    @staticmethod
+    async def introspect_tokens(tokens: List[str]) -> TokenIntrospectResponse:
+        """
+        Verify many access tokens in one call.
+        Each distinct token is verified once and all users are loaded
+        with a single (cache-assisted) $in lookup.
+        """
+        verified: Dict[str, Tuple[Optional[dict], str]] = {
+            token: JWTManager.inspect_token(token, token_type="access")
+            for token in dict.fromkeys(tokens)
+        }
+        user_ids = [payload["sub"] for payload, _ in verified.values() if payload and payload.get("sub")]
+        users = await UserRepository.get_many_cached(user_ids) if user_ids else {}
+        
+        now = time.time()
+        introspections: Dict[str, TokenIntrospection] = {}
+        for token, (payload, token_status) in verified.items():
+            if payload is None:
+                introspections[token] = TokenIntrospection(active=False, status=token_status)
+                continue
+            
+            user = users.get(payload.get("sub"))
+            if user is None:
+                token_status = "user_not_found"
+            elif not user.is_active:
+                token_status = "inactive_user"
+            
+            exp = payload.get("exp")
+            introspections[token] = TokenIntrospection(
+                active=token_status == "valid",
+                status=token_status,
+                claims=payload,
+                user=IntrospectedUser(
+                    id=str(user.id),
+                    username=user.username,
+                    email=user.email,
+                    is_active=user.is_active,
+                    is_admin=user.is_admin
+                ) if user is not None else None,
+                expires_in=max(0, int(exp - now)) if isinstance(exp, (int, float)) else None
+            )
+        
+        return TokenIntrospectResponse(results=[introspections[token] for token in tokens])
+    
     @staticmethod
     async def verify_user_token(token: str) -> Optional[User]:
         """
@@ -199,4 +288,6 @@ class AuthService:
         # For JWT, logout is typically handled on the client side
         # by removing the token from storage.
         # Server-side logout would require token blacklisting.
+        # Cached copies of the user are dropped on every worker.
+        await invalidation_bus.publish(USER, [str(user.id)], reason="logout")
         return True
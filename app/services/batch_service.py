@@ -0,0 +1,165 @@
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, Request
+from starlette.middleware.exceptions import ExceptionMiddleware
+from starlette.types import ASGIApp, Message
+import asyncio
+import json
+import logging
+
+from app.core.config import settings
+from app.middleware.admission import CREDENTIAL_PATHS
+from app.schemas.batch_schema import BatchSubRequest, BatchSubResponse
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1/"
+BATCH_PATH = "/api/v1/batch"
+
+# Headers a sub-request may not override; authentication is shared with the batch
+PROTECTED_HEADERS = {"authorization", "host", "content-length", "transfer-encoding"}
+
+class BatchService:
+    """Executes batched sub-requests in-process through the application router."""
+
+    _dispatchers: Dict[int, ASGIApp] = {}
+
+    @staticmethod
+    def get_dispatcher(app: FastAPI) -> ASGIApp:
+        """
+        Build (once per app) the ASGI callable used for sub-requests:
+        the router wrapped with the app's exception handlers.
+        The outer middleware stack already ran for the batch request itself.
+        """
+        dispatcher = BatchService._dispatchers.get(id(app))
+        if dispatcher is None:
+            handlers = {
+                key: handler for key, handler in app.exception_handlers.items()
+                if key not in (500, Exception)
+            }
+            dispatcher = ExceptionMiddleware(app.router, handlers=handlers, debug=app.debug)
+            BatchService._dispatchers[id(app)] = dispatcher
+        return dispatcher
+
+    @staticmethod
+    def build_scope(parent: Request, sub_request: BatchSubRequest, user: User, body: bytes) -> Dict[str, Any]:
+        """Create the ASGI scope for a sub-request derived from the batch request."""
+        path, _, query_string = sub_request.path.partition("?")
+
+        headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in sub_request.headers.items()
+            if name.lower() not in PROTECTED_HEADERS
+        ]
+        authorization = parent.headers.get("authorization")
+        if authorization:
+            headers.append((b"authorization", authorization.encode("latin-1")))
+        if body:
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            if "content-type" not in {name.lower() for name in sub_request.headers}:
+                headers.append((b"content-type", b"application/json"))
+
+        state = dict(parent.scope.get("state") or {})
+        state["authenticated_user"] = user
+        state["authenticated_token"] = parent.headers.get("authorization", "").partition(" ")[2]
+
+        return {
+            "type": "http",
+            "asgi": parent.scope.get("asgi", {"version": "3.0"}),
+            "http_version": parent.scope.get("http_version", "1.1"),
+            "method": sub_request.method,
+            "scheme": parent.scope.get("scheme", "http"),
+            "server": parent.scope.get("server"),
+            "client": parent.scope.get("client"),
+            "root_path": parent.scope.get("root_path", ""),
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "query_string": query_string.encode("latin-1"),
+            "headers": headers,
+            "app": parent.scope.get("app"),
+            "state": state
+        }
+
+    @staticmethod
+    def decode_body(body: bytes, content_type: str) -> Any:
+        """Decode a sub-response body: JSON when possible, otherwise text."""
+        if not body:
+            return None
+        if content_type.startswith("application/json"):
+            try:
+                return json.loads(body)
+            except ValueError:
+                pass
+        return body.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def reject_reason(path: str) -> Optional[str]:
+        """
+        Why a sub-request path is refused, or None if it may run.
+        Sub-requests skip the middleware stack, so password-hashing routes
+        (which admission control limits separately) must be called directly.
+        """
+        if not path.startswith(API_PREFIX):
+            return "Path must target /api/v1"
+        if path == BATCH_PATH or path.startswith(BATCH_PATH + "/"):
+            return "Path cannot be a batch"
+        if path.rstrip("/") in CREDENTIAL_PATHS:
+            return "Credential endpoints cannot be batched"
+        return None
+
+    @staticmethod
+    async def execute(parent: Request, sub_request: BatchSubRequest, user: User) -> BatchSubResponse:
+        """Run a single sub-request and capture its response."""
+        reason = BatchService.reject_reason(sub_request.path.partition("?")[0])
+        if reason is not None:
+            return BatchSubResponse(status=400, body={"detail": reason})
+
+        body = b"" if sub_request.body is None else json.dumps(sub_request.body).encode("utf-8")
+        scope = BatchService.build_scope(parent, sub_request, user, body)
+
+        request_sent = False
+        status_code = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    response_headers[name.decode("latin-1")] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await BatchService.get_dispatcher(parent.app)(scope, receive, send)
+        except Exception as exc:
+            logger.error(f"Batch sub-request {sub_request.method} {sub_request.path} failed: {exc}")
+            return BatchSubResponse(status=500, body={"detail": "Internal server error"})
+
+        response_headers.pop("content-length", None)
+        return BatchSubResponse(
+            status=status_code,
+            headers=response_headers,
+            body=BatchService.decode_body(b"".join(chunks), response_headers.get("content-type", ""))
+        )
+
+    @staticmethod
+    async def execute_all(parent: Request, sub_requests: List[BatchSubRequest], user: User) -> List[BatchSubResponse]:
+        """
+        Run sub-requests concurrently (bounded) and return results in request order.
+        """
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+        async def run(sub_request: BatchSubRequest) -> BatchSubResponse:
+            async with semaphore:
+                return await BatchService.execute(parent, sub_request, user)
+
+        return list(await asyncio.gather(*(run(sub_request) for sub_request in sub_requests)))
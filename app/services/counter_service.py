@@ -0,0 +1,21 @@
+from typing import Dict
+import logging
+
+from app.repositories.user_repository import UserRepository
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+class CounterService:
+    """Maintenance for maintained counters."""
+    
+    @staticmethod
+    async def reconcile_user_counters() -> Dict[str, int]:
+        """
+        Recompute user counters from the collection and log any drift.
+        """
+        previous = await CounterRepository.get(USER_COUNTERS)
+        counters = await UserRepository.reconcile_counters()
+        if previous is not None and previous != counters:
+            logger.warning(f"User counters drifted: {previous} -> {counters}")
+        return counters
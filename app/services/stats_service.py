@@ -0,0 +1,108 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict
+import logging
+
+from fastapi import HTTPException, status
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.memory import memory_accounting
+from app.repositories.rollup_repository import PERIOD_FORMATS, RollupRepository, rollup_id
+from app.repositories.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+# Per-period values kept by the rollups
+ROLLUP_FIELDS = ("signups", "activations", "deactivations", "deletions")
+
+# Dashboard reads keyed by (granularity, start, end)
+stats_cache = TTLCache(
+    name="user_stats",
+    max_entries=settings.USER_STATS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_STATS_CACHE_TTL_SECONDS
+)
+memory_accounting.register("user_stats_cache", stats_cache.memory_usage)
+
+class StatsService:
+    """Signup and activity statistics served from precomputed rollups."""
+    
+    @staticmethod
+    async def user_stats(granularity: str, start: date, end: date) -> Dict[str, Any]:
+        """
+        Per-period signups, activations, deactivations and deletions for
+        the days `start` to `end` (inclusive, UTC), with totals and the
+        current number of active users. Periods without activity are zero.
+        """
+        step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+        start_at = datetime.combine(start, time.min)
+        end_at = datetime.combine(end + timedelta(days=1), time.min)
+        if end_at <= start_at:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must not be before start"
+            )
+        if (end_at - start_at) / step > settings.USER_STATS_MAX_PERIODS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Range exceeds {settings.USER_STATS_MAX_PERIODS} periods; use a coarser granularity"
+            )
+        
+        key = (granularity, start, end)
+        cached = stats_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        documents = {
+            document["_id"]: document
+            for document in await RollupRepository.get_range(granularity, start_at, end_at)
+        }
+        totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+        periods = []
+        moment = start_at
+        while moment < end_at:
+            document = documents.get(rollup_id(granularity, moment), {})
+            values = {field: document.get("values", {}).get(field, 0) for field in ROLLUP_FIELDS}
+            for field, value in values.items():
+                totals[field] += value
+            periods.append({
+                "period": moment.strftime(PERIOD_FORMATS[granularity]),
+                **values,
+                "active": document.get("active")
+            })
+            moment += step
+        
+        result = {
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "active": await UserRepository.count(active_only=True),
+            "totals": totals,
+            "periods": periods
+        }
+        stats_cache.set(key, result)
+        return result
+    
+    @staticmethod
+    async def refresh_active() -> int:
+        """Snapshot the current active-user count into this hour's and day's rollups."""
+        active = await UserRepository.count(active_only=True)
+        await RollupRepository.set_active(datetime.utcnow(), active)
+        return active
+    
+    @staticmethod
+    async def backfill(days: int) -> Dict[str, int]:
+        """
+        Rebuild signup rollups for the last `days` days from the users
+        collections. Only closed periods are touched and counts only go up
+        (see RollupRepository.backfill). Returns the periods written per
+        granularity.
+        """
+        end_at = datetime.utcnow()
+        start_at = datetime.combine(end_at.date() - timedelta(days=days), time.min)
+        written = {
+            granularity: await RollupRepository.backfill(granularity, start_at, end_at)
+            for granularity in PERIOD_FORMATS
+        }
+        stats_cache.clear()
+        logger.info(f"Backfilled user rollups since {start_at.date().isoformat()}: {written}")
+        return written
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+
+from fastapi import HTTPException, status
+from pymongo.errors import DuplicateKeyError
+
+from app.repositories.user_archive_repository import UserArchiveRepository
+from app.services.user_service import UserService
+from app.schemas.user_schema import UserResponse
+
+logger = logging.getLogger(__name__)
+
+class UserArchiveService:
+    """Archival of long-inactive users and their restoration."""
+    
+    @staticmethod
+    async def archive_inactive_users(
+        inactive_days: int,
+        batch_size: int,
+        max_batches: Optional[int] = None
+    ) -> int:
+        """
+        Archive users inactive for more than `inactive_days`, batch by batch.
+        Returns the number of users archived.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=inactive_days)
+        archived = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = await UserArchiveRepository.archive_batch(cutoff, batch_size)
+            archived += len(moved)
+            batches += 1
+            if len(moved) < batch_size:
+                break
+            # Let other requests run between batches
+            await asyncio.sleep(0)
+        
+        if archived:
+            logger.info(f"Archived {archived} users inactive since {cutoff.isoformat()}")
+        return archived
+    
+    @staticmethod
+    async def restore_user(user_id: str, activate: bool = True) -> UserResponse:
+        """
+        Restore an archived user, optionally reactivating the account.
+        """
+        archived_user = await UserArchiveRepository.get(user_id)
+        if archived_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archived user not found"
+            )
+        
+        await UserService.ensure_identity_available(
+            archived_user.email, archived_user.username, exclude_user_id=user_id
+        )
+        
+        try:
+            user = await UserArchiveRepository.restore(user_id, activate=activate)
+        except DuplicateKeyError:
+            # Email or username taken between the check above and the insert
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email or username already taken"
+            )
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archived user not found"
+            )
+        return UserResponse.from_orm(user)
@@ -0,0 +1,291 @@
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
+from app.core.deadline import check_deadline
+from app.repositories.user_repository import UserRepository
+from app.schemas.user_schema import (
+    BulkUserAction, BulkUserFilter, BulkUserResult, UserCreate, UserUpdate, UserResponse, parse_user_fields
+)
+from app.utils.auth import PasswordManager
+from app.models.user import User
+
+# Fields always fetched so ETags can be computed regardless of the field set
+VERSION_FIELDS = ("created_at", "updated_at")
+
+# Flags set by each bulk action (hard_delete is handled separately)
+BULK_FLAGS = {
+    "activate": {"is_active": True},
+    "deactivate": {"is_active": False},
+    "make_admin": {"is_admin": True},
+    "remove_admin": {"is_admin": False}
+}
+
+class UserService:
+    """User management service with sparse fieldset support."""
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+        """
+        Validate the `fields` query parameter.
+        """
+        try:
+            return parse_user_fields(fields)
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(exc)
+            )
+
+    @staticmethod
+    def build_projection(fields: Tuple[str, ...]) -> Dict[str, Any]:
+        """
+        Translate response fields into a MongoDB projection.
+        `_id` is always returned by MongoDB and is mapped to `id`.
+        """
+        projection = {name: 1 for name in fields if name != "id"}
+        for name in VERSION_FIELDS:
+            projection[name] = 1
+        return projection
+
+    @staticmethod
+    def to_response_doc(document: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a raw MongoDB document onto response field names."""
+        document["id"] = str(document.pop("_id"))
+        return document
+
+    @staticmethod
+    def ensure_self_or_admin(user_id: str, current_user: User) -> None:
+        """
+        Allow access to a user's own record or to admins.
+        """
+        if not current_user.is_admin and str(current_user.id) != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+
+    @staticmethod
+    async def ensure_identity_available(
+        email: Optional[str],
+        username: Optional[str],
+        exclude_user_id: Optional[str] = None
+    ) -> None:
+        """
+        Raise 400 if the email or username belongs to another user.
+        """
+        conflicts = await UserRepository.find_identity_conflicts(email, username, exclude_user_id)
+        if "email" in conflicts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        if "username" in conflicts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already taken"
+            )
+
+    @staticmethod
+    def identity_conflict(exc: DuplicateKeyError) -> HTTPException:
+        """
+        409 for a unique index violation: the email or username was taken
+        by a concurrent request after ensure_identity_available passed.
+        """
+        key_pattern = (exc.details or {}).get("keyPattern", {})
+        if "email" in key_pattern:
+            detail = "Email already registered"
+        elif "username" in key_pattern:
+            detail = "Username already taken"
+        else:
+            detail = "Email or username already taken"
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+    @staticmethod
+    async def create_user(user_data: UserCreate) -> UserResponse:
+        """
+        Create a new user (admin operation).
+        """
+        await UserService.ensure_identity_available(user_data.email, user_data.username)
+
+        check_deadline("password_hashing")
+        hashed_password = await run_in_threadpool(PasswordManager.hash_password, user_data.password)
+        try:
+            user = await UserRepository.create(user_data, hashed_password)
+        except DuplicateKeyError as exc:
+            raise UserService.identity_conflict(exc) from exc
+        return UserResponse.from_orm(user)
+
+    @staticmethod
+    async def list_users(
+        fields: Tuple[str, ...],
+        page: int = 1,
+        size: int = 50,
+        active_only: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Get a page of users containing only the requested fields.
+        """
+        skip = (page - 1) * size
+        documents = await UserRepository.get_all_projected(
+            UserService.build_projection(fields),
+            skip=skip,
+            limit=size,
+            active_only=active_only
+        )
+        total = await UserRepository.count(active_only=active_only)
+
+        return {
+            "users": [UserService.to_response_doc(doc) for doc in documents],
+            "total": total,
+            "page": page,
+            "size": size
+        }
+
+    @staticmethod
+    async def search_users(
+        query: str,
+        fields: Tuple[str, ...],
+        page: int = 1,
+        size: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Search active users returning only the requested fields.
+        """
+        skip = (page - 1) * size
+        documents = await UserRepository.search_projected(
+            query,
+            UserService.build_projection(fields),
+            skip=skip,
+            limit=size
+        )
+        return [UserService.to_response_doc(doc) for doc in documents]
+
+    @staticmethod
+    async def get_user(user_id: str, fields: Tuple[str, ...]) -> Dict[str, Any]:
+        """
+        Get a single user containing only the requested fields.
+        """
+        document = await UserRepository.get_by_id_projected(
+            user_id, UserService.build_projection(fields)
+        )
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return UserService.to_response_doc(document)
+
+    @staticmethod
+    async def update_user(user_id: str, user_data: UserUpdate, current_user: User) -> UserResponse:
+        """
+        Update user information.
+        Users may update their own profile; only admins may update others
+        or change activation and admin flags.
+        """
+        UserService.ensure_self_or_admin(user_id, current_user)
+        if not current_user.is_admin:
+            if user_data.is_active is not None or user_data.is_admin is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Not enough permissions"
+                )
+        UserService.ensure_not_locking_out_self(user_id, current_user, user_data.is_active, user_data.is_admin)
+
+        await UserService.ensure_identity_available(user_data.email, user_data.username, exclude_user_id=user_id)
+
+        try:
+            user = await UserRepository.update(user_id, user_data)
+        except DuplicateKeyError as exc:
+            raise UserService.identity_conflict(exc) from exc
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return UserResponse.from_orm(user)
+
+    @staticmethod
+    async def delete_user(user_id: str, current_user: User) -> None:
+        """
+        Soft delete a user (sets is_active to False).
+        """
+        if str(current_user.id) == user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot delete your own account"
+            )
+
+        if not await UserRepository.delete(user_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+    @staticmethod
+    def ensure_not_locking_out_self(
+        user_id: str,
+        current_user: User,
+        is_active: Optional[bool] = None,
+        is_admin: Optional[bool] = None
+    ) -> None:
+        """
+        Raise 400 if an admin would deactivate or demote their own account
+        (the bulk endpoint leaves the caller out for the same reason).
+        """
+        if str(current_user.id) == user_id and (is_active is False or is_admin is False):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot deactivate or remove admin privileges from your own account"
+            )
+
+    @staticmethod
+    async def set_flags(user_id: str, current_user: User, **flags: bool) -> UserResponse:
+        """
+        Set activation or admin flags on a user.
+        """
+        UserService.ensure_not_locking_out_self(user_id, current_user, **flags)
+        user = await UserRepository.update(user_id, UserUpdate(**flags))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return UserResponse.from_orm(user)
+
+    @staticmethod
+    def bulk_criteria(filter_: Optional[BulkUserFilter]) -> Dict[str, Any]:
+        """Translate a bulk filter into a MongoDB query."""
+        if filter_ is None:
+            return {}
+        criteria: Dict[str, Any] = {}
+        if filter_.is_active is not None:
+            criteria["is_active"] = filter_.is_active
+        if filter_.is_admin is not None:
+            criteria["is_admin"] = filter_.is_admin
+        if filter_.created_before or filter_.created_after:
+            criteria["created_at"] = {}
+            if filter_.created_before:
+                criteria["created_at"]["$lt"] = filter_.created_before
+            if filter_.created_after:
+                criteria["created_at"]["$gte"] = filter_.created_after
+        if filter_.updated_before:
+            criteria["updated_at"] = {"$lt": filter_.updated_before}
+        return criteria
+
+    @staticmethod
+    async def bulk_action(request: BulkUserAction, current_user: User) -> BulkUserResult:
+        """
+        Apply an action to many users with one server-side write.
+        The calling admin is always left out of the selection.
+        """
+        criteria = UserService.bulk_criteria(request.filter)
+        exclude_user_id = str(current_user.id)
+        if request.action == "hard_delete":
+            deleted = await UserRepository.bulk_hard_delete(criteria, request.user_ids, exclude_user_id)
+            return BulkUserResult(action=request.action, matched=deleted, modified=deleted)
+
+        matched, modified = await UserRepository.bulk_set_flags(
+            BULK_FLAGS[request.action], criteria, request.user_ids, exclude_user_id
+        )
+        return BulkUserResult(action=request.action, matched=matched, modified=modified)
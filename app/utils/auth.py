@@ -1,11 +1,73 @@
 from datetime import datetime, timedelta
-from typing import Optional, Union
-from jose import JWTError, jwt
+from typing import List, Optional, Tuple, Union
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.memory import memory_accounting
+from app.utils.jwt_engine import TokenError, TokenExpired, build_key_ring, create_jwt_backend
+import logging
+
+logger = logging.getLogger(__name__)
+
+def argon2_available() -> bool:
+    """Whether the optional argon2-cffi backend is installed."""
+    try:
+        import argon2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def build_password_context(
+    schemes: List[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int
+) -> CryptContext:
+    """
+    Create the password hashing context.
+    The first scheme hashes new passwords; other schemes and hashes made
+    with different cost settings are reported by needs_update, so they
+    are rehashed transparently on the next successful login.
+    """
+    if "argon2" in schemes and not argon2_available():
+        logger.warning("argon2 requested but argon2-cffi is not installed; falling back to bcrypt")
+        schemes = [scheme for scheme in schemes if scheme != "argon2"]
+    if "bcrypt" not in schemes:
+        # Existing hashes are bcrypt and must keep verifying
+        schemes = schemes + ["bcrypt"]
+
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context(
+    settings.password_hash_schemes_list,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.ARGON2_PARALLELISM
+)
+
+# JWT backend with key material prepared once at import time
+jwt_backend = create_jwt_backend(
+    settings.JWT_BACKEND,
+    build_key_ring(
+        settings.JWT_KEYS,
+        active_kid=settings.JWT_ACTIVE_KID,
+        algorithm=settings.JWT_ALGORITHM,
+        fallback_secret=settings.JWT_SECRET_KEY,
+        key_files=settings.JWT_KEY_FILES
+    )
+)
+memory_accounting.register("jwt_backend", jwt_backend.memory_usage)
 
 class JWTManager:
     """JWT token management utilities."""
@@ -21,7 +83,7 @@ class JWTManager:
             expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
         
         to_encode.update({"exp": expire, "type": "access"})
-        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        encoded_jwt = jwt_backend.encode(to_encode)
         return encoded_jwt
     
     @staticmethod
@@ -35,27 +97,38 @@ class JWTManager:
             expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
         
         to_encode.update({"exp": expire, "type": "refresh"})
-        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        encoded_jwt = jwt_backend.encode(to_encode)
         return encoded_jwt
     
     @staticmethod
     def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         """Verify and decode JWT token."""
+        payload, _ = JWTManager.inspect_token(token, token_type)
+        return payload
+    
+    @staticmethod
+    def inspect_token(token: str, token_type: str = "access") -> Tuple[Optional[dict], str]:
+        """
+        Verify and decode JWT token, also reporting why it was rejected.
+        Returns (payload, "valid") or (None, "invalid" | "expired" | "wrong_type").
+        """
         try:
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-            
-            # Check token type
-            if payload.get("type") != token_type:
-                return None
-            
-            # Check expiration
-            exp = payload.get("exp")
-            if exp and datetime.utcnow() > datetime.fromtimestamp(exp):
-                return None
-            
-            return payload
-        except JWTError:
-            return None
+            payload = jwt_backend.decode(token)
+        except TokenExpired:
+            return None, "expired"
+        except TokenError:
+            return None, "invalid"
+        
+        # Check token type
+        if payload.get("type") != token_type:
+            return None, "wrong_type"
+        
+        # Check expiration
+        exp = payload.get("exp")
+        if exp and datetime.utcnow() > datetime.fromtimestamp(exp):
+            return None, "expired"
+        
+        return payload, "valid"
     
     @staticmethod
     def get_user_id_from_token(token: str) -> Optional[str]:
@@ -89,7 +162,7 @@ class PasswordManager:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using bcrypt."""
+        """Hash a password using the default scheme and configured cost."""
         return pwd_context.hash(password)
     
     @staticmethod
@@ -97,6 +170,14 @@ class PasswordManager:
         """Verify a password against its hash."""
         return pwd_context.verify(plain_password, hashed_password)
     
+    @staticmethod
+    def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, when the stored hash uses an outdated scheme
+        or cost, return a replacement hash to persist (otherwise None).
+        """
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    
     @staticmethod
     def generate_password_reset_token(user_id: str) -> str:
         """Generate a password reset token."""
@@ -104,13 +185,13 @@ class PasswordManager:
         expire = datetime.utcnow() + timedelta(hours=1)  # Reset token expires in 1 hour
         data.update({"exp": expire})
         
-        return jwt.encode(data, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        return jwt_backend.encode(data)
     
     @staticmethod
     def verify_password_reset_token(token: str) -> Optional[str]:
         """Verify password reset token and return user ID."""
         try:
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            payload = jwt_backend.decode(token)
             
             if payload.get("type") != "password_reset":
                 return None
@@ -121,5 +202,5 @@ class PasswordManager:
                 return None
             
             return payload.get("sub")
-        except JWTError:
+        except TokenError:
             return None
@@ -0,0 +1,464 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Optional
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import sys
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+from jose import ExpiredSignatureError, JWTError, jwt
+
+class TokenError(Exception):
+    """Raised when a token cannot be encoded, decoded or verified."""
+
+class TokenExpired(TokenError):
+    """Raised when a token's signature is valid but it has expired."""
+
+def b64url_encode(data: bytes) -> str:
+    """Base64url encode without padding."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def b64url_decode(data: str) -> bytes:
+    """Base64url decode, restoring padding."""
+    try:
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (ValueError, TypeError) as exc:
+        raise TokenError("Invalid base64 segment") from exc
+
+def _json_default(value: Any) -> Any:
+    """Serialize datetimes as NumericDate, like python-jose does."""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_claims(claims: Dict[str, Any]) -> bytes:
+    """Compact JSON encoding of the claims set."""
+    return json.dumps(claims, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+class SigningKey(ABC):
+    """Prepared key material for one `kid`."""
+
+    algorithm: str = ""
+    can_sign: bool = True
+
+    def __init__(self, kid: str):
+        self.kid = kid
+
+    @abstractmethod
+    def sign(self, signing_input: bytes) -> bytes:
+        """Return the signature of the signing input."""
+
+    @abstractmethod
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        """Check a signature over the signing input."""
+
+    @property
+    @abstractmethod
+    def secret(self) -> Any:
+        """Signing key material in a form python-jose accepts."""
+
+    @property
+    def verification_key(self) -> Any:
+        """Verification key material in a form python-jose accepts."""
+        return self.secret
+
+    def public_jwk(self) -> Optional[Dict[str, str]]:
+        """Public JWK for this key, or None for symmetric keys."""
+        return None
+
+class HMACKey(SigningKey):
+    """
+    HMAC key whose inner/outer padded state is computed once.
+    Each signature copies the prepared state instead of re-deriving it.
+    """
+
+    DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self, kid: str, secret: str, algorithm: str = "HS256"):
+        super().__init__(kid)
+        if algorithm not in self.DIGESTS:
+            raise ValueError(f"Unsupported HMAC algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self._secret = secret
+        self._prepared = hmac.new(secret.encode("utf-8"), digestmod=self.DIGESTS[algorithm])
+
+    def sign(self, signing_input: bytes) -> bytes:
+        mac = self._prepared.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(signing_input), signature)
+
+    @property
+    def secret(self) -> str:
+        return self._secret
+
+class RSAKey(SigningKey):
+    """RSA key (RS256/RS384/RS512) loaded once from PEM."""
+
+    HASHES = {"RS256": hashes.SHA256, "RS384": hashes.SHA384, "RS512": hashes.SHA512}
+
+    def __init__(self, kid: str, key: Any, algorithm: str = "RS256"):
+        super().__init__(kid)
+        if algorithm not in self.HASHES:
+            raise ValueError(f"Unsupported RSA algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.can_sign = isinstance(key, rsa.RSAPrivateKey)
+        self._private_key = key if self.can_sign else None
+        self._public_key = key.public_key() if self.can_sign else key
+        self._hash = self.HASHES[algorithm]()
+        self._padding = padding.PKCS1v15()
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if not self.can_sign:
+            raise TokenError(f"Key '{self.kid}' is verification-only")
+        return self._private_key.sign(signing_input, self._padding, self._hash)
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self._public_key.verify(signature, signing_input, self._padding, self._hash)
+            return True
+        except InvalidSignature:
+            return False
+
+    @property
+    def secret(self) -> str:
+        return self._private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode("ascii")
+
+    @property
+    def verification_key(self) -> str:
+        return self._public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode("ascii")
+
+    def public_jwk(self) -> Dict[str, str]:
+        numbers = self._public_key.public_numbers()
+        return {
+            "kty": "RSA",
+            "use": "sig",
+            "alg": self.algorithm,
+            "kid": self.kid,
+            "n": b64url_encode(numbers.n.to_bytes((numbers.n.bit_length() + 7) // 8, "big")),
+            "e": b64url_encode(numbers.e.to_bytes((numbers.e.bit_length() + 7) // 8, "big"))
+        }
+
+class EdDSAKey(SigningKey):
+    """Ed25519 key (EdDSA) loaded once from PEM."""
+
+    algorithm = "EdDSA"
+
+    def __init__(self, kid: str, key: Any):
+        super().__init__(kid)
+        self.can_sign = isinstance(key, ed25519.Ed25519PrivateKey)
+        self._private_key = key if self.can_sign else None
+        self._public_key = key.public_key() if self.can_sign else key
+
+    def sign(self, signing_input: bytes) -> bytes:
+        if not self.can_sign:
+            raise TokenError(f"Key '{self.kid}' is verification-only")
+        return self._private_key.sign(signing_input)
+
+    def verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self._public_key.verify(signature, signing_input)
+            return True
+        except InvalidSignature:
+            return False
+
+    @property
+    def secret(self) -> Any:
+        raise TokenError("python-jose does not support EdDSA; use the fast backend")
+
+    def public_jwk(self) -> Dict[str, str]:
+        raw = self._public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {
+            "kty": "OKP",
+            "crv": "Ed25519",
+            "use": "sig",
+            "alg": self.algorithm,
+            "kid": self.kid,
+            "x": b64url_encode(raw)
+        }
+
+def load_pem_key(kid: str, pem: bytes, algorithm: str) -> SigningKey:
+    """
+    Load an asymmetric key from PEM.
+    Private keys sign and verify; public keys only verify (retired keys).
+    """
+    try:
+        key = serialization.load_pem_private_key(pem, password=None)
+    except ValueError:
+        key = serialization.load_pem_public_key(pem)
+
+    if algorithm == "EdDSA":
+        if not isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            raise ValueError(f"Key '{kid}' is not an Ed25519 key")
+        return EdDSAKey(kid, key)
+
+    if not isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        raise ValueError(f"Key '{kid}' is not an RSA key")
+    return RSAKey(kid, key, algorithm)
+
+def generate_private_key_pem(algorithm: str) -> bytes:
+    """Generate a new private key in PEM format for RS*/EdDSA."""
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+class KeyRing:
+    """
+    Signing keys selectable by `kid`.
+    New tokens are signed with the active key; any key in the ring verifies,
+    which allows rotation without invalidating outstanding tokens.
+    Tokens without a `kid` header are verified with the default key.
+    """
+
+    def __init__(self, keys: Dict[str, SigningKey], active_kid: str, default_kid: Optional[str] = None):
+        if active_kid not in keys:
+            raise ValueError(f"Active key '{active_kid}' is not in the key ring")
+        if not keys[active_kid].can_sign:
+            raise ValueError(f"Active key '{active_kid}' cannot sign (public key only)")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.default_kid = default_kid if default_kid in keys else active_kid
+
+    @property
+    def active(self) -> SigningKey:
+        return self.keys[self.active_kid]
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        return self.keys.get(kid if kid is not None else self.default_kid)
+
+    def jwks(self) -> Dict[str, Any]:
+        """JSON Web Key Set of the public keys; symmetric keys are never published."""
+        return {"keys": [jwk for jwk in (key.public_jwk() for key in self.keys.values()) if jwk]}
+
+class JWTBackend(ABC):
+    """Token encode/decode strategy used by JWTManager."""
+
+    # Algorithms the backend can sign and verify (None: every key type)
+    ALGORITHMS: Optional[frozenset] = None
+
+    def __init__(self, key_ring: KeyRing):
+        self.key_ring = key_ring
+
+    @abstractmethod
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign claims with the active key."""
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify a token and return its claims, raising TokenError if invalid."""
+
+    def memory_usage(self, sample_size: int) -> Dict[str, Any]:
+        """Size of per-backend caches (key material itself is not counted)."""
+        return {"entries": 0, "bytes": 0, "keys": len(self.key_ring.keys)}
+
+class JoseBackend(JWTBackend):
+    """Reference backend delegating to python-jose on every call."""
+
+    ALGORITHMS = frozenset(HMACKey.DIGESTS) | frozenset(RSAKey.HASHES)
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        key = self.key_ring.active
+        return jwt.encode(claims, key.secret, algorithm=key.algorithm, headers={"kid": key.kid})
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self.key_ring.get(kid)
+            if key is None:
+                raise TokenError("Unknown key id")
+            return jwt.decode(token, key.verification_key, algorithms=[key.algorithm])
+        except ExpiredSignatureError as exc:
+            raise TokenExpired(str(exc)) from exc
+        except JWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+class FastJWTBackend(JWTBackend):
+    """
+    Backend working directly on prepared key objects.
+    - the encoded header segment of each key is computed once
+    - verified header segments are memoized to skip JSON parsing
+    - signatures reuse precomputed key state
+    """
+
+    MAX_HEADER_CACHE = 64
+
+    def __init__(self, key_ring: KeyRing, leeway: int = 0):
+        super().__init__(key_ring)
+        self.leeway = leeway
+        self._header_segments = {
+            kid: b64url_encode(encode_claims({"alg": key.algorithm, "typ": "JWT", "kid": kid}))
+            for kid, key in key_ring.keys.items()
+        }
+        self._keys_by_header: Dict[str, SigningKey] = {
+            segment: key_ring.keys[kid] for kid, segment in self._header_segments.items()
+        }
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        key = self.key_ring.active
+        signing_input = f"{self._header_segments[key.kid]}.{b64url_encode(encode_claims(claims))}"
+        signature = key.sign(signing_input.encode("ascii"))
+        return f"{signing_input}.{b64url_encode(signature)}"
+
+    def resolve_key(self, header_segment: str) -> SigningKey:
+        """Find the key for a header segment, parsing it only on a cache miss."""
+        key = self._keys_by_header.get(header_segment)
+        if key is not None:
+            return key
+
+        try:
+            header = json.loads(b64url_decode(header_segment))
+        except ValueError as exc:
+            raise TokenError("Invalid header") from exc
+        if not isinstance(header, dict):
+            raise TokenError("Invalid header")
+
+        key = self.key_ring.get(header.get("kid"))
+        if key is None:
+            raise TokenError("Unknown key id")
+        if header.get("alg") != key.algorithm:
+            raise TokenError("Algorithm mismatch")
+
+        if len(self._keys_by_header) < self.MAX_HEADER_CACHE:
+            self._keys_by_header[header_segment] = key
+        return key
+
+    def memory_usage(self, sample_size: int) -> Dict[str, Any]:
+        """Memoized header segments; keys are shared with the key ring."""
+        segments = list(self._keys_by_header)
+        return {
+            "entries": len(segments),
+            "max_entries": self.MAX_HEADER_CACHE,
+            "bytes": sys.getsizeof(self._keys_by_header) + sum(sys.getsizeof(segment) for segment in segments),
+            "keys": len(self.key_ring.keys)
+        }
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        try:
+            signing_input, _, signature_segment = token.rpartition(".")
+            header_segment, _, payload_segment = signing_input.partition(".")
+        except AttributeError as exc:
+            raise TokenError("Invalid token") from exc
+        if not header_segment or not payload_segment or not signature_segment:
+            raise TokenError("Invalid token")
+
+        key = self.resolve_key(header_segment)
+        if not key.verify(signing_input.encode("ascii", errors="replace"), b64url_decode(signature_segment)):
+            raise TokenError("Signature verification failed")
+
+        try:
+            claims = json.loads(b64url_decode(payload_segment))
+        except ValueError as exc:
+            raise TokenError("Invalid payload") from exc
+        if not isinstance(claims, dict):
+            raise TokenError("Invalid payload")
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise TokenError("Invalid exp claim")
+            if exp < now - self.leeway:
+                raise TokenExpired("Signature has expired")
+        nbf = claims.get("nbf")
+        if nbf is not None and isinstance(nbf, (int, float)) and nbf > now + self.leeway:
+            raise TokenError("Token is not yet valid")
+
+        return claims
+
+# Kid of the legacy JWT_SECRET_KEY (the default JWT_ACTIVE_KID, so tokens
+# signed before JWT_KEYS was configured keep verifying)
+LEGACY_KID = "default"
+
+def build_key_ring(
+    keys: Dict[str, str],
+    active_kid: str,
+    algorithm: str,
+    fallback_secret: str,
+    key_files: Optional[Dict[str, str]] = None
+) -> KeyRing:
+    """
+    Build the key ring from settings.
+    HMAC algorithms use `keys` (kid -> secret); without explicit keys the
+    legacy secret becomes the single key. With explicit keys the legacy
+    secret stays in the ring as LEGACY_KID (unless that kid is configured)
+    and verifies tokens without a `kid` header. RS*/EdDSA use `key_files`
+    (kid -> PEM path): private keys sign, public-only keys just verify.
+    """
+    if algorithm in HMACKey.DIGESTS:
+        secrets = dict(keys) if keys else {active_kid: fallback_secret}
+        if keys:
+            secrets.setdefault(LEGACY_KID, fallback_secret)
+        ring = {kid: HMACKey(kid, secret, algorithm) for kid, secret in secrets.items()}
+        default_kid = LEGACY_KID if keys else active_kid
+    else:
+        if not key_files:
+            raise ValueError(f"{algorithm} requires JWT_KEY_FILES")
+        ring = {}
+        for kid, path in key_files.items():
+            with open(path, "rb") as pem_file:
+                ring[kid] = load_pem_key(kid, pem_file.read(), algorithm)
+        default_kid = active_kid
+    return KeyRing(ring, active_kid=active_kid, default_kid=default_kid)
+
+BACKENDS = {
+    "jose": JoseBackend,
+    "fast": FastJWTBackend,
+}
+
+def create_jwt_backend(name: str, key_ring: KeyRing) -> JWTBackend:
+    """
+    Instantiate a backend by name ("fast" or "jose").
+    Key types the backend cannot handle fail here, at startup, rather than
+    on the first login.
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend: {name}")
+    if backend_class.ALGORITHMS is not None:
+        unsupported = sorted({key.algorithm for key in key_ring.keys.values()} - backend_class.ALGORITHMS)
+        if unsupported:
+            raise ValueError(f"JWT backend '{name}' does not support {', '.join(unsupported)}")
+    return backend_class(key_ring)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a JWT signing key (PEM) for JWT_KEY_FILES.")
+    parser.add_argument("--algorithm", default="RS256", choices=sorted(RSAKey.HASHES) + ["EdDSA"])
+    parser.add_argument("--out", required=True, help="Private key output path")
+    parser.add_argument("--public-out", help="Optional public key output path")
+    args = parser.parse_args()
+
+    private_pem = generate_private_key_pem(args.algorithm)
+    with open(args.out, "wb") as out:
+        out.write(private_pem)
+    if args.public_out:
+        public_key = serialization.load_pem_private_key(private_pem, password=None).public_key()
+        with open(args.public_out, "wb") as out:
+            out.write(public_key.public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo
+            ))
+    print(f"Wrote {args.algorithm} key to {args.out}")
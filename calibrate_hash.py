@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Password hash cost calibration.
+Measures verify latency on this machine for increasing cost settings and
+recommends the strongest setting that stays within the target latency.
+"""
+import argparse
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from app.utils.auth import argon2_available
+
+def measure(context: CryptContext, samples: int) -> float:
+    """Return the median verify latency in milliseconds."""
+    hashed = context.hash("calibration-password")
+    context.verify("calibration-password", hashed)  # warm up
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify("calibration-password", hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> None:
+    print(f"bcrypt verify latency (target {target_ms:.0f} ms)\n")
+    print(f"{'rounds':<10}{'median ms':>12}")
+    best = None
+    for rounds in range(10, 17):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        latency = measure(context, samples)
+        print(f"{rounds:<10}{latency:>12.1f}")
+        if latency > target_ms:
+            break
+        best = rounds
+
+    best = best or 10
+    print("\nRecommended .env settings:")
+    print("PASSWORD_HASH_SCHEMES=bcrypt")
+    print(f"BCRYPT_ROUNDS={best}")
+
+def calibrate_argon2(target_ms: float, samples: int, parallelism: int) -> None:
+    print(f"argon2 verify latency (target {target_ms:.0f} ms, parallelism {parallelism})\n")
+    print(f"{'time_cost':<12}{'memory KiB':>12}{'median ms':>12}")
+    best = None
+    for memory_cost in (19456, 32768, 65536, 131072):
+        for time_cost in range(2, 6):
+            context = CryptContext(
+                schemes=["argon2"],
+                argon2__time_cost=time_cost,
+                argon2__memory_cost=memory_cost,
+                argon2__parallelism=parallelism
+            )
+            latency = measure(context, samples)
+            print(f"{time_cost:<12}{memory_cost:>12}{latency:>12.1f}")
+            if latency > target_ms:
+                break
+            # Prefer more memory over more passes at equal latency budget
+            best = (time_cost, memory_cost)
+
+    best = best or (2, 19456)
+    print("\nRecommended .env settings:")
+    print("PASSWORD_HASH_SCHEMES=argon2,bcrypt")
+    print(f"ARGON2_TIME_COST={best[0]}")
+    print(f"ARGON2_MEMORY_COST={best[1]}")
+    print(f"ARGON2_PARALLELISM={parallelism}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt", help="Hash scheme to calibrate")
+    parser.add_argument("--target-ms", type=float, default=250, help="Maximum acceptable verify latency")
+    parser.add_argument("--samples", type=int, default=5, help="Verifications per cost setting")
+    parser.add_argument("--parallelism", type=int, default=4, help="argon2 lanes")
+    args = parser.parse_args()
+
+    if args.scheme == "argon2":
+        if not argon2_available():
+            parser.error("argon2-cffi is not installed")
+        calibrate_argon2(args.target_ms, args.samples, args.parallelism)
+    else:
+        calibrate_bcrypt(args.target_ms, args.samples)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Index advisor.
+Runs the repository read paths against a local MongoDB, records the
+normalized query shapes they issue, explains each one and reports
+collection scans together with proposed compound or partial indexes.
+
+By default a scratch database is seeded with synthetic users and dropped
+afterwards; use --no-seed to analyse an existing local copy instead.
+With --fail-on-collscan it exits non-zero when an index is missing, so it
+can run as a CI check.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core import database
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.index_advisor import IndexAdvisor, summarize
+from app.core.query_shapes import query_shape_recorder
+from app.models.user import User
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.user_archive_repository import UserArchiveRepository
+from app.repositories.user_repository import UserRepository
+
+def synthetic_users(count: int) -> list:
+    """Users shaped like production: mostly active, some long inactive."""
+    now = datetime.utcnow()
+    users = []
+    for index in range(count):
+        created_at = now - timedelta(days=random.randint(0, 720))
+        active = random.random() < 0.8
+        users.append({
+            "email": f"user{index}@example.com",
+            "username": f"user{index}",
+            "first_name": random.choice(["Ada", "Alan", "Grace", "Linus", "Barbara"]),
+            "last_name": random.choice(["Lovelace", "Turing", "Hopper", "Torvalds", "Liskov"]),
+            "hashed_password": "$2b$12$" + "x" * 53,
+            "is_active": active,
+            "is_admin": index == 0,
+            "created_at": created_at,
+            "updated_at": None if active else created_at + timedelta(days=random.randint(0, 30))
+        })
+    return users
+
+async def exercise_repositories(rounds: int) -> None:
+    """
+    Call every repository read path with real values. Read only, so it is
+    safe with --no-seed: the archival job is represented by its selection
+    query, which is the part an index serves.
+    """
+    documents = await User.get_motor_collection().find({}, {"email": 1, "username": 1}).to_list(length=50)
+    if not documents:
+        raise SystemExit("No users to query: seed the database or point --database at a populated one")
+
+    for _ in range(rounds):
+        document = random.choice(documents)
+        user_id, email, username = str(document["_id"]), document["email"], document["username"]
+        user_cache.clear()
+
+        await UserRepository.get_by_id(user_id)
+        await UserRepository.get_many_cached([str(other["_id"]) for other in documents[:10]])
+        await UserRepository.get_by_email(email)
+        await UserRepository.get_by_username(username)
+        await UserRepository.get_by_email_or_username(email)
+        await UserRepository.get_all(skip=20, limit=20, active_only=True)
+        await UserRepository.get_all(skip=20, limit=20, active_only=False)
+        await UserRepository.get_all_projected({"username": 1, "email": 1}, skip=0, limit=20)
+        await UserRepository.get_by_id_projected(user_id, {"username": 1})
+        await UserRepository.count_exact(active_only=True)
+        await UserRepository.count_exact(active_only=False)
+        await UserRepository.search(username[:5], limit=20)
+        await UserRepository.find_identity_conflicts(email, username, exclude_user_id=user_id)
+        await UserRepository.email_exists(email, exclude_user_id=user_id)
+        await UserRepository.username_exists(username)
+        await UserArchiveRepository.get(user_id)
+        await CounterRepository.get(USER_COUNTERS)
+        await UserArchiveRepository.find_archivable(
+            datetime.utcnow() - timedelta(days=settings.USER_ARCHIVE_AFTER_DAYS), settings.USER_ARCHIVE_BATCH_SIZE
+        )
+
+def print_report(findings, examined_ratio: float) -> None:
+    print(f"{'count':>7}  {'plan':<28}{'examined/returned':>20}  query")
+    for finding in sorted(findings, key=lambda finding: finding.count, reverse=True):
+        plan = ">".join(finding.stages) or "?"
+        ratio = f"{finding.docs_examined}/{finding.returned}" if finding.docs_examined is not None else "-"
+        flag = "!" if finding.needs_index else " "
+        query = json.dumps(finding.shape, default=str)
+        print(f"{finding.count:>7}{flag} {plan[:28]:<28}{ratio:>20}  {finding.collection}.{finding.command} {query}")
+        if finding.sort:
+            print(f"{'':>38}sort {finding.sort}")
+        for operation in finding.operations:
+            print(f"{'':>38}from {operation}")
+        for note in finding.notes:
+            print(f"{'':>38}note: {note}")
+
+    proposals = summarize(findings)
+    print()
+    if not proposals:
+        print(f"No missing indexes (collection scans or more than {examined_ratio:g}x documents examined per result).")
+        return
+    print("Proposed indexes (queries served):")
+    for proposal, served in proposals:
+        print(f"  [{proposal.collection}] {proposal.as_code()}  # {served}")
+
+async def analyse(
+    url: str,
+    database_name: str,
+    seed: bool = True,
+    users: int = 5000,
+    rounds: int = 20,
+    examined_ratio: float = 10.0,
+    keep: bool = False
+) -> list:
+    """Record the repository query shapes against `database_name` and explain them."""
+    client = AsyncIOMotorClient(url, event_listeners=[query_shape_recorder])
+    database.mongodb.client = client
+    database.mongodb.database = client[database_name]
+    seeded = False
+    try:
+        if seed:
+            if await database.mongodb.database["users"].estimated_document_count():
+                raise SystemExit(f"{database_name}.users is not empty; use --no-seed to analyse it as is")
+            await database.mongodb.database["users"].insert_many(synthetic_users(users))
+            seeded = True
+
+        # Creates the indexes declared on the models, as the application does
+        await init_beanie(database=database.mongodb.database, document_models=database.DOCUMENT_MODELS)
+        query_shape_recorder.reset()
+        await exercise_repositories(rounds)
+
+        advisor = IndexAdvisor(client.delegate[database_name], examined_ratio=examined_ratio)
+        return advisor.review(query_shape_recorder.shapes(include_samples=True))
+    finally:
+        # Only ever drop a database this run created
+        if seeded and not keep:
+            await client.drop_database(database_name)
+        client.close()
+
+def run(args) -> int:
+    findings = asyncio.run(analyse(
+        args.url, args.database,
+        seed=args.seed, users=args.users, rounds=args.rounds,
+        examined_ratio=args.examined_ratio, keep=args.keep
+    ))
+    if args.json:
+        print(json.dumps([
+            {**finding._asdict(), "proposals": [proposal.as_code() for proposal in finding.proposals]}
+            for finding in findings
+        ], default=str, indent=2))
+    else:
+        print_report(findings, args.examined_ratio)
+
+    return 1 if args.fail_on_collscan and any(finding.needs_index for finding in findings) else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.MONGODB_URL, help="Local MongoDB to run against")
+    parser.add_argument("--database", default=f"{settings.MONGODB_DATABASE}_index_advisor", help="Database to seed (or analyse with --no-seed)")
+    parser.add_argument("--no-seed", dest="seed", action="store_false", help="Use the existing data in --database")
+    parser.add_argument("--users", type=int, default=5000, help="Synthetic users to seed")
+    parser.add_argument("--rounds", type=int, default=20, help="Times each repository read path is exercised")
+    parser.add_argument("--examined-ratio", type=float, default=10.0, help="Flag index scans examining more documents per result than this")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database")
+    parser.add_argument("--json", action="store_true", help="Print findings as JSON")
+    parser.add_argument("--fail-on-collscan", action="store_true", help="Exit with status 1 when an index is proposed")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,141 @@
+"""
+Shared fixtures: the real application (app.main:app) running against an
+in-memory MongoDB stand-in, with MongoDB round trips and password hashing
+calls counted per request.
+"""
+import os
+
+# Test settings must be in place before the application is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("USER_COUNTER_RECONCILE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("USER_ARCHIVE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("CACHE_INVALIDATION_BACKEND", "memory")
+os.environ.setdefault("SCHEDULER_LEASE_BACKEND", "memory")
+
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import pytest
+from beanie import init_beanie
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+import app.main as main
+import app.services.auth_service as auth_service
+from app.core import database
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.throttle import LoginThrottle
+from app.schemas.user_schema import UserCreate
+from app.services.stats_service import stats_cache
+from app.repositories.user_repository import UserRepository
+from app.utils.auth import JWTManager, PasswordManager, pwd_context
+
+# Collection methods that each cost one round trip to the server
+COLLECTION_COMMANDS = [
+    "find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "bulk_write",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+]
+
+# Password hashing calls (each one is a full bcrypt/argon2 computation)
+HASH_CALLS = ["hash", "verify", "verify_and_update"]
+
+class RoundTrips:
+    """Records MongoDB commands and password hash calls while measuring."""
+
+    def __init__(self):
+        self.active = False
+        self.commands: List[Tuple[str, str]] = []
+        self.hash_calls: List[str] = []
+
+    @property
+    def queries(self) -> int:
+        return len(self.commands)
+
+    @property
+    def hashes(self) -> int:
+        return len(self.hash_calls)
+
+    @contextmanager
+    def measure(self):
+        """Count everything issued inside the block, starting from a cold user cache."""
+        self.commands.clear()
+        self.hash_calls.clear()
+        user_cache.clear()
+        self.active = True
+        try:
+            yield self
+        finally:
+            self.active = False
+
+@pytest.fixture
+def round_trips(monkeypatch) -> RoundTrips:
+    recorder = RoundTrips()
+
+    def count_command(name, original):
+        def wrapper(self, *args, **kwargs):
+            if recorder.active:
+                recorder.commands.append((self.name, name))
+            return original(self, *args, **kwargs)
+        return wrapper
+
+    def count_hash(name, original):
+        def wrapper(*args, **kwargs):
+            if recorder.active:
+                recorder.hash_calls.append(name)
+            return original(*args, **kwargs)
+        return wrapper
+
+    for name in COLLECTION_COMMANDS:
+        monkeypatch.setattr(AsyncMongoMockCollection, name, count_command(name, getattr(AsyncMongoMockCollection, name)))
+    for name in HASH_CALLS:
+        monkeypatch.setattr(pwd_context, name, count_hash(name, getattr(pwd_context, name)))
+    return recorder
+
+@pytest.fixture
+def client(monkeypatch, round_trips):
+    async def connect_to_stand_in():
+        database.mongodb.client = AsyncMongoMockClient()
+        database.mongodb.database = database.mongodb.client[settings.MONGODB_DATABASE]
+        await database.migrate_indexes(database.mongodb.database)
+        await init_beanie(database=database.mongodb.database, document_models=database.DOCUMENT_MODELS)
+
+    monkeypatch.setattr(main, "connect_to_mongo", connect_to_stand_in)
+    monkeypatch.setattr(auth_service, "login_throttle", LoginThrottle(
+        ip_burst=settings.LOGIN_THROTTLE_IP_BURST,
+        ip_refill_per_second=settings.LOGIN_THROTTLE_IP_REFILL_PER_SECOND,
+        max_failures=settings.LOGIN_THROTTLE_MAX_FAILURES,
+        window_seconds=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+        max_entries=settings.LOGIN_THROTTLE_MAX_ENTRIES,
+        shards=settings.LOGIN_THROTTLE_SHARDS
+    ))
+    user_cache.clear()
+    stats_cache.clear()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+def create_user(client: TestClient, username: str, is_admin: bool = False) -> dict:
+    """Create a user directly through the repository and return its id and tokens."""
+    async def create():
+        user_data = UserCreate(
+            email=f"{username}@example.com",
+            username=username,
+            first_name="Test",
+            last_name="User",
+            password="Password123",
+            is_admin=is_admin
+        )
+        return await UserRepository.create(user_data, PasswordManager.hash_password("Password123"))
+
+    user = client.portal.call(create)
+    tokens = JWTManager.create_token_pair(str(user.id), user.username, user.email)
+    return {"id": str(user.id), "username": user.username, "password": "Password123", **tokens}
+
+@pytest.fixture
+def users(client) -> dict:
+    """An admin and a regular user, with tokens."""
+    return {
+        "admin": create_user(client, "admin", is_admin=True),
+        "user": create_user(client, "member")
+    }
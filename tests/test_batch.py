@@ -0,0 +1,41 @@
+"""
+Batch endpoint: sub-requests share the caller's authentication, come back
+in request order, and cannot reach nested batches or credential routes.
+"""
+
+def test_sub_requests_run_in_order(client, users):
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+    response = client.post("/api/v1/batch", headers=headers, json={"requests": [
+        {"path": "/api/v1/auth/me"},
+        {"path": f"/api/v1/users/{users['admin']['id']}"},
+        {"path": "/api/v1/no-such-route"},
+    ]})
+
+    assert response.status_code == 200
+    me, other, missing = response.json()["responses"]
+    assert me["status"] == 200 and me["body"]["username"] == "member"
+    assert other["status"] == 403
+    assert missing["status"] == 404
+
+def test_batch_requires_authentication(client):
+    assert client.post("/api/v1/batch", json={"requests": [{"path": "/api/v1/auth/me"}]}).status_code in (401, 403)
+
+def test_nested_batches_and_credential_routes_are_refused(client, users):
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+    refused = [
+        {"method": "POST", "path": "/api/v1/batch", "body": {"requests": [{"path": "/api/v1/auth/me"}]}},
+        {"method": "POST", "path": "/api/v1/batch/?x=1", "body": {}},
+        {"method": "POST", "path": "/api/v1/auth/login", "body": {"username": "member", "password": "Password123"}},
+        {"method": "POST", "path": "/api/v1/auth/register/", "body": {}},
+        {"method": "PUT", "path": "/api/v1/auth/change-password", "body": {}},
+        {"path": "/docs"},
+    ]
+    responses = client.post("/api/v1/batch", headers=headers, json={"requests": refused}).json()["responses"]
+    assert [response["status"] for response in responses] == [400] * len(refused)
+    assert responses[2]["body"] == {"detail": "Credential endpoints cannot be batched"}
+
+    # Only the batch path itself is reserved, not every path sharing its prefix
+    [neighbour] = client.post("/api/v1/batch", headers=headers, json={"requests": [
+        {"path": "/api/v1/batchX"}
+    ]}).json()["responses"]
+    assert neighbour["status"] == 404
@@ -0,0 +1,71 @@
+"""
+Admin bulk operations: one server-side write per action, counters kept
+in line and cached users evicted.
+"""
+import pytest
+from pydantic import ValidationError
+
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.user_repository import UserRepository
+from app.schemas.user_schema import BulkUserAction
+from conftest import create_user
+
+def bearer(user: dict) -> dict:
+    return {"Authorization": f"Bearer {user['access_token']}"}
+
+def counters(client) -> dict:
+    return client.portal.call(CounterRepository.get, USER_COUNTERS)
+
+def test_deactivate_by_filter_evicts_cached_users(client, users, round_trips):
+    others = [create_user(client, f"member{index}") for index in range(3)]
+    # Warm the user cache for one of them
+    assert client.get("/api/v1/auth/me", headers=bearer(others[0])).status_code == 200
+
+    with round_trips.measure():
+        response = client.post("/api/v1/admin/users/bulk", headers=bearer(users["admin"]), json={
+            "action": "deactivate", "filter": {"is_active": True}
+        })
+    assert response.status_code == 200
+    # The calling admin is left out
+    assert response.json() == {"action": "deactivate", "matched": 4, "modified": 4}
+    assert [name for _, name in round_trips.commands].count("update_many") == 1
+    assert counters(client) == {"total": 5, "active": 1}
+    assert client.get("/api/v1/auth/me", headers=bearer(others[0])).status_code != 200
+
+    response = client.post("/api/v1/admin/users/bulk", headers=bearer(users["admin"]), json={
+        "action": "deactivate", "user_ids": [others[0]["id"], users["user"]["id"]]
+    })
+    assert response.json() == {"action": "deactivate", "matched": 2, "modified": 0}
+
+def test_hard_delete_by_ids_adjusts_counters(client, users):
+    inactive = create_user(client, "inactive")
+    client.post("/api/v1/admin/users/bulk", headers=bearer(users["admin"]), json={
+        "action": "deactivate", "user_ids": [inactive["id"]]
+    })
+
+    response = client.post("/api/v1/admin/users/bulk", headers=bearer(users["admin"]), json={
+        "action": "hard_delete", "user_ids": [users["user"]["id"], inactive["id"], users["admin"]["id"], "not-an-id"]
+    })
+    assert response.json() == {"action": "hard_delete", "matched": 2, "modified": 2}
+    assert counters(client) == {"total": 1, "active": 1}
+
+def test_selection_is_required_and_bounded(client, users):
+    for body in (
+        {"action": "activate"},
+        {"action": "activate", "filter": {}},
+        {"action": "activate", "user_ids": [users["user"]["id"]], "filter": {"is_admin": False}},
+        {"action": "promote", "user_ids": [users["user"]["id"]]},
+    ):
+        response = client.post("/api/v1/admin/users/bulk", headers=bearer(users["admin"]), json=body)
+        assert response.status_code == 422, body
+    response = client.post("/api/v1/admin/users/bulk", headers=bearer(users["user"]), json={
+        "action": "make_admin", "user_ids": [users["user"]["id"]]
+    })
+    assert response.status_code == 403
+
+def test_schema_and_repository_refuse_an_empty_selection(client, users):
+    with pytest.raises(ValidationError):
+        BulkUserAction(action="hard_delete")
+    with pytest.raises(ValueError):
+        client.portal.call(UserRepository.bulk_hard_delete, {}, None, users["admin"]["id"])
+    assert counters(client) == {"total": 2, "active": 2}
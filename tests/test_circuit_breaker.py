@@ -0,0 +1,98 @@
+"""
+MongoDB circuit breaker: unavailability errors trip it, misses and
+other errors do not, and an open circuit is answered with a fast 503.
+"""
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, DatabaseUnavailable
+from app.models.user import User
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+async def unavailable():
+    raise ServerSelectionTimeoutError("no servers")
+
+async def duplicate():
+    raise DuplicateKeyError("duplicate")
+
+async def found():
+    return "user"
+
+def call(breaker: CircuitBreaker, func):
+    return asyncio.run(breaker.call(func))
+
+def test_opens_after_consecutive_failures_and_fails_fast(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10, clock=clock)
+
+    for _ in range(3):
+        with pytest.raises(DatabaseUnavailable):
+            call(breaker, unavailable)
+    assert breaker.state == OPEN
+
+    with pytest.raises(DatabaseUnavailable) as rejected:
+        call(breaker, found)
+    assert rejected.value.retry_after == 10
+
+def test_other_errors_and_successes_reset_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, clock=clock)
+
+    with pytest.raises(DatabaseUnavailable):
+        call(breaker, unavailable)
+    with pytest.raises(DuplicateKeyError):
+        call(breaker, duplicate)
+    with pytest.raises(DatabaseUnavailable):
+        call(breaker, unavailable)
+    assert breaker.state == CLOSED
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10, clock=clock)
+    with pytest.raises(DatabaseUnavailable):
+        call(breaker, unavailable)
+
+    clock.now += 10
+    with pytest.raises(DatabaseUnavailable):
+        call(breaker, unavailable)
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+    breaker.record_success(probe=True)
+    assert breaker.state == CLOSED
+
+def test_unavailable_database_is_503_not_401(client, users, monkeypatch):
+    breaker = circuit_breaker.mongo_breaker
+    for name, value in {"failure_threshold": 2, "reset_seconds": 30, "state": CLOSED, "failures": 0}.items():
+        monkeypatch.setattr(breaker, name, value)
+
+    async def get(*args, **kwargs):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(User, "get", get)
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+
+    for _ in range(3):
+        response = client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    assert breaker.state == OPEN
+    assert client.get("/health").json()["database"]["state"] == OPEN
+
+def test_malformed_id_is_a_miss(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    assert client.get("/api/v1/users/not-an-id", headers=headers).status_code == 404
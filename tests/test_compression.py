@@ -0,0 +1,74 @@
+"""
+Response compression: encoding negotiation, the size threshold, streaming
+and entity tags of compressed responses.
+"""
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.compression import Compressor, CompressionMiddleware, negotiate_encoding
+
+BODY = "compress me " * 200
+
+def compressed_client() -> TestClient:
+    async def strong(request):
+        return PlainTextResponse(BODY, headers={"ETag": '"abc"'})
+
+    async def weak(request):
+        return PlainTextResponse(BODY, headers={"ETag": 'W/"abc"'})
+
+    async def small(request):
+        return PlainTextResponse("tiny", headers={"ETag": '"tiny"'})
+
+    async def stream(request):
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+        return StreamingResponse(chunks(), media_type="text/plain", headers={"ETag": '"stream"'})
+
+    app = Starlette(routes=[
+        Route("/strong", strong), Route("/weak", weak), Route("/small", small), Route("/stream", stream)
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    return TestClient(app)
+
+def test_negotiate_encoding():
+    supported = ["br", "zstd", "gzip"]
+    assert negotiate_encoding("gzip, br", supported) == "br"
+    assert negotiate_encoding("gzip;q=1, br;q=0.5", supported) == "gzip"
+    assert negotiate_encoding("br;q=0, *", supported) == "zstd"
+    assert negotiate_encoding("identity", supported) is None
+
+def test_compressor_is_abstract():
+    with pytest.raises(TypeError):
+        Compressor()
+
+def test_compressed_responses_carry_weak_etags():
+    client = compressed_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/strong", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.text == BODY
+
+    assert client.get("/weak", headers=headers).headers["etag"] == 'W/"abc"'
+    assert client.get("/stream", headers=headers).headers["etag"] == 'W/"stream"'
+
+    # Uncompressed responses keep their strong tags
+    small = client.get("/small", headers=headers)
+    assert "content-encoding" not in small.headers and small.headers["etag"] == '"tiny"'
+    assert client.get("/strong", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"abc"'
+
+def test_streaming_responses_are_compressed_incrementally():
+    client = compressed_client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode() == BODY * 3
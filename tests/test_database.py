@@ -0,0 +1,50 @@
+"""
+Startup index migration: superseded indexes from earlier versions are
+dropped, and identity indexes rebuilt as unique unless duplicates exist.
+"""
+import asyncio
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core.database import DOCUMENT_MODELS, migrate_indexes
+
+def legacy_database(*documents):
+    """A database whose users collection has the old non-unique indexes."""
+    database = AsyncMongoMockClient()["migration_test"]
+
+    async def create():
+        users = database["users"]
+        await users.create_index("email")
+        await users.create_index("username")
+        await users.create_index("created_at")
+        if documents:
+            await users.insert_many(list(documents))
+    asyncio.run(create())
+    return database
+
+def test_identity_indexes_are_rebuilt_unique():
+    database = legacy_database({"email": "ada@example.com", "username": "ada"})
+
+    async def migrate():
+        await migrate_indexes(database)
+        await init_beanie(database=database, document_models=DOCUMENT_MODELS)
+        return await database["users"].index_information()
+
+    indexes = asyncio.run(migrate())
+    assert indexes["email_1"]["unique"] and indexes["username_1"]["unique"]
+    # The full created_at index gave way to the partial one
+    assert "created_at_1" not in indexes and "created_at_active" in indexes
+    # Nothing left to migrate on the next start
+    asyncio.run(migrate_indexes(database))
+
+def test_duplicate_identities_stop_the_migration():
+    database = legacy_database(
+        {"email": "ada@example.com", "username": "ada"},
+        {"email": "ada@example.com", "username": "lovelace"}
+    )
+    with pytest.raises(RuntimeError, match="users.email"):
+        asyncio.run(migrate_indexes(database))
+    indexes = asyncio.run(database["users"].index_information())
+    assert "email_1" in indexes and not indexes["email_1"].get("unique")
@@ -0,0 +1,46 @@
+"""
+Request deadlines: budgets come from the header or the route policy, and
+an expired request does no further database or password hashing work.
+"""
+import pytest
+
+from app.core import deadline
+from app.middleware.deadline import DeadlineMiddleware
+
+def scope(path: str, headers=()) -> dict:
+    return {"type": "http", "path": path, "headers": [(name.encode(), value.encode()) for name, value in headers]}
+
+def test_budget_from_header_route_or_default():
+    middleware = DeadlineMiddleware(None, routes={"/api/v1/users": 2000, "/api/v1/users/admin": 0}, default_ms=500, max_ms=5000)
+
+    assert middleware.budget_ms(scope("/api/v1/users/search/")) == 2000
+    assert middleware.budget_ms(scope("/api/v1/users/admin/export")) is None
+    assert middleware.budget_ms(scope("/health")) == 500
+    assert middleware.budget_ms(scope("/health", [("x-request-timeout-ms", "250")])) == 250
+    # The header can shorten a route's budget but never extend it
+    assert middleware.budget_ms(scope("/health", [("x-request-timeout-ms", "999999")])) == 500
+    assert middleware.budget_ms(scope("/api/v1/users/", [("x-request-timeout-ms", "30000")])) == 2000
+    assert middleware.budget_ms(scope("/api/v1/users/", [("x-request-timeout-ms", "100")])) == 100
+    # Without a route deadline it is capped at max_ms
+    assert middleware.budget_ms(scope("/api/v1/users/admin/export", [("x-request-timeout-ms", "999999")])) == 5000
+    assert middleware.budget_ms(scope("/api/v1/users/", [("x-request-timeout-ms", "soon")])) == 2000
+
+@pytest.fixture
+def expiring_deadlines(monkeypatch):
+    """Every deadline is already over by the time it is first checked."""
+    ticks = iter(range(0, 10**6, 60))
+    monkeypatch.setattr(deadline, "clock", lambda: float(next(ticks)))
+
+def test_expired_request_skips_database_and_hashing(client, users, round_trips, expiring_deadlines):
+    with round_trips.measure():
+        response = client.post("/api/v1/auth/login", json={
+            "identifier": users["user"]["username"], "password": users["user"]["password"]
+        })
+
+    assert response.status_code == 504
+    assert round_trips.queries == 0
+    assert round_trips.hashes == 0
+
+def test_requests_without_deadline_are_unaffected(client, users, expiring_deadlines):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    assert client.get("/api/v1/admin/metrics", headers=headers).status_code == 200
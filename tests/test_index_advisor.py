@@ -0,0 +1,122 @@
+"""
+Query shape recording and index proposals.
+
+The last test runs the real repository workload through index_advisor.py
+and needs a local MongoDB: set INDEX_ADVISOR_MONGODB_URL to enable it.
+"""
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.index_advisor import IndexAdvisor, IndexProposal, flatten, plan_stages, propose
+from app.core.query_shapes import QueryShapeRecorder
+
+def started(command_name: str, command: dict) -> SimpleNamespace:
+    return SimpleNamespace(command_name=command_name, command={command_name: "users", **command, "lsid": {"id": 1}}, database_name="db")
+
+def test_recorder_groups_commands_by_shape():
+    recorder = QueryShapeRecorder()
+    recorder.started(started("find", {"filter": {"email": "a@example.com"}}))
+    recorder.started(started("find", {"filter": {"email": "b@example.com"}}))
+    recorder.started(started("find", {"filter": {"is_active": True}, "sort": {"created_at": 1}}))
+    recorder.started(started("insert", {"documents": [{}]}))
+
+    shapes = recorder.shapes(include_samples=True)
+    assert [(shape["shape"], shape["count"]) for shape in shapes] == [({"email": "?"}, 2), ({"is_active": "?"}, 1)]
+    assert shapes[0]["sample"] == {"find": "users", "filter": {"email": "a@example.com"}}
+    assert shapes[1]["sort"] == [["created_at", 1]]
+    assert "sample" not in recorder.shapes()[0]
+
+def test_or_branches_each_get_an_index():
+    branches = flatten({"$or": [{"email": "a"}, {"username": "a"}], "_id": {"$ne": "x"}})
+    proposals = [propose("users", branch, [])[0] for branch in branches]
+    assert proposals == [
+        IndexProposal("users", (("email", 1),)),
+        IndexProposal("users", (("username", 1),)),
+    ]
+
+def test_equality_sort_range_order_and_partial_filter():
+    branch = flatten({"is_active": True, "last_name": "Hopper", "created_at": {"$gt": 0}})[0]
+    proposal, _ = propose("users", branch, [["first_name", -1]])
+    assert proposal.keys == (("last_name", 1), ("first_name", -1), ("created_at", 1))
+    assert proposal.partial == (("is_active", True),)
+    assert proposal.as_code() == (
+        'IndexModel([("last_name", ASCENDING), ("first_name", DESCENDING), ("created_at", ASCENDING)], '
+        'name="last_name_first_name_created_at_is_active_true", partialFilterExpression={"is_active": True})'
+    )
+
+def test_unanchored_regex_is_reported_not_indexed():
+    proposal, notes = propose("users", [("email", {"$regex": "ada", "$options": "i"})], [])
+    assert proposal is None
+    assert notes and "regex" in notes[0]
+
+def test_plan_stages_reads_classic_and_slot_based_plans():
+    classic = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    slot_based = {"queryPlan": {"stage": "COLLSCAN"}, "slotBasedPlan": {}}
+    assert plan_stages(classic) == ["LIMIT", "FETCH", "IXSCAN"]
+    assert plan_stages(slot_based) == ["COLLSCAN"]
+
+def test_advisor_proposes_for_collection_scans_only():
+    class Database:
+        def command(self, command):
+            filter_ = command["explain"]["filter"]
+            stage = "IXSCAN" if "email" in filter_ else "COLLSCAN"
+            return {
+                "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": stage}}},
+                "executionStats": {"nReturned": 1, "totalDocsExamined": 1 if stage == "IXSCAN" else 5000}
+            }
+
+        def __getitem__(self, name):
+            return SimpleNamespace(list_indexes=lambda: [{"key": {"_id": 1}}, {"key": {"email": 1}}])
+
+    recorder = QueryShapeRecorder()
+    recorder.started(started("find", {"filter": {"email": "a@example.com"}}))
+    recorder.started(started("find", {"filter": {"is_active": True}, "sort": {"created_at": 1}}))
+    findings = IndexAdvisor(Database()).review(recorder.shapes(include_samples=True))
+
+    by_shape = {str(finding.shape): finding for finding in findings}
+    assert not by_shape["{'email': '?'}"].needs_index
+    scan = by_shape["{'is_active': '?'}"]
+    assert scan.collscan
+    assert scan.proposals == [IndexProposal("users", (("created_at", 1),), (("is_active", True),))]
+
+def test_workload_is_read_only(client, users, round_trips):
+    import index_advisor
+    from app.models.user import User
+
+    # Archivable, so the old workload (which ran the archival job) would have moved it
+    long_ago = datetime.utcnow() - timedelta(days=3650)
+    dormant = User(
+        email="dormant@example.com", username="dormant", first_name="D", last_name="U",
+        hashed_password="x", is_active=False, created_at=long_ago, updated_at=long_ago
+    )
+    client.portal.call(dormant.insert)
+
+    with round_trips.measure():
+        client.portal.call(index_advisor.exercise_repositories, 2)
+    reads = {"find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct"}
+    assert round_trips.commands
+    assert [command for command in round_trips.commands if command[1] not in reads] == []
+    assert client.portal.call(User.get, dormant.id) is not None
+
+@pytest.mark.skipif(not os.environ.get("INDEX_ADVISOR_MONGODB_URL"), reason="needs a local MongoDB")
+def test_authentication_lookups_are_indexed():
+    import asyncio
+    import index_advisor
+
+    findings = asyncio.run(index_advisor.analyse(
+        os.environ["INDEX_ADVISOR_MONGODB_URL"], "index_advisor_test", users=2000, rounds=3
+    ))
+    hot_paths = {
+        "UserRepository.get_by_email_or_username",
+        "UserRepository.find_identity_conflicts",
+        "UserRepository.email_exists",
+        "UserRepository.username_exists",
+    }
+    missing = [
+        finding for finding in findings
+        if hot_paths & set(finding.operations) and finding.needs_index
+    ]
+    assert not missing, [(finding.operations, finding.shape, finding.proposals) for finding in missing]
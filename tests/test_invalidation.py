@@ -0,0 +1,79 @@
+"""
+Cache invalidation bus: a write on one worker evicts the key from every
+other worker's cache.
+"""
+import asyncio
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.invalidation import USER, InvalidationBus, MemoryInvalidationBus, MongoInvalidationBus
+from app.repositories import user_repository
+from app.repositories.user_repository import UserRepository
+
+def worker(broker: list) -> tuple:
+    cache = TTLCache("users", max_entries=100, ttl_seconds=60)
+    bus = MemoryInvalidationBus(broker, max_keys=2)
+    bus.register(USER, cache)
+    return bus, cache
+
+def test_publish_evicts_on_every_worker():
+    broker = []
+    (first, first_cache), (second, second_cache) = worker(broker), worker(broker)
+    for cache in (first_cache, second_cache):
+        cache.set("a", "stale")
+        cache.set("b", "fresh")
+
+    asyncio.run(first.publish(USER, ["a"], reason="update"))
+    assert first_cache.get("a") is None and second_cache.get("a") is None
+    assert first_cache.get("b") == "fresh" and second_cache.get("b") == "fresh"
+
+    # More keys than max_keys: one event clearing the whole cache everywhere
+    second_cache.set("c", "stale")
+    asyncio.run(second.publish(USER, ["b", "c", "d"], reason="bulk"))
+    assert len(first_cache) == 0 and len(second_cache) == 0
+
+def test_own_events_are_not_applied_twice():
+    broker = []
+    bus, cache = worker(broker)
+    cache.set("a", "value")
+    event = {"kind": USER, "keys": ["a"], "origin": bus.origin}
+    bus.deliver(event)
+    assert cache.get("a") == "value"
+
+def test_ended_change_stream_resyncs(monkeypatch):
+    bus = MongoInvalidationBus()
+    cache = TTLCache("users", max_entries=100, ttl_seconds=60)
+    bus.register(USER, cache)
+    streams = []
+
+    async def follow_change_stream():
+        streams.append(len(cache))
+        if len(streams) == 2:
+            raise asyncio.CancelledError
+        # The stream closes normally after the cache was filled
+        cache.set("a", "maybe stale")
+
+    monkeypatch.setattr(bus, "follow_change_stream", follow_change_stream)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(bus.follow())
+    # The cache was cleared before the second stream was opened
+    assert streams == [0, 0]
+
+def test_the_base_bus_needs_a_transport():
+    with pytest.raises(TypeError):
+        InvalidationBus()
+
+def test_password_update_of_a_missing_user_publishes_nothing(client, users, monkeypatch):
+    published = []
+
+    async def publish(kind, keys, reason):
+        published.append((kind, list(keys), reason))
+
+    monkeypatch.setattr(user_repository.invalidation_bus, "publish", publish)
+    missing = "0123456789abcdef01234567"
+    assert client.portal.call(UserRepository.update_password, missing, "hash") is False
+    assert published == []
+
+    assert client.portal.call(UserRepository.update_password, users["user"]["id"], "hash") is True
+    assert published == [(USER, [users["user"]["id"]], "password")]
@@ -0,0 +1,165 @@
+"""
+JWT engine: both backends must accept exactly the same tokens, across key
+rotation and for tokens signed before a key ring was configured.
+"""
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from jose import jwt
+
+from app.utils.jwt_engine import (
+    LEGACY_KID, FastJWTBackend, JoseBackend, TokenError, TokenExpired,
+    b64url_decode, b64url_encode, build_key_ring, create_jwt_backend, generate_private_key_pem
+)
+
+BACKENDS = [FastJWTBackend, JoseBackend]
+
+def hmac_ring(keys, active_kid, fallback_secret="legacy-secret"):
+    return build_key_ring(keys, active_kid=active_kid, algorithm="HS256", fallback_secret=fallback_secret)
+
+def claims(**extra):
+    return {"sub": "user-1", "type": "access", "exp": int(time.time()) + 60, **extra}
+
+def with_header(token, **header):
+    """Replace the header of a token, keeping its payload and signature."""
+    _, payload, signature = token.split(".")
+    return ".".join([b64url_encode(json.dumps(header).encode()), payload, signature])
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_round_trip_and_tampered_signature(backend_class):
+    backend = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    token = backend.encode(claims())
+    assert backend.decode(token)["sub"] == "user-1"
+
+    header, payload, signature = token.split(".")
+    forged_payload = b64url_encode(json.dumps(claims(sub="admin")).encode())
+    with pytest.raises(TokenError):
+        backend.decode(f"{header}.{forged_payload}.{signature}")
+
+    flipped = bytearray(b64url_decode(signature))
+    flipped[0] ^= 1
+    with pytest.raises(TokenError):
+        backend.decode(f"{header}.{payload}.{b64url_encode(bytes(flipped))}")
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_expired_tokens_are_rejected(backend_class):
+    backend = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    token = backend.encode(claims(exp=int(time.time()) - 5))
+    with pytest.raises(TokenExpired):
+        backend.decode(token)
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_algorithm_mismatch_and_none_are_rejected(backend_class):
+    backend = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    token = backend.encode(claims())
+
+    with pytest.raises(TokenError):
+        backend.decode(with_header(token, alg="HS512", typ="JWT", kid="k1"))
+
+    header, payload, _ = with_header(token, alg="none", typ="JWT", kid="k1").split(".")
+    with pytest.raises(TokenError):
+        backend.decode(f"{header}.{payload}.")
+    with pytest.raises(TokenError):
+        backend.decode(f"{header}.{payload}.{b64url_encode(b'x')}")
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_unknown_kid_is_rejected(backend_class):
+    signer = backend_class(hmac_ring({"k9": "secret-nine"}, "k9"))
+    verifier = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    with pytest.raises(TokenError):
+        verifier.decode(signer.encode(claims()))
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_rotation_keeps_outstanding_tokens_valid(backend_class):
+    before = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    old_token = before.encode(claims())
+
+    rotated = backend_class(hmac_ring({"k1": "secret-one", "k2": "secret-two"}, "k2"))
+    new_token = rotated.encode(claims())
+    assert jwt.get_unverified_header(new_token)["kid"] == "k2"
+    assert rotated.decode(old_token)["sub"] == "user-1"
+    assert rotated.decode(new_token)["sub"] == "user-1"
+
+    # Once k1 is retired its tokens stop verifying
+    retired = backend_class(hmac_ring({"k2": "secret-two"}, "k2"))
+    assert retired.decode(new_token)["sub"] == "user-1"
+    with pytest.raises(TokenError):
+        retired.decode(old_token)
+
+@pytest.mark.parametrize("backend_class", BACKENDS)
+def test_legacy_secret_keeps_verifying_after_keys_are_configured(backend_class):
+    # Issued before JWT_KEYS existed: no kid at all, or the default kid
+    without_kid = jwt.encode(claims(), "legacy-secret", algorithm="HS256")
+    default_kid = backend_class(hmac_ring({}, LEGACY_KID)).encode(claims())
+
+    backend = backend_class(hmac_ring({"k1": "secret-one"}, "k1"))
+    assert backend.decode(without_kid)["sub"] == "user-1"
+    assert backend.decode(default_kid)["sub"] == "user-1"
+    # New tokens are still signed with the active key
+    assert jwt.get_unverified_header(backend.encode(claims()))["kid"] == "k1"
+
+def test_backends_accept_each_others_tokens():
+    ring = hmac_ring({"k1": "secret-one", "k2": "secret-two"}, "k2")
+    fast, jose_backend = FastJWTBackend(ring), JoseBackend(ring)
+    token_claims = claims(jti="abc")
+
+    assert jose_backend.decode(fast.encode(token_claims)) == token_claims
+    assert fast.decode(jose_backend.encode(token_claims)) == token_claims
+
+def pem_ring(tmp_path, algorithm, active_kid, retired_kid=None):
+    """Key ring from PEM files; the retired key is given as its public half only."""
+    key_files = {}
+    for kid in filter(None, [active_kid, retired_kid]):
+        pem = generate_private_key_pem(algorithm)
+        if kid == retired_kid:
+            pem = serialization.load_pem_private_key(pem, password=None).public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+        path = tmp_path / f"{kid}.pem"
+        path.write_bytes(pem)
+        key_files[kid] = str(path)
+    return build_key_ring({}, active_kid=active_kid, algorithm=algorithm, fallback_secret="unused", key_files=key_files)
+
+def test_rs256_signing_interoperates_and_is_published(tmp_path):
+    ring = pem_ring(tmp_path, "RS256", "rsa-1", retired_kid="rsa-0")
+    fast = create_jwt_backend("fast", ring)
+    jose_backend = create_jwt_backend("jose", ring)
+    token_claims = claims()
+
+    token = fast.encode(token_claims)
+    assert jose_backend.decode(token) == token_claims
+    assert fast.decode(jose_backend.encode(token_claims)) == token_claims
+
+    jwks = ring.jwks()["keys"]
+    assert sorted(jwk["kid"] for jwk in jwks) == ["rsa-0", "rsa-1"]
+    assert all(jwk["kty"] == "RSA" and jwk["alg"] == "RS256" and jwk["use"] == "sig" for jwk in jwks)
+    # Another service can verify with nothing but the published key
+    published = next(jwk for jwk in jwks if jwk["kid"] == "rsa-1")
+    assert jwt.decode(token, published, algorithms=["RS256"]) == token_claims
+
+    with pytest.raises(ValueError):
+        build_key_ring({}, active_kid="rsa-0", algorithm="RS256", fallback_secret="unused",
+                       key_files={"rsa-0": str(tmp_path / "rsa-0.pem")})
+
+def test_eddsa_signing_and_jwks(tmp_path):
+    ring = pem_ring(tmp_path, "EdDSA", "ed-1")
+    backend = create_jwt_backend("fast", ring)
+    token = backend.encode(claims())
+    assert jwt.get_unverified_header(token)["alg"] == "EdDSA"
+    assert backend.decode(token)["sub"] == "user-1"
+
+    [jwk] = ring.jwks()["keys"]
+    assert (jwk["kty"], jwk["crv"], jwk["kid"]) == ("OKP", "Ed25519", "ed-1")
+    signing_input, _, signature = token.rpartition(".")
+    public_key = ed25519.Ed25519PublicKey.from_public_bytes(b64url_decode(jwk["x"]))
+    public_key.verify(b64url_decode(signature), signing_input.encode("ascii"))
+
+    # python-jose has no EdDSA: refused when the backend is created, not at the first login
+    with pytest.raises(ValueError, match="EdDSA"):
+        create_jwt_backend("jose", ring)
+
+def test_symmetric_keys_are_never_published():
+    assert hmac_ring({"k1": "secret-one"}, "k1").jwks() == {"keys": []}
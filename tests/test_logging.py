@@ -0,0 +1,130 @@
+"""
+Queue-based logging: per call site rate limiting, JSON output with the
+request id, and a queue that drops instead of blocking.
+"""
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.core import logs
+from app.core.logs import (
+    ROUTED_LOGGERS, JsonFormatter, LogPipeline, NonBlockingQueueHandler, RateLimitFilter, RequestIdFilter,
+    current_request_id
+)
+from app.core.memory import memory_accounting
+from app.core.metrics import metrics
+
+def record(message: str = "boom", lineno: int = 10, **extra) -> logging.LogRecord:
+    entry = logging.LogRecord("app.test", logging.ERROR, "app/test.py", lineno, message, None, None)
+    entry.__dict__.update(extra)
+    return entry
+
+def test_rate_limit_per_call_site_reports_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logs.time, "monotonic", lambda: now[0])
+    limiter = RateLimitFilter(rate_per_second=1, burst=5)
+
+    assert sum(limiter.filter(record()) for _ in range(50)) == 5
+    # Another call site has its own budget
+    assert limiter.filter(record(lineno=11))
+
+    now[0] += 1
+    let_through = record()
+    assert limiter.filter(let_through)
+    assert let_through.suppressed == 45
+
+def test_json_lines_carry_request_id_extra_and_traceback():
+    token = current_request_id.set("req-1")
+    try:
+        entry = record("failed %s", path="/api/v1/users")
+        entry.args = ("lookup",)
+        RequestIdFilter().filter(entry)
+    finally:
+        current_request_id.reset(token)
+    try:
+        raise ValueError("bad")
+    except ValueError as exc:
+        entry.exc_info = (type(exc), exc, exc.__traceback__)
+
+    line = json.loads(JsonFormatter().format(entry))
+    assert line["message"] == "failed lookup"
+    assert line["request_id"] == "req-1"
+    assert line["path"] == "/api/v1/users"
+    assert "ValueError: bad" in line["exception"]
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = metrics.snapshot()["counters"].get("logging.dropped", 0)
+    handler.handle(record())
+    handler.handle(record())
+    assert handler.queue.qsize() == 1
+    assert metrics.snapshot()["counters"]["logging.dropped"] == before + 1
+
+def test_request_id_is_echoed_or_generated(client):
+    assert client.get("/health", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+    generated = client.get("/health", headers={"X-Request-ID": "not valid!"}).headers["x-request-id"]
+    assert generated != "not valid!" and len(generated) == 32
+    # A trailing newline satisfies `$`, so the whole id must match
+    assert len(client.get("/health", headers={"X-Request-ID": "abc\n"}).headers["x-request-id"]) == 32
+
+def test_unhandled_errors_keep_the_request_id(monkeypatch, caplog):
+    def fail():
+        raise RuntimeError("status unavailable")
+
+    monkeypatch.setattr(main.mongo_breaker, "status", fail)
+    # Debug mode renders tracebacks instead of calling the handler; rebuild the stack without it
+    monkeypatch.setattr(main.app, "debug", False)
+    monkeypatch.setattr(main.app, "middleware_stack", None)
+    caplog.set_level(logging.ERROR, logger=main.logger.name)
+    response = TestClient(main.app, raise_server_exceptions=False).get("/health", headers={"X-Request-ID": "req-500"})
+
+    assert response.status_code == 500
+    assert response.headers["x-request-id"] == "req-500"
+    [entry] = [entry for entry in caplog.records if entry.name == main.logger.name]
+    assert entry.request_id == "req-500"
+    # The filter keeps an id passed through `extra`
+    RequestIdFilter().filter(entry)
+    assert entry.request_id == "req-500"
+
+def test_server_error_logger_goes_through_the_queue():
+    server_error = logging.getLogger("uvicorn.error")
+    stderr_handler = logging.StreamHandler()
+    logging.getLogger("uvicorn").addHandler(stderr_handler)
+    logging.getLogger("uvicorn").propagate = False
+
+    pipeline = LogPipeline()
+    pipeline.configure(rate_per_second=0)
+    try:
+        for name in ROUTED_LOGGERS:
+            assert logging.getLogger(name).handlers == []
+            assert logging.getLogger(name).propagate
+        handler = logging.getLogger().handlers[0]
+        assert isinstance(handler, NonBlockingQueueHandler)
+        assert server_error.getEffectiveLevel() <= logging.ERROR
+    finally:
+        pipeline.stop()
+        main.log_pipeline.configure(
+            level=main.settings.LOG_LEVEL,
+            fmt=main.settings.LOG_FORMAT,
+            queue_size=main.settings.LOG_QUEUE_SIZE,
+            rate_per_second=main.settings.LOG_RATE_LIMIT_PER_SECOND,
+            burst=main.settings.LOG_RATE_LIMIT_BURST,
+            sample_rate=main.settings.LOG_SAMPLE_RATE
+        )
+
+def test_queued_records_are_accounted():
+    pipeline = LogPipeline()
+    pipeline.queue = queue.Queue(maxsize=5)
+    pipeline.rate_limit = RateLimitFilter(rate_per_second=1, burst=1)
+    for number in range(3):
+        pipeline.queue.put_nowait(logging.LogRecord("test", logging.INFO, __file__, number, "queued", None, None))
+    pipeline.rate_limit.filter(logging.LogRecord("test", logging.INFO, __file__, 1, "limited", None, None))
+
+    usage = pipeline.memory_usage(sample_size=10)
+    assert usage["queued_records"] == 3 and usage["max_queued_records"] == 5
+    assert usage["rate_limited_sites"] == 1 and usage["entries"] == 4
+    assert usage["bytes"] > 0
+    assert "log_pipeline" in memory_accounting.report()["components"]
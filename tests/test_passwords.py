@@ -0,0 +1,63 @@
+"""
+Password storage: outdated hashes are upgraded on login, and password
+changes are written together with updated_at and report missing users.
+"""
+from passlib.context import CryptContext
+
+from app.models.user import User
+from app.repositories.user_repository import UserRepository
+from app.utils.auth import pwd_context
+
+def stored_user(client, user_id: str) -> User:
+    return client.portal.call(UserRepository.get_by_id, user_id)
+
+def login(client, password: str = "Password123"):
+    return client.post("/api/v1/auth/login", json={"identifier": "member", "password": password})
+
+def test_outdated_hash_is_upgraded_on_login(client, users):
+    user_id = users["user"]["id"]
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("Password123")
+    assert pwd_context.needs_update(outdated)
+
+    async def store_outdated():
+        await User.get_motor_collection().update_one(
+            {"username": "member"}, {"$set": {"hashed_password": outdated}}
+        )
+    client.portal.call(store_outdated)
+
+    # A failed login leaves the hash alone
+    assert login(client, "WrongPassword").status_code == 401
+    assert stored_user(client, user_id).hashed_password == outdated
+
+    assert login(client).status_code == 200
+    upgraded = stored_user(client, user_id)
+    assert upgraded.hashed_password != outdated
+    assert not pwd_context.needs_update(upgraded.hashed_password)
+    assert upgraded.updated_at is not None
+
+    # The upgraded hash keeps working and is not rewritten again
+    assert login(client).status_code == 200
+    assert stored_user(client, user_id).hashed_password == upgraded.hashed_password
+
+def test_change_password(client, users):
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+    change = {"old_password": "WrongPassword", "new_password": "NewPassword456"}
+    assert client.put("/api/v1/auth/change-password", headers=headers, json=change).status_code == 400
+
+    change["old_password"] = "Password123"
+    assert client.put("/api/v1/auth/change-password", headers=headers, json=change).status_code == 200
+    assert stored_user(client, users["user"]["id"]).updated_at is not None
+    assert login(client).status_code == 401
+    assert login(client, "NewPassword456").status_code == 200
+
+def test_change_password_for_a_removed_user_is_404(client, users, monkeypatch):
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+
+    async def removed(user_id, hashed_password):
+        return False
+
+    monkeypatch.setattr(UserRepository, "update_password", staticmethod(removed))
+    response = client.put("/api/v1/auth/change-password", headers=headers, json={
+        "old_password": "Password123", "new_password": "NewPassword456"
+    })
+    assert response.status_code == 404
@@ -0,0 +1,33 @@
+"""
+On-demand profiling: one profiled request at a time, claimed before the
+admin check awaits.
+"""
+import asyncio
+
+from starlette.datastructures import Headers
+
+from app.middleware.profiling import ProfilingMiddleware
+
+def middleware(monkeypatch, admin: bool) -> ProfilingMiddleware:
+    async def is_admin(authorization: str) -> bool:
+        await asyncio.sleep(0)
+        return admin
+
+    profiling = ProfilingMiddleware(app=None, output_dir="unused", per_minute=60, burst=10)
+    monkeypatch.setattr(profiling, "is_admin", is_admin)
+    return profiling
+
+def test_concurrent_triggers_get_one_slot(monkeypatch):
+    profiling = middleware(monkeypatch, admin=True)
+    headers = Headers({"authorization": "Bearer token"})
+
+    async def scenario():
+        return await asyncio.gather(*(profiling.allow(headers) for _ in range(3)))
+
+    assert sorted(asyncio.run(scenario())) == [False, False, True]
+    assert profiling.active
+
+def test_rejected_trigger_releases_the_slot(monkeypatch):
+    profiling = middleware(monkeypatch, admin=False)
+    assert not asyncio.run(profiling.allow(Headers({"authorization": "Bearer token"})))
+    assert not profiling.active
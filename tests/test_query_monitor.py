@@ -0,0 +1,52 @@
+"""
+Slow query monitor: explains are rate-limited per query shape without the
+remembered shapes growing with every new query.
+"""
+from app.core.memory import memory_accounting
+from app.core.query_monitor import SlowQueryMonitor
+
+class ExplainingClient:
+    def __init__(self):
+        self.explained = []
+
+    def __getitem__(self, database):
+        return self
+
+    def command(self, command):
+        self.explained.append(command["explain"])
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+
+def slow_entry(shape: int) -> dict:
+    return {"operation": "UserRepository.search", "command": "find", "database": "test", "shape": {"n": shape}}
+
+def test_explained_shapes_are_capped():
+    monitor = SlowQueryMonitor(threshold_ms=0, explain=True, explain_interval_seconds=3600, max_explained=3)
+    client = ExplainingClient()
+    monitor.attach(client)
+    try:
+        for shape in range(10):
+            monitor._schedule_explain(slow_entry(shape), {"find": "users", "shape": shape})
+        # A shape explained within the interval is not explained again
+        monitor._schedule_explain(slow_entry(9), {"find": "users", "shape": 9})
+        monitor._explain_executor.shutdown(wait=True)
+    finally:
+        monitor.close()
+
+    assert len(client.explained) == 10
+    usage = monitor.memory_usage(sample_size=10)
+    assert usage["explained_shapes"] == 3 and usage["max_explained_shapes"] == 3
+    # The most recently explained shapes are the ones kept
+    assert list(monitor._explained) == [f"UserRepository.search:find:{{'n': {n}}}" for n in (7, 8, 9)]
+
+def test_expired_shapes_are_forgotten():
+    monitor = SlowQueryMonitor(threshold_ms=0, explain=True, explain_interval_seconds=0)
+    monitor.attach(ExplainingClient())
+    try:
+        for shape in range(5):
+            monitor._schedule_explain(slow_entry(shape), {"find": "users"})
+    finally:
+        monitor.close()
+    assert monitor.memory_usage(sample_size=10)["explained_shapes"] == 0
+
+def test_query_monitor_reports_to_memory_accounting():
+    assert "query_monitor" in memory_accounting.report()["components"]
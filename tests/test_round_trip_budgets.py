@@ -0,0 +1,82 @@
+"""
+Per-endpoint round-trip budgets.
+
+Each endpoint declares how many MongoDB commands and password hashing
+calls a single request may cost (measured with a cold user cache).
+A change that adds a query or a hash to an endpoint fails here; if the
+extra cost is intended, raise the budget in the same change.
+"""
+from typing import Any, Callable, Dict, NamedTuple
+
+import pytest
+
+class Budget(NamedTuple):
+    method: str
+    path: str
+    queries: int
+    hashes: int
+    request: Callable[[Dict[str, dict]], Dict[str, Any]]
+    status: int = 200
+
+def bearer(user: dict) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {user['access_token']}"}
+
+BUDGETS = [
+    Budget("POST", "/api/v1/auth/register", queries=5, hashes=1, status=201, request=lambda u: {"json": {
+        "email": "new@example.com", "username": "newuser", "password": "Password123",
+        "first_name": "New", "last_name": "User"
+    }}),
+    Budget("POST", "/api/v1/auth/login", queries=1, hashes=1, request=lambda u: {"json": {
+        "identifier": u["user"]["username"], "password": u["user"]["password"]
+    }}),
+    Budget("POST", "/api/v1/auth/refresh", queries=1, hashes=0, request=lambda u: {"json": {
+        "refresh_token": u["user"]["refresh_token"]
+    }}),
+    Budget("GET", "/api/v1/auth/me", queries=1, hashes=0, request=lambda u: {"headers": bearer(u["user"])}),
+    Budget("GET", "/api/v1/auth/verify-token", queries=1, hashes=0, request=lambda u: {"headers": bearer(u["user"])}),
+    Budget("PUT", "/api/v1/auth/change-password", queries=3, hashes=2, request=lambda u: {
+        "headers": bearer(u["user"]),
+        "json": {"old_password": u["user"]["password"], "new_password": "Password456"}
+    }),
+    Budget("POST", "/api/v1/auth/introspect", queries=2, hashes=0, request=lambda u: {
+        "headers": bearer(u["admin"]),
+        "json": {"tokens": [u["user"]["access_token"], u["admin"]["access_token"]] * 50}
+    }),
+    Budget("GET", "/api/v1/users/", queries=3, hashes=0, request=lambda u: {"headers": bearer(u["admin"])}),
+    Budget("GET", "/api/v1/users/{user}", queries=2, hashes=0, request=lambda u: {"headers": bearer(u["user"])}),
+    Budget("GET", "/api/v1/users/search/", queries=2, hashes=0, request=lambda u: {
+        "headers": bearer(u["admin"]), "params": {"q": "member"}
+    }),
+    Budget("POST", "/api/v1/batch", queries=2, hashes=0, request=lambda u: {
+        "headers": bearer(u["user"]),
+        "json": {"requests": [
+            {"method": "GET", "path": "/api/v1/auth/me"},
+            {"method": "GET", "path": "/api/v1/auth/verify-token"},
+            {"method": "GET", "path": f"/api/v1/users/{u['user']['id']}"}
+        ]}
+    }),
+    Budget("GET", "/api/v1/admin/memory", queries=1, hashes=0, request=lambda u: {"headers": bearer(u["admin"])}),
+    Budget("GET", "/api/v1/admin/jobs", queries=1, hashes=0, request=lambda u: {"headers": bearer(u["admin"])}),
+    Budget("GET", "/api/v1/admin/stats/users", queries=3, hashes=0, request=lambda u: {"headers": bearer(u["admin"])}),
+    Budget("POST", "/api/v1/admin/users/bulk", queries=5, hashes=0, request=lambda u: {
+        "headers": bearer(u["admin"]), "json": {"action": "deactivate", "user_ids": [u["user"]["id"]]}
+    }),
+]
+
+@pytest.mark.parametrize("budget", BUDGETS, ids=lambda budget: f"{budget.method} {budget.path}")
+def test_round_trip_budget(client, users, round_trips, budget):
+    path = budget.path.format(user=users["user"]["id"])
+    request = budget.request(users)
+
+    with round_trips.measure():
+        response = client.request(budget.method, path, **request)
+
+    assert response.status_code == budget.status, response.text
+    assert round_trips.queries <= budget.queries, (
+        f"{budget.method} {budget.path} issued {round_trips.queries} MongoDB commands "
+        f"(budget {budget.queries}): {round_trips.commands}"
+    )
+    assert round_trips.hashes <= budget.hashes, (
+        f"{budget.method} {budget.path} made {round_trips.hashes} password hash calls "
+        f"(budget {budget.hashes}): {round_trips.hash_calls}"
+    )
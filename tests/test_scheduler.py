@@ -0,0 +1,125 @@
+"""
+Maintenance job scheduler: cron parsing, the MongoDB leader lease and
+per-job run metrics.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core import scheduler as scheduler_module
+from app.core.metrics import metrics
+from app.core.scheduler import CronSchedule, LeaderLease, MongoLeaderLease, Scheduler
+
+def test_cron_next_run():
+    every_quarter = CronSchedule("*/15 * * * *")
+    assert every_quarter.next_after(datetime(2024, 1, 1, 10, 7, 30)) == datetime(2024, 1, 1, 10, 15)
+    assert every_quarter.next_after(datetime(2024, 1, 1, 23, 45)) == datetime(2024, 1, 2, 0, 0)
+
+    nightly_weekdays = CronSchedule("30 3 * * 1-5")
+    # 2024-01-05 is a Friday: the next run is on Monday
+    assert nightly_weekdays.next_after(datetime(2024, 1, 5, 4, 0)) == datetime(2024, 1, 8, 3, 30)
+
+    first_or_sunday = CronSchedule("0 0 1 * 0")
+    assert first_or_sunday.next_after(datetime(2024, 1, 1, 12, 0)) == datetime(2024, 1, 7, 0, 0)
+
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+    with pytest.raises(ValueError):
+        CronSchedule("* * *")
+
+def test_mongo_lease_has_a_single_holder(monkeypatch):
+    database = AsyncMongoMockClient()["scheduler_test"]
+    monkeypatch.setattr(scheduler_module, "get_database", lambda: database)
+    first, second = MongoLeaderLease(), MongoLeaderLease()
+
+    async def scenario():
+        assert await first.acquire("job", 60)
+        assert not await second.acquire("job", 60)
+        # The holder renews its own lease
+        assert await first.acquire("job", 60)
+        await first.release("job")
+        assert await second.acquire("job", 60)
+        assert not await first.acquire("job", 60)
+
+    asyncio.run(scenario())
+
+def test_lease_is_renewed_while_the_job_runs(monkeypatch):
+    database = AsyncMongoMockClient()["scheduler_test"]
+    monkeypatch.setattr(scheduler_module, "get_database", lambda: database)
+    other = MongoLeaderLease()
+    scheduler = Scheduler(MongoLeaderLease())
+    taken_over = []
+
+    async def longer_than_the_lease():
+        for _ in range(4):
+            await asyncio.sleep(0.1)
+            taken_over.append(await other.acquire("long", 0.15))
+
+    job = scheduler.add_interval_job("long", longer_than_the_lease, 60)
+
+    async def scenario():
+        assert await scheduler.run_job(job, 0.15)
+        # The heartbeat stopped with the job: the lease now runs out
+        await asyncio.sleep(0.2)
+        assert await other.acquire("long", 0.15)
+        assert not await scheduler.lease.renew("long", 0.15)
+
+    asyncio.run(scenario())
+    assert taken_over == [False] * 4
+
+def test_runs_are_timed_and_failures_counted():
+    class Refusing(LeaderLease):
+        async def acquire(self, name, ttl_seconds):
+            return name != "elsewhere"
+
+    scheduler = Scheduler(Refusing())
+    calls = []
+
+    async def work():
+        calls.append("work")
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    work_job = scheduler.add_interval_job("test_work", work, 60)
+    broken_job = scheduler.add_interval_job("test_broken", broken, 60)
+    elsewhere_job = scheduler.add_interval_job("elsewhere", work, 60)
+    local_job = scheduler.add_interval_job("local", work, 60, leader_only=False)
+    before = metrics.snapshot()["counters"]
+
+    async def scenario():
+        assert await scheduler.run_job(work_job, 60)
+        assert await scheduler.run_job(broken_job, 60)
+        assert not await scheduler.run_job(elsewhere_job, 60)
+        assert await scheduler.run_job(local_job, 60)
+
+    asyncio.run(scenario())
+    counters = metrics.snapshot()["counters"]
+    delta = lambda name: counters.get(name, 0) - before.get(name, 0)
+    assert calls == ["work", "work"]
+    assert delta("scheduler.test_work.runs") == 1
+    assert delta("scheduler.test_broken.failures") == 1
+    assert delta("scheduler.elsewhere.skipped") == 1
+    assert scheduler.status()["test_broken"]["last_error"] == "boom"
+    assert scheduler.status()["test_work"]["last_duration_ms"] is not None
+
+def test_stop_cancels_jobs_past_the_grace_period():
+    scheduler = Scheduler(LeaderLease(), shutdown_grace_seconds=0.05)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(60)
+
+    scheduler.add_interval_job("slow", slow, 0.01)
+
+    async def scenario():
+        await scheduler.start()
+        await asyncio.wait_for(started.wait(), 1)
+        await asyncio.wait_for(scheduler.stop(), 1)
+        assert not scheduler.tasks
+
+    asyncio.run(scenario())
+    assert not scheduler.jobs["slow"].running
@@ -0,0 +1,87 @@
+"""
+Login throttling: token bucket and sliding window arithmetic, and the
+per-identifier lockout holding under parallel attempts on either store.
+"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.core import throttle as throttle_module
+from app.core.throttle import LoginThrottle, SlidingWindow, ThrottleExceeded, TokenBucket
+
+def test_token_bucket_refills_lazily():
+    bucket = TokenBucket(capacity=2, refill_per_second=0.5)
+    state, wait = bucket.consume(None, 100.0)
+    assert (state, wait) == ((1.0, 100.0), 0.0)
+    state, wait = bucket.consume(state, 100.0)
+    assert wait == 0.0 and state[0] == 0.0
+
+    state, wait = bucket.consume(state, 101.0)
+    # Half a token refilled: one more second to wait
+    assert state == (0.5, 101.0) and wait == pytest.approx(1.0)
+    state, wait = bucket.consume(state, 102.0)
+    assert wait == 0.0 and state[0] == pytest.approx(0.0)
+
+    # Never refills above capacity
+    state, _ = bucket.consume(state, 1000.0)
+    assert state[0] == 1.0
+    assert TokenBucket(1, 0).consume((0.0, 5.0), 50.0)[1] == 3600.0
+
+def test_sliding_window_weights_the_previous_window():
+    window = SlidingWindow(60)
+    assert window.index(119.0) == 1 and window.index(120.0) == 2
+    # A quarter into the window: three quarters of the previous count still apply
+    assert window.estimate(previous=8, current=1, now=135.0) == pytest.approx(7.0)
+    assert window.estimate(previous=8, current=1, now=120.0) == pytest.approx(9.0)
+
+    # Full current window: wait for it to end
+    assert window.retry_after(previous=0, current=5, limit=5, now=135.0) == pytest.approx(45.0)
+    # 4 * (1 - t / 60) + 2 < 5 once t > 15, i.e. 15 - 15 + 1 seconds from now
+    assert window.retry_after(previous=4, current=2, limit=5, now=135.0) == pytest.approx(1.0)
+    assert window.retry_after(previous=4, current=2, limit=5, now=125.0) == pytest.approx(11.0)
+
+def login_throttle(backend: str) -> LoginThrottle:
+    return LoginThrottle(
+        ip_burst=100, ip_refill_per_second=100, max_failures=3, window_seconds=900,
+        max_entries=100, shards=4, backend=backend
+    )
+
+@pytest.fixture(params=["memory", "mongo"])
+def throttle(request, monkeypatch) -> LoginThrottle:
+    database = AsyncMongoMockClient()["throttle_test"]
+    monkeypatch.setattr(throttle_module, "get_database", lambda: database)
+    return login_throttle(request.param)
+
+def test_parallel_attempts_cannot_bypass_the_lockout(throttle):
+    async def attempt() -> bool:
+        await asyncio.sleep(0)
+        try:
+            await throttle.check("ada@example.com", "10.0.0.1")
+        except ThrottleExceeded:
+            return False
+        return True
+
+    async def scenario():
+        # Every attempt is checked before any of them has failed
+        return await asyncio.gather(*(attempt() for _ in range(10)))
+
+    assert sum(asyncio.run(scenario())) == 3
+
+def test_released_and_successful_attempts_do_not_count(throttle):
+    async def scenario():
+        for _ in range(5):
+            await throttle.check("Ada@example.com", None)
+            await throttle.release("ada@example.com")
+        await throttle.check("ada@example.com", None)
+        await throttle.check("ada@example.com", None)
+        await throttle.record_success("ada@example.com")
+        for _ in range(3):
+            await throttle.check("ada@example.com", None)
+        with pytest.raises(ThrottleExceeded) as rejected:
+            await throttle.check("ada@example.com", None)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after >= 1
+    assert "account" in rejected.reason
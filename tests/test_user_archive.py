@@ -0,0 +1,82 @@
+"""
+User archival: inactive accounts move to `users_archive` and back, and a
+restore that was interrupted or raced completes without double counting.
+"""
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.models.archived_user import ArchivedUser
+from app.models.user import User
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.user_archive_repository import UserArchiveRepository
+from conftest import create_user
+
+def dormant_user(client) -> str:
+    """A deactivated account last updated long ago, ready to be archived."""
+    user = create_user(client, "dormant")
+    long_ago = datetime.utcnow() - timedelta(days=3650)
+
+    async def age():
+        await User.get_motor_collection().update_one(
+            {"username": "dormant"}, {"$set": {"is_active": False, "updated_at": long_ago}}
+        )
+        await CounterRepository.increment(USER_COUNTERS, active=-1)
+    client.portal.call(age)
+    return user["id"]
+
+def counters(client) -> dict:
+    return client.portal.call(CounterRepository.get, USER_COUNTERS)
+
+def test_archive_and_restore(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    user_id = dormant_user(client)
+    assert counters(client) == {"total": 3, "active": 2}
+
+    assert client.post("/api/v1/admin/users/archive", headers=headers).json() == {"archived": 1}
+    assert client.get(f"/api/v1/users/{user_id}", headers=headers).status_code == 404
+    assert client.portal.call(UserArchiveRepository.get, user_id) is not None
+    assert counters(client) == {"total": 2, "active": 2}
+    # Nothing left to archive
+    assert client.post("/api/v1/admin/users/archive", headers=headers).json() == {"archived": 0}
+
+    response = client.post(f"/api/v1/users/{user_id}/restore", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is True
+    assert client.get(f"/api/v1/users/{user_id}", headers=headers).status_code == 200
+    assert client.portal.call(UserArchiveRepository.get, user_id) is None
+    assert counters(client) == {"total": 3, "active": 3}
+    assert client.post(f"/api/v1/users/{user_id}/restore", headers=headers).status_code == 404
+
+def test_interrupted_restore_is_completed_once(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    user_id = dormant_user(client)
+    client.post("/api/v1/admin/users/archive", headers=headers)
+
+    # A restore that inserted the user and stopped before removing the archive copy
+    async def half_restore():
+        document = await ArchivedUser.get_motor_collection().find_one({"username": "dormant"})
+        document.pop("archived_at")
+        await User.get_motor_collection().insert_one(document)
+    client.portal.call(half_restore)
+
+    restored = client.portal.call(UserArchiveRepository.restore, user_id)
+    assert str(restored.id) == user_id
+    assert client.portal.call(UserArchiveRepository.get, user_id) is None
+    # The insert that failed on _id counted nothing
+    assert counters(client) == {"total": 2, "active": 2}
+
+def test_identity_taken_during_restore_is_a_conflict(client, users, monkeypatch):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    user_id = dormant_user(client)
+    client.post("/api/v1/admin/users/archive", headers=headers)
+
+    async def insert_one(self, document, *args, **kwargs):
+        raise DuplicateKeyError("E11000 duplicate key error", details={"keyPattern": {"email": 1}})
+
+    monkeypatch.setattr(type(User.get_motor_collection()), "insert_one", insert_one)
+    response = client.post(f"/api/v1/users/{user_id}/restore", headers=headers)
+    assert response.status_code == 409
+    # Still archived, and nothing was counted
+    assert client.portal.call(UserArchiveRepository.get, user_id) is not None
+    assert counters(client) == {"total": 2, "active": 2}
@@ -0,0 +1,42 @@
+"""
+Authenticated user cache and conditional GETs: cached users are never
+shared between requests, and every representation has its own ETag.
+"""
+from app.core.cache import user_cache
+from app.repositories.user_repository import UserRepository
+
+def test_cached_users_are_copies(client, users):
+    user_id = users["user"]["id"]
+    first = client.portal.call(UserRepository.get_cached_by_id, user_id)
+    first.is_admin = True
+    first.first_name = "Changed"
+
+    second = client.portal.call(UserRepository.get_cached_by_id, user_id)
+    assert second is not first
+    assert not second.is_admin and second.first_name == "Test"
+    assert user_cache.hits >= 1
+
+    [third] = client.portal.call(UserRepository.get_many_cached, [user_id]).values()
+    third.is_active = False
+    assert client.portal.call(UserRepository.get_cached_by_id, user_id).is_active
+
+def test_each_route_has_its_own_etag(client, users):
+    headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+    me = client.get("/api/v1/auth/me", headers=headers)
+    verify = client.get("/api/v1/auth/verify-token", headers=headers)
+    assert me.json() != verify.json()
+    assert me.headers["etag"] != verify.headers["etag"]
+
+    # A tag from one route never turns into a 304 on the other
+    assert client.get("/api/v1/auth/verify-token", headers={
+        **headers, "If-None-Match": me.headers["etag"]
+    }).status_code == 200
+    assert client.get("/api/v1/auth/me", headers={
+        **headers, "If-None-Match": me.headers["etag"]
+    }).status_code == 304
+
+    # Changing the user changes the tag
+    admin_headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    client.put(f"/api/v1/users/{users['user']['id']}", headers=admin_headers, json={"first_name": "Grace"})
+    changed = client.get("/api/v1/auth/me", headers={**headers, "If-None-Match": me.headers["etag"]})
+    assert changed.status_code == 200 and changed.json()["first_name"] == "Grace"
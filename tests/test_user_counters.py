@@ -0,0 +1,101 @@
+"""
+Maintained user counters: state transitions are counted once, even when
+requests race, and GET /users reports the counted total.
+"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockCollection
+
+from app.core.read_routing import read_router
+from app.models.counter import Counter
+from app.repositories.counter_repository import CounterRepository, USER_COUNTERS
+from app.repositories.user_repository import UserRepository
+from app.schemas.user_schema import UserUpdate
+from conftest import create_user
+
+# Single-document commands; each yields to the event loop first, so
+# concurrent requests interleave between their reads and writes
+SINGLE_DOCUMENT_COMMANDS = [
+    "find_one", "find_one_and_update", "find_one_and_delete", "replace_one", "update_one", "delete_one",
+]
+
+@pytest.fixture
+def interleaved(monkeypatch):
+    def yielding(original):
+        async def wrapper(self, *args, **kwargs):
+            await asyncio.sleep(0)
+            return await original(self, *args, **kwargs)
+        return wrapper
+
+    for name in SINGLE_DOCUMENT_COMMANDS:
+        monkeypatch.setattr(AsyncMongoMockCollection, name, yielding(getattr(AsyncMongoMockCollection, name)))
+
+def counters(client) -> dict:
+    return client.portal.call(CounterRepository.get, USER_COUNTERS)
+
+def test_concurrent_deactivations_are_counted_once(client, users, interleaved):
+    async def race():
+        return await asyncio.gather(*(UserRepository.delete(users["user"]["id"]) for _ in range(3)))
+
+    assert client.portal.call(race) == [True, True, True]
+    assert counters(client) == {"total": 2, "active": 1}
+
+def test_updates_count_only_real_transitions(client, users, interleaved):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    path = f"/api/v1/users/{users['user']['id']}"
+
+    async def race(is_active: bool):
+        await asyncio.gather(*(UserRepository.update(users["user"]["id"], UserUpdate(is_active=is_active)) for _ in range(3)))
+
+    client.portal.call(race, False)
+    assert counters(client) == {"total": 2, "active": 1}
+    client.portal.call(race, True)
+    assert counters(client) == {"total": 2, "active": 2}
+
+    # Unchanged flag and other fields: no transition
+    assert client.put(path, headers=headers, json={"is_active": True, "first_name": "Grace"}).status_code == 200
+    assert counters(client) == {"total": 2, "active": 2}
+    assert client.get(path, headers=headers).json()["first_name"] == "Grace"
+
+def test_hard_delete_counts_the_deleted_state(client, users):
+    inactive = create_user(client, "inactive")
+    client.portal.call(UserRepository.delete, inactive["id"])
+    assert counters(client) == {"total": 3, "active": 2}
+
+    assert client.portal.call(UserRepository.hard_delete, inactive["id"])
+    assert not client.portal.call(UserRepository.hard_delete, inactive["id"])
+    assert counters(client) == {"total": 2, "active": 2}
+
+def test_listing_total_comes_from_the_counters(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    assert client.get("/api/v1/users/", headers=headers).json()["total"] == 2
+
+    client.portal.call(CounterRepository.set, USER_COUNTERS, {"total": 2, "active": 7})
+    assert client.get("/api/v1/users/", headers=headers).json()["total"] == 7
+    client.portal.call(UserRepository.reconcile_counters)
+    assert client.get("/api/v1/users/", headers=headers).json()["total"] == 2
+
+def test_reconciliation_counts_on_the_primary(client, users, round_trips, monkeypatch):
+    # Local stand-in for a replica set: record the preference of every routed read
+    routed = []
+
+    def apply(collection, **options):
+        routed.append(options["read_preference"].mongos_mode)
+        return collection
+
+    monkeypatch.setattr(read_router, "enabled", True)
+    monkeypatch.setattr(read_router, "apply", apply)
+
+    with round_trips.measure():
+        client.portal.call(UserRepository.reconcile_counters)
+    assert [command for _, command in round_trips.commands].count("count_documents") == 2
+    assert routed == []
+
+    # Also when a tolerant count finds no counters and reconciles on the spot
+    client.portal.call(Counter.get_motor_collection().delete_many, {})
+    with round_trips.measure():
+        assert client.portal.call(UserRepository.count) == 2
+    assert [command for _, command in round_trips.commands].count("count_documents") == 2
+    # Only the counter lookup itself went to a secondary
+    assert routed == ["secondaryPreferred"]
@@ -0,0 +1,71 @@
+"""
+Signup and activity rollups: maintained on writes, rebuilt by the
+backfill and read from a short-lived cache.
+"""
+from datetime import datetime, timedelta
+
+from app.models.user import User
+from app.repositories.rollup_repository import RollupRepository
+from app.services.stats_service import StatsService
+from conftest import create_user
+
+def test_rollups_follow_signups_and_deactivations(client, users, round_trips):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    member = create_user(client, "another")
+    client.post(f"/api/v1/users/{member['id']}/deactivate", headers=headers)
+    client.portal.call(StatsService.refresh_active)
+
+    today = datetime.utcnow().date().isoformat()
+    response = client.get("/api/v1/admin/stats/users", headers=headers, params={"start": today, "end": today})
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["active"] == 2
+    assert stats["totals"] == {"signups": 3, "activations": 0, "deactivations": 1, "deletions": 0}
+    assert [period["active"] for period in stats["periods"]] == [2]
+
+    hourly = client.get("/api/v1/admin/stats/users", headers=headers, params={
+        "granularity": "hour", "start": today, "end": today
+    }).json()
+    assert len(hourly["periods"]) == 24
+    assert sum(period["signups"] for period in hourly["periods"]) == 3
+
+    # Served from the cache: only the admin lookup reaches the database
+    with round_trips.measure():
+        client.get("/api/v1/admin/stats/users", headers=headers, params={"start": today, "end": today})
+    assert round_trips.queries == 1
+
+def test_backfill_rebuilds_signups_from_the_collection(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    three_days_ago = datetime.utcnow() - timedelta(days=3)
+
+    async def age_users():
+        await User.get_motor_collection().update_many({}, {"$set": {"created_at": three_days_ago}})
+    client.portal.call(age_users)
+
+    # Already counted: three signups a day earlier (hard-deleted since) and one of the two
+    async def record_signups():
+        await RollupRepository.record(three_days_ago - timedelta(days=1), signups=3)
+        await RollupRepository.record(three_days_ago, signups=1)
+    client.portal.call(record_signups)
+
+    response = client.post("/api/v1/admin/stats/users/backfill", headers=headers, params={"days": 7})
+    # Closed days only: today is left to the live counts
+    assert response.json()["periods"]["day"] == 7
+
+    stats = client.get("/api/v1/admin/stats/users", headers=headers, params={
+        "start": (datetime.utcnow().date() - timedelta(days=7)).isoformat()
+    }).json()
+    signups = {period["period"]: period["signups"] for period in stats["periods"]}
+    # Raised to the recount, but never lowered below what was counted
+    assert signups[three_days_ago.strftime("%Y-%m-%d")] == 2
+    assert signups[(three_days_ago - timedelta(days=1)).strftime("%Y-%m-%d")] == 3
+    assert signups[datetime.utcnow().date().isoformat()] == 2
+
+def test_range_is_bounded(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    assert client.get("/api/v1/admin/stats/users", headers=headers, params={
+        "start": "2024-02-01", "end": "2024-01-01"
+    }).status_code == 400
+    assert client.get("/api/v1/admin/stats/users", headers=headers, params={
+        "granularity": "hour", "start": "2024-01-01", "end": "2024-12-31"
+    }).status_code == 400
@@ -0,0 +1,111 @@
+"""
+User endpoints: sparse fieldsets, flag changes and the guard keeping an
+admin from locking themselves out.
+"""
+import asyncio
+
+from pymongo.errors import DuplicateKeyError
+
+from app.models.user import User
+from app.repositories.user_repository import UserRepository
+from app.schemas.user_schema import UserCreate
+from conftest import create_user
+
+def test_sparse_fieldsets(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    user_id = users["user"]["id"]
+
+    full = client.get(f"/api/v1/users/{user_id}", headers=headers).json()
+    assert {"id", "email", "username", "is_active", "is_admin"} <= set(full)
+    assert "hashed_password" not in full
+
+    sparse = client.get(f"/api/v1/users/{user_id}", headers=headers, params={"fields": "id,username"})
+    assert sparse.status_code == 200
+    assert sparse.json() == {"id": user_id, "username": "member"}
+
+    page = client.get("/api/v1/users/", headers=headers, params={"fields": "username"}).json()
+    assert page["total"] == 2
+    assert sorted(user["username"] for user in page["users"]) == ["admin", "member"]
+    assert all(set(user) == {"username"} for user in page["users"])
+
+    found = client.get("/api/v1/users/search/", headers=headers, params={"q": "memb", "fields": "id"}).json()
+    assert found == [{"id": user_id}]
+
+    assert client.get(f"/api/v1/users/{user_id}", headers=headers, params={"fields": "hashed_password"}).status_code == 400
+
+def test_sparse_routes_document_the_full_schema(client):
+    operation = client.get("/openapi.json").json()["paths"]["/api/v1/users/{user_id}"]["get"]
+    response = operation["responses"]["200"]
+    assert "only the listed fields" in response["description"]
+    assert response["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/UserResponse"}
+
+def test_flag_endpoints(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    user_id = users["user"]["id"]
+
+    assert client.post(f"/api/v1/users/{user_id}/make-admin", headers=headers).json()["is_admin"] is True
+    assert client.post(f"/api/v1/users/{user_id}/remove-admin", headers=headers).json()["is_admin"] is False
+    assert client.post(f"/api/v1/users/{user_id}/deactivate", headers=headers).json()["is_active"] is False
+    assert client.post(f"/api/v1/users/{user_id}/activate", headers=headers).json()["is_active"] is True
+
+    member_headers = {"Authorization": f"Bearer {users['user']['access_token']}"}
+    assert client.post(f"/api/v1/users/{user_id}/make-admin", headers=member_headers).status_code == 403
+
+def test_admins_cannot_lock_themselves_out(client, users):
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    admin_id = users["admin"]["id"]
+
+    for action in ("deactivate", "remove-admin"):
+        response = client.post(f"/api/v1/users/{admin_id}/{action}", headers=headers)
+        assert response.status_code == 400
+    for change in ({"is_active": False}, {"is_admin": False}):
+        assert client.put(f"/api/v1/users/{admin_id}", headers=headers, json=change).status_code == 400
+
+    me = client.get("/api/v1/auth/me", headers=headers).json()
+    assert me["is_active"] and me["is_admin"]
+    # Harmless changes to their own account still go through
+    assert client.post(f"/api/v1/users/{admin_id}/activate", headers=headers).status_code == 200
+    assert client.put(f"/api/v1/users/{admin_id}", headers=headers, json={"first_name": "Ada"}).status_code == 200
+
+    # Another admin may demote them
+    other = create_user(client, "otheradmin", is_admin=True)
+    other_headers = {"Authorization": f"Bearer {other['access_token']}"}
+    assert client.post(f"/api/v1/users/{admin_id}/remove-admin", headers=other_headers).json()["is_admin"] is False
+
+def test_identity_race_is_a_conflict(client, users, monkeypatch):
+    # Both requests passed the availability check; the unique indexes decide
+    async def race():
+        user_data = UserCreate(
+            email="racer@example.com", username="racer", first_name="Race",
+            last_name="Condition", password="Password123"
+        )
+        return await asyncio.gather(
+            UserRepository.create(user_data, "hash"), UserRepository.create(user_data, "hash"),
+            return_exceptions=True
+        )
+
+    results = client.portal.call(race)
+    assert sum(isinstance(result, DuplicateKeyError) for result in results) == 1
+    assert identity_count(client, "racer@example.com", "racer") == 1
+
+    async def no_conflicts(*args, **kwargs):
+        return set()
+
+    monkeypatch.setattr(UserRepository, "find_identity_conflicts", staticmethod(no_conflicts))
+    response = client.post("/api/v1/auth/register", json={
+        "email": "member@example.com", "username": "newcomer", "password": "Password123!",
+        "first_name": "New", "last_name": "Comer"
+    })
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Email already registered"
+
+    headers = {"Authorization": f"Bearer {users['admin']['access_token']}"}
+    response = client.put(f"/api/v1/users/{users['user']['id']}", headers=headers, json={"username": "racer"})
+    assert response.status_code == 409
+    assert identity_count(client, "member@example.com", "racer") == 2
+    assert identity_count(client, "newcomer@example.com", "newcomer") == 0
+
+def identity_count(client, email: str, username: str) -> int:
+    async def count():
+        return await User.get_motor_collection().count_documents({"$or": [{"email": email}, {"username": username}]})
+    return client.portal.call(count)